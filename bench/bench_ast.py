@@ -0,0 +1,70 @@
+"""AST memory/time benchmark: Node objects vs the columnar Arena, and
+reloading a saved AST from JSON vs the memory-mapped binary format.
+
+Usage: python3 bench/bench_ast.py [blocks]
+"""
+import gc
+import json
+import os
+import tempfile
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import binast
+from nodes import Arena, serialize_ast
+from bench_lexer import synthetic_letter
+from lexer import lex
+from parser import Parser
+
+def build(tokens, arena):
+    return Parser(tokens, arena=arena).parse()
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    tokens = lex(synthetic_letter(blocks))
+    print(f"[bench] {blocks} blocks, {len(tokens)} tokens")
+    for name, make_arena in (("Node", lambda: None), ("Arena", Arena)):
+        gc.collect()
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        ast = build(tokens, make_arena())
+        secs = time.perf_counter() - t0
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracked = len(gc.get_objects())
+        print(f"  {name:<6} parse {secs:7.3f}s  retained {size / 1e6:8.1f} MB  gc-tracked objects {tracked:>10}")
+        del ast
+
+    ast = build(tokens, Arena())
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path, bin_path = os.path.join(tmp, "ast.json"), os.path.join(tmp, "ast.bin")
+        t0 = time.perf_counter()
+        with open(json_path, "w") as f:
+            json.dump(serialize_ast(ast), f)
+        json_write = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        binast.dump(ast, bin_path)
+        bin_write = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with open(json_path) as f:
+            json.load(f)
+        json_load = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        root = binast.load(bin_path)
+        bin_load = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        last = root.arena.kinds[len(root.arena) - 1], root.children[-1].value
+        bin_touch = time.perf_counter() - t0
+        del root, last
+        print(f"  JSON   write {json_write:7.3f}s  load {json_load * 1000:9.1f}ms  "
+              f"{os.path.getsize(json_path) / 1e6:8.1f} MB")
+        print(f"  binary write {bin_write:7.3f}s  load {bin_load * 1000:9.1f}ms  "
+              f"{os.path.getsize(bin_path) / 1e6:8.1f} MB  (+{bin_touch * 1000:.1f}ms to reach the last top-level node)")
+
+if __name__ == "__main__":
+    main()
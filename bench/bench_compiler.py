@@ -0,0 +1,127 @@
+"""Per-stage compiler benchmark with baselines and regression gating.
+
+Each stage (lex, parse, ail, irgen, seal, llvm parse/verify/emit) runs on
+synthetic festival letters (see synth.py) at each size; the best of
+--repeat runs is kept (one run at 100k Blocks and up). irgen runs without
+the fragment cache, so it measures lowering rather than disk reads.
+
+Usage:
+    python3 bench/bench_compiler.py [--sizes 10,1000,100000] [--repeat N]
+        [--statements N] [--reuse R] [--dj-mix R]
+        [--save FILE] [--compare FILE] [--threshold 0.25] [--min-delta 0.005]
+
+--save writes the results as baseline JSON. --compare runs the same sizes
+against a baseline and exits 1 if any stage is more than threshold slower
+(relative) and min-delta seconds slower (absolute, to ignore noise on tiny
+stages).
+"""
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ail import correct_program
+from backend import Timings, compile_ir, create_target_machine
+from irgen import generate_ir
+from lexer import lex
+from main import create_letter_seal, option_value
+from parser import Parser
+from synth import synthetic_festival
+
+STAGES = ["lex", "parse", "ail", "irgen", "seal", "llvm parse", "llvm verify", "llvm emit-object"]
+DEFAULT_SIZES = "10,1000,100000"
+DEFAULT_PARAMS = {"statements": 3, "reuse": 0.5, "dj_mix": 0.5}
+# Sizes from here up run once whatever --repeat says
+SINGLE_RUN_BLOCKS = 100_000
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+def run_once(source):
+    """Seconds per stage for one compile of source."""
+    gc.collect()
+    secs = {}
+    tokens, secs["lex"] = timed(lex, source)
+    ast, secs["parse"] = timed(lambda: Parser(tokens, starched_mode=True).parse())
+    _, secs["ail"] = timed(correct_program, ast)
+    stats = {}
+    ir_code, secs["irgen"] = timed(lambda: generate_ir(ast, stats=stats))
+    _, secs["seal"] = timed(create_letter_seal, ast, ir_code, "linear", stats["block_keys"])
+    timings = Timings()
+    target_machine = create_target_machine(0)
+    mod = compile_ir(ir_code, 0, target_machine, timings)
+    timings.stage("emit-object", target_machine.emit_object, mod)
+    for name, stage_secs in timings.stages:
+        secs[f"llvm {name}"] = stage_secs
+    return secs
+
+def run(sizes, repeat, statements, reuse, dj_mix):
+    results = {}
+    for blocks in sizes:
+        source = synthetic_festival(blocks, statements, reuse, dj_mix)
+        runs = [run_once(source) for _ in range(1 if blocks >= SINGLE_RUN_BLOCKS else repeat)]
+        results[str(blocks)] = {stage: round(min(r[stage] for r in runs), 6) for stage in STAGES if stage in runs[0]}
+        print(f"[bench] {blocks:>7} blocks  " + "  ".join(f"{s} {t * 1000:.1f}ms" for s, t in results[str(blocks)].items()))
+    return results
+
+def compare(results, baseline, threshold, min_delta):
+    """Print per-stage ratios against baseline; returns the regressions."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, secs in stages.items():
+            base = baseline.get(size, {}).get(stage)
+            if base is None:
+                continue
+            ratio = secs / base if base else float("inf")
+            regressed = ratio > 1 + threshold and secs - base > min_delta
+            if regressed:
+                regressions.append((size, stage, base, secs))
+            print(f"  {size:>7} {stage:<18} {base * 1000:10.2f}ms → {secs * 1000:10.2f}ms  {ratio:6.2f}x"
+                  + ("  REGRESSION" if regressed else ""))
+    return regressions
+
+def main(args):
+    baseline_file = option_value(args, "--compare", None)
+    baseline = None
+    sizes, params = DEFAULT_SIZES, dict(DEFAULT_PARAMS)
+    if baseline_file:
+        with open(baseline_file) as f:
+            baseline = json.load(f)
+        # compare like with like: the baseline's sizes and letters unless overridden
+        sizes = ",".join(baseline["results"])
+        params.update(baseline.get("params", {}))
+    sizes = [int(n) for n in option_value(args, "--sizes", sizes).split(",")]
+    for key, cast in (("statements", int), ("reuse", float), ("dj_mix", float)):
+        value = option_value(args, "--" + key.replace("_", "-"), None)
+        if value is not None:
+            params[key] = cast(value)
+    repeat = int(option_value(args, "--repeat", "3"))
+
+    results = run(sizes, repeat, **params)
+
+    save = option_value(args, "--save", None)
+    if save:
+        with open(save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "params": params, "results": results}, f, indent=2)
+        print(f"[bench] Baseline written → {save}")
+
+    if baseline is not None:
+        threshold = float(option_value(args, "--threshold", "0.25"))
+        regressions = compare(results, baseline["results"], threshold,
+                              float(option_value(args, "--min-delta", "0.005")))
+        if regressions:
+            print(f"[bench] {len(regressions)} stage(s) regressed by more than {threshold:.0%}")
+            return 1
+        print(f"[bench] No stage regressed by more than {threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,97 @@
+"""Lexer throughput benchmark: tokens/second on a synthetic letter.
+
+Usage: python3 bench/bench_lexer.py [blocks] [repeats]
+"""
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from lexer import TOKENS, iter_tokens, lex, tokenize
+
+HEADER = """Module:
+    Target: x86_64;
+    Subject: Synthetic Set;
+
+Entry:
+    Func main():;
+"""
+
+BLOCK = """
+Block:
+    Equation: Track{n} = {n};
+    Above:
+        Print "Track {n}";
+    Below:
+        Print "Track {n}";
+"""
+
+FOOTER = """
+End:
+    Return 0;
+"""
+
+def synthetic_letter(blocks):
+    return HEADER + "".join(BLOCK.format(n=n) for n in range(blocks)) + FOOTER
+
+def legacy_tokenize(src):
+    """The pre-master-regex lexer, kept here as the comparison baseline."""
+    tokens = []
+    i = 0
+    while i < len(src):
+        match = None
+        for typ, regex in TOKENS:
+            match = re.compile(regex).match(src, i)
+            if match:
+                if typ not in ("SPACE", "NEWLINE"):
+                    tokens.append((typ, match.group(0)))
+                i = match.end(0)
+                break
+        if not match:
+            raise SyntaxError(f"Unexpected char at {i}: {src[i]}")
+    return tokens
+
+def best_of(fn, src, repeats):
+    best, count = float("inf"), 0
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        count = fn(src)
+        best = min(best, time.perf_counter() - t0)
+    return best, count
+
+def retained_memory(fn, src):
+    tracemalloc.start()
+    result = fn(src)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    src = synthetic_letter(blocks)
+    print(f"[bench] {blocks} blocks, {len(src) / 1e6:.1f} MB of source")
+
+    cases = [
+        ("iter_tokens", lambda s: sum(1 for _ in iter_tokens(s))),
+        ("tokenize", lambda s: len(tokenize(s))),
+        ("lex", lambda s: len(lex(s))),
+    ]
+    # The legacy lexer is far too slow for the full letter; time a slice of it.
+    legacy_src = synthetic_letter(min(blocks, 5_000))
+    for name, fn in cases:
+        secs, count = best_of(fn, src, repeats)
+        print(f"  {name:<12} {count:>10} tokens  {secs:8.3f}s  {count / secs:>12,.0f} tok/s")
+    secs, count = best_of(lambda s: len(legacy_tokenize(s)), legacy_src, 1)
+    print(f"  {'legacy':<12} {count:>10} tokens  {secs:8.3f}s  {count / secs:>12,.0f} tok/s")
+
+    print("[bench] retained memory")
+    for name, fn in (("tokenize", tokenize), ("lex", lex)):
+        print(f"  {name:<12} {retained_memory(fn, src) / 1e6:8.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Print coalescing: run time of the generated binary with one printf per
+Print vs runs of Prints written with one call, on a letter that prints
+many lines. Both binaries must print the same bytes.
+
+Usage: python3 bench/bench_print.py [blocks] [prints per block] [runs]
+(links with $CC, default clang)
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import irgen
+from backend import compile_ir, create_target_machine, emit
+from bench_lexer import FOOTER, HEADER
+from lexer import lex
+from parser import Parser
+
+RUNTIME = os.path.join(os.path.dirname(irgen.__file__), "dj_runtime.c")
+CC = os.environ.get("CC", "clang")
+
+def print_letter(blocks, prints):
+    """Blocks that print literal lines and a symbol; every 16th one reads a
+    run-time value, so a printf run is exercised too."""
+    out = [HEADER, "\nBlock:\n    Equation: Tempo = <number>;\n    Above:\n    Below:\n"]
+    for n in range(blocks):
+        rhs = "Tempo + 1" if n % 16 == 0 else str(n % 12)
+        stmts = " ".join([f'Print "line {n}.{k}";' for k in range(prints)] + [f'Print "V{n}";'])
+        out.append(f"\nBlock:\n    Equation: V{n} = {rhs};\n    Above:\n        {stmts}\n    Below:\n        {stmts}\n")
+    out.append(FOOTER)
+    return "".join(out)
+
+def build(source, coalesce, exe):
+    irgen.COALESCE_PRINTS = coalesce
+    ir_code = irgen.generate_ir(Parser(lex(source)).parse())
+    target_machine = create_target_machine(2)
+    emit(compile_ir(ir_code, 2, target_machine), target_machine, exe + ".o")
+    subprocess.run([CC, exe + ".o", RUNTIME, "-o", exe], check=True)
+    return ir_code.count("call ")
+
+def run(exe, runs):
+    times = []
+    for _ in range(runs):
+        with tempfile.TemporaryFile() as out:
+            t0 = time.perf_counter()
+            subprocess.run([exe], stdout=out, check=True)
+            times.append(time.perf_counter() - t0)
+            out.seek(0)
+            output = out.read()
+    return sorted(times)[len(times) // 2], output
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    prints = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    source = print_letter(blocks, prints)
+    print(f"[bench] {blocks} blocks x {prints + 1} prints, median of {runs} runs, stdout to a file")
+    outputs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, coalesce in (("printf", False), ("coalesced", True)):
+            exe = os.path.join(tmp, name)
+            calls = build(source, coalesce, exe)
+            secs, outputs[name] = run(exe, runs)
+            print(f"  {name:<10} {calls:>8} calls in IR  run {secs * 1000:8.1f} ms  output {len(outputs[name]) / 1e3:.1f} kB")
+    print("  outputs identical" if outputs["printf"] == outputs["coalesced"] else "  OUTPUTS DIFFER")
+
+if __name__ == "__main__":
+    main()
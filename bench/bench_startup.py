@@ -0,0 +1,133 @@
+"""Startup cost of each lettera subcommand, from `python -X importtime`.
+
+Each subcommand runs on a small letter in a fresh process (in a scratch
+directory, so outputs land there); the best of --repeat runs is kept. For
+each one the benchmark reports total import time (the cumulative time of
+every top-level import), wall time, and whether llvmlite and its binding
+(which loads the LLVM shared library) were imported at all.
+
+Usage:
+    python3 bench/bench_startup.py [--letter FILE] [--repeat N]
+        [--save FILE] [--compare FILE] [--threshold 0.25] [--min-delta 0.02]
+
+--compare exits 1 if a subcommand imports a module it must not (check and
+emit-ast: llvmlite; ir: llvmlite.binding), or if its import time is more
+than threshold slower (relative) and min-delta seconds slower (absolute)
+than the baseline (import times vary by tens of ms from run to run, hence
+the larger default min-delta than bench_compiler.py).
+"""
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from main import option_value
+
+MAIN = os.path.join(ROOT, "src", "main.py")
+DEFAULT_LETTER = os.path.join(ROOT, "tests", "example.let")
+# subcommand -> arguments after main.py ({letter}, {dir} filled in per run)
+SUBCOMMANDS = {
+    "check": ["check", "{letter}"],
+    "emit-ast": ["emit-ast", "{letter}"],
+    "ir": ["ir", "{letter}"],
+    "build": ["build", "{dir}", "-j", "1"],
+    "compile": ["{letter}"],
+}
+# modules each subcommand must never import
+FORBIDDEN = {"check": "llvmlite", "emit-ast": "llvmlite", "ir": "llvmlite.binding"}
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def imports(stderr):
+    """(seconds of top-level imports, set of modules imported) from -X importtime output."""
+    total, modules = 0, set()
+    for line in stderr.splitlines():
+        m = IMPORT_LINE.match(line)
+        if m:
+            modules.add(m.group(4))
+            if len(m.group(3)) == 1:
+                total += int(m.group(2))
+    return total / 1e6, modules
+
+def run_once(name, letter):
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "src")
+        os.mkdir(src)
+        shutil.copy(letter, src)
+        args = [a.format(letter=os.path.join(src, os.path.basename(letter)), dir=src) for a in SUBCOMMANDS[name]]
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", MAIN] + args, cwd=tmp,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} exited {proc.returncode}")
+    secs, modules = imports(proc.stderr)
+    return {"imports": secs, "wall": wall,
+            "llvmlite": "llvmlite" in modules, "llvmlite.binding": "llvmlite.binding" in modules,
+            "forbidden": FORBIDDEN.get(name) in modules}
+
+def run(letter, repeat):
+    results = {}
+    for name in SUBCOMMANDS:
+        runs = [run_once(name, letter) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r["imports"])
+        results[name] = {"imports": round(best["imports"], 6), "wall": round(min(r["wall"] for r in runs), 6),
+                         "llvmlite": best["llvmlite"], "llvmlite.binding": best["llvmlite.binding"],
+                         "forbidden": best["forbidden"]}
+        loaded = "llvmlite.binding" if best["llvmlite.binding"] else "llvmlite.ir" if best["llvmlite"] else "no llvmlite"
+        print(f"[bench] {name:<9} imports {best['imports'] * 1000:7.1f}ms  wall {results[name]['wall'] * 1000:7.1f}ms  "
+              f"{loaded}" + ("  FORBIDDEN IMPORT" if best["forbidden"] else ""))
+    return results
+
+def compare(results, baseline, threshold, min_delta):
+    """Print import-time ratios against baseline; returns the failures."""
+    failures = []
+    for name, r in results.items():
+        if r["forbidden"]:
+            failures.append((name, f"imports {FORBIDDEN[name]}"))
+        base = baseline.get(name, {}).get("imports")
+        if base is None:
+            continue
+        ratio = r["imports"] / base if base else float("inf")
+        regressed = ratio > 1 + threshold and r["imports"] - base > min_delta
+        if regressed:
+            failures.append((name, f"imports {ratio:.2f}x slower"))
+        print(f"  {name:<9} {base * 1000:8.1f}ms → {r['imports'] * 1000:8.1f}ms  {ratio:5.2f}x"
+              + ("  REGRESSION" if regressed else ""))
+    return failures
+
+def main(args):
+    letter = os.path.abspath(option_value(args, "--letter", DEFAULT_LETTER))
+    repeat = int(option_value(args, "--repeat", "5"))
+    print(f"[bench] {os.path.basename(letter)}, best of {repeat} runs per subcommand")
+    results = run(letter, repeat)
+
+    save = option_value(args, "--save", None)
+    if save:
+        with open(save, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "results": results}, f, indent=2)
+        print(f"[bench] Baseline written → {save}")
+
+    baseline_file = option_value(args, "--compare", None)
+    if baseline_file:
+        with open(baseline_file) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline["results"], float(option_value(args, "--threshold", "0.25")),
+                           float(option_value(args, "--min-delta", "0.02")))
+        for name, why in failures:
+            print(f"[bench] {name}: {why}")
+        if failures:
+            return 1
+        print("[bench] No subcommand regressed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
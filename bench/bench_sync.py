@@ -0,0 +1,71 @@
+"""Delta sync vs full resend over loopback: bytes on the wire and latency
+for a one-Block edit to a large letter, per compression codec.
+
+Usage: python3 bench/bench_sync.py [blocks] [edits]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_lexer import synthetic_letter
+from cache import CompileCache
+from lexer import lex
+from parser import Parser
+from sync import SyncClient, SyncServer
+
+def edited(source, n):
+    """source with the Print text of Block n changed (on both sides)."""
+    old = f'Print "Track {n}";'
+    return source.replace(old, f'Print "Track {n} (edit)";')
+
+async def run(blocks, edits, codec, cache_dir):
+    server = await SyncServer(cache=CompileCache(cache_dir)).start()
+    address = f"127.0.0.1:{server.port}"
+    source = synthetic_letter(blocks)
+    results = {}
+    for mode in ("full", "delta"):
+        client = SyncClient(address, codecs=(codec,))
+        await client.negotiate()
+        # prime the peer (and its fragment cache) with the original letter
+        if mode == "full":
+            await client.send_full("set", source)
+        else:
+            await client.sync("set", Parser(lex(source)).parse())
+        sent, received, trips = client.bytes_sent, client.bytes_received, client.round_trips
+        latency, compile_ms = [], []
+        for k in range(edits):
+            letter = edited(source, (k * 7919) % blocks)
+            t0 = time.perf_counter()
+            if mode == "full":
+                reply = await client.send_full("set", letter)
+            else:
+                reply = await client.sync("set", Parser(lex(letter)).parse())
+            latency.append(time.perf_counter() - t0)
+            assert reply["status"] == "ok", reply
+            compile_ms.append(reply["compile_ms"])
+        results[mode] = ((client.bytes_sent - sent) / edits, (client.bytes_received - received) / edits,
+                         (client.round_trips - trips) / edits, sorted(latency)[len(latency) // 2],
+                         sorted(compile_ms)[len(compile_ms) // 2])
+        await client.close()
+    await server.close()
+    return results
+
+def main():
+    blocks = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    print(f"[bench] {blocks} blocks, one-Block edit, median of {edits}")
+    for codec in ("none", "zlib", "lzma"):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results = asyncio.run(run(blocks, edits, codec, cache_dir))
+        for mode, (sent, received, trips, latency, compile_ms) in results.items():
+            print(f"  {codec:<5} {mode:<6} sent {sent / 1e3:10.1f} kB  received {received / 1e3:6.1f} kB  "
+                  f"round trips {trips:3.1f}  latency {latency * 1000:8.1f} ms "
+                  f"(peer compile {compile_ms:7.1f} ms)")
+
+if __name__ == "__main__":
+    main()
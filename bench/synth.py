@@ -0,0 +1,103 @@
+"""Synthetic letter generator for the benchmarks, modeled on
+stdlib/dj/festival.let: track Equations with metadata commands,
+transitions, recording, and Prints of literals and symbols.
+
+    synthetic_festival(blocks, statements=3, reuse=0.5, dj_mix=0.5, seed=0)
+
+statements is the number of statements per Above/Below section; reuse is
+the fraction of Print literals drawn from a small shared pool (the rest are
+unique); dj_mix is the fraction of statements that are DJ commands rather
+than Prints. The same arguments always produce the same letter.
+
+Usage: python3 bench/synth.py blocks [statements] [reuse] [dj_mix] > letter.let
+"""
+import random
+import sys
+
+HEADER = """Import "dj/djmeta.let"
+Import "dj/djtransitions.let"
+Import "dj/djeffects.let"
+Import "dj/djrecord.let"
+
+Module:
+    Target: x86_64;
+    Version: 2.0;
+    Subject: Synthetic Festival;
+    Address: synth@dj;
+
+Entry:
+    Func main():;
+"""
+
+FOOTER = """
+End:
+    Return 0;
+"""
+
+KEYS = ["Am", "C#m", "Fm", "G", "Dm", "E"]
+GENRES = ["House", "Trance", "Techno", "Garage", "Ambient"]
+FILTERS = ["lowpass", "highpass", "bandpass"]
+SHARED_LITERALS = [f"Now playing: set {n}" for n in range(16)]
+
+def dj_command(rng, n):
+    """One DJ command in the proportions festival.let uses them."""
+    kind = rng.choices(("BPM", "Key", "Genre", "Crossfade", "Filter", "RecordSet", "SealSet"),
+                       weights=(4, 3, 3, 2, 2, 1, 1))[0]
+    if kind == "BPM":
+        return f"BPM={rng.randint(90, 140)};"
+    if kind == "Key":
+        return f'Key="{rng.choice(KEYS)}";'
+    if kind == "Genre":
+        return f'Genre="{rng.choice(GENRES)}";'
+    if kind == "Crossfade":
+        return f'Crossfade({rng.choice((4, 8, 16))}s,"linear");'
+    if kind == "Filter":
+        return f'Filter("{rng.choice(FILTERS)}","{rng.choice((2, 4, 8))}s");'
+    if kind == "RecordSet":
+        return f'RecordSet("set{n}.wav");'
+    return 'SealSet("sha256");'
+
+def equation(rng, n):
+    """Track names, numbers, arithmetic on earlier numbers and transitions."""
+    kind = n % 4 if n >= 4 else n % 2
+    if kind == 0:
+        return f'Track{n} = "Track{n}.mp3"'
+    if kind == 1:
+        return f"Level{n} = {rng.randint(1, 99)}"
+    if kind == 2:
+        return f"Mix{n} = Level{n - 1} * 2 + {rng.randint(1, 9)}"
+    return f"Transition{n} = Track{n - 3} → Track{n - 3}"
+
+def synthetic_festival(blocks, statements=3, reuse=0.5, dj_mix=0.5, seed=0):
+    rng = random.Random(seed)
+    out = [HEADER]
+    for n in range(blocks):
+        eq = equation(rng, n)
+        stmts = []
+        for k in range(statements):
+            if rng.random() < dj_mix:
+                stmts.append(dj_command(rng, n))
+            elif k == 0:
+                stmts.append(f'Print "{eq.split(" = ")[0]}";')
+            elif rng.random() < reuse:
+                stmts.append(f'Print "{rng.choice(SHARED_LITERALS)}";')
+            else:
+                stmts.append(f'Print "Block {n} line {k}";')
+        section = " ".join(stmts)
+        out.append(f"\nBlock:\n    Equation: {eq};\n    Above: {section}\n    Below: {section}\n")
+    out.append(FOOTER)
+    return "".join(out)
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: python3 bench/synth.py blocks [statements] [reuse] [dj_mix] > letter.let")
+        return 1
+    statements = int(args[1]) if len(args) > 1 else 3
+    reuse = float(args[2]) if len(args) > 2 else 0.5
+    dj_mix = float(args[3]) if len(args) > 3 else 0.5
+    sys.stdout.write(synthetic_festival(int(args[0]), statements, reuse, dj_mix))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
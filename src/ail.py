@@ -1,8 +1,119 @@
+import re
+from collections import namedtuple
+
+from lexer import KIND
+from nodes import Node, NodeRef, format_stmt
+
+# Whitespace inside statement arguments, outside string literals: dropped
+# next to punctuation, otherwise collapsed to one space.
+SPACING_RE = re.compile(r'("[^"]*")|\s*([(),=+\-*/<>@:.;→])\s*|\s+')
+BLOCK_KIND, END_KIND = bytes([KIND["BLOCK"]]), bytes([KIND["END"]])
+
+# block is 1-based; span is (line, col, end line, end col) or None
+Mismatch = namedtuple("Mismatch", "block above below span")
+
+def normalize_arg(text):
+    return SPACING_RE.sub(lambda m: m.group(1) or m.group(2) or " ", text)
+
+def section_values(block):
+    """(Above, Below) statement values of a Block; arena Blocks are read
+    straight from the handle arrays."""
+    if isinstance(block, NodeRef):
+        arena = block.arena
+        pool, values, children = arena.pool, arena.values, arena.child_handles
+        _, above, below = children(block.h)
+        return (tuple([pool[values[h]] for h in children(above)]),
+                tuple([pool[values[h]] for h in children(below)]))
+    _, above, below = block.children
+    return tuple([s.value for s in above.children]), tuple([s.value for s in below.children])
+
+class SymmetryEngine:
+    """Bulk Above/Below check for any number of Blocks.
+
+    Each section's statement values are interned to a small integer, so the
+    per-Block check is one int compare; the intern dict only compares the
+    statements themselves when two hashes are equal. Sections with different
+    ids are compared again in normalized form (argument spacing ignored)
+    before a Block counts as a mismatch. Ids and normal forms are shared by
+    every batch the engine checks.
+    """
+
+    def __init__(self):
+        self.ids = {}     # section statement values -> id
+        self.forms = {}   # id -> normalized statement values
+
+    def normal_form(self, section_id, values):
+        form = self.forms.get(section_id)
+        if form is None:
+            form = self.forms[section_id] = tuple((verb, tuple(normalize_arg(a) for a in args)) for verb, args in values)
+        return form
+
+    def check(self, blocks, start=0):
+        """Mismatches among blocks, numbered from start + 1."""
+        ids = self.ids
+        above, below = [], []
+        for block in blocks:
+            a, b = section_values(block)
+            above.append(ids.setdefault(a, len(ids)))
+            below.append(ids.setdefault(b, len(ids)))
+        mismatches = []
+        for i, (above_id, below_id) in enumerate(zip(above, below)):
+            if above_id == below_id:
+                continue
+            a, b = section_values(blocks[i])
+            if self.normal_form(above_id, a) != self.normal_form(below_id, b):
+                _, a, b = blocks[i].children
+                mismatches.append(Mismatch(start + i + 1, " ".join(map(format_stmt, a.children)),
+                                           " ".join(map(format_stmt, b.children)), None))
+        return mismatches
+
+    def correct(self, blocks, start=0):
+        """check(), then canonicalize each mismatched Block's Above to its Below in place."""
+        mismatches = self.check(blocks, start)
+        for m in mismatches:
+            _, above, below = blocks[m.block - start - 1].children
+            above.children = [Node(s.kind, s.value) for s in below.children]
+        return mismatches
+
+def block_spans(tokens, numbers):
+    """{n: (line, col, end line, end col)} for the 1-based Block numbers in
+    numbers, located in the TokenStream the Program was parsed from."""
+    kinds, buf = tokens.kinds.tobytes(), tokens.buf.obj
+    spans, n, i = {}, 0, -1
+    line, counted = 1, 0
+
+    def locate(offset):
+        nonlocal line, counted
+        line += buf.count(b"\n", counted, offset)
+        counted = offset
+        return line, offset - buf.rfind(b"\n", 0, offset)
+
+    for want in sorted(set(numbers)):
+        while n < want:
+            i = kinds.find(BLOCK_KIND, i + 1)
+            if i < 0:
+                return spans
+            n += 1
+        ends = [j for j in (kinds.find(BLOCK_KIND, i + 1), kinds.find(END_KIND, i + 1)) if j >= 0]
+        last = (min(ends) if ends else len(kinds)) - 1
+        spans[want] = locate(tokens.starts[i]) + locate(tokens.ends[last])
+    return spans
+
 def entangle_correction(block_node):
     """Correct Above/Below mismatches via canonicalization."""
-    eq, above, below = block_node.children
-    if above.value[1] != below.value[1]:
-        # canonicalize to Below
-        corrected = below.value[1]
-        above.value = (above.value[0], corrected)
+    SymmetryEngine().correct([block_node])
     return block_node
+
+def correct_program(ast, tokens=None, mismatches=None):
+    """The S.E.R.A.P. pass the compiler runs between parsing and lowering, over
+    every Block. Every stage that reproduces a letter's AST (build, verify) goes
+    through here.
+
+    Pass a list as mismatches to collect a Mismatch per corrected Block, with
+    its source span when tokens (the Program's TokenStream) is given.
+    """
+    found = SymmetryEngine().correct([c for c in ast.children if c.kind == "Block"])
+    if mismatches is not None:
+        spans = block_spans(tokens, [m.block for m in found]) if tokens is not None and found else {}
+        mismatches.extend(m._replace(span=spans.get(m.block)) for m in found)
+    return ast
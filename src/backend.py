@@ -0,0 +1,76 @@
+import time
+from llvmlite import binding as llvm
+
+_native_ready = False
+# opt level -> TargetMachine, built once per process and reused across compiles
+_target_machines = {}
+
+def init_native():
+    """Initialize the native target and asm printer once per process."""
+    global _native_ready
+    if not _native_ready:
+        llvm.initialize_native_target()
+        llvm.initialize_native_asmprinter()
+        _native_ready = True
+
+def create_target_machine(opt_level=0):
+    if opt_level not in _target_machines:
+        init_native()
+        target = llvm.Target.from_default_triple()
+        _target_machines[opt_level] = target.create_target_machine(opt=opt_level, reloc="pic", codemodel="default")
+    return _target_machines[opt_level]
+
+def optimize(mod, target_machine, opt_level):
+    """Run LLVM's default O<opt_level> module pipeline in place."""
+    if opt_level <= 0:
+        return
+    pto = llvm.create_pipeline_tuning_options(speed_level=opt_level)
+    pass_builder = llvm.create_pass_builder(target_machine, pto)
+    pass_builder.getModulePassManager().run(mod, pass_builder)
+
+class Timings:
+    """Wall time per compiler stage, in the order the stages ran. With a
+    phases.Profiler each stage is also recorded there as an "llvm ..." phase."""
+
+    def __init__(self, profiler=None):
+        self.stages = []
+        self.profiler = profiler
+
+    def stage(self, name, fn, *args):
+        t0 = time.perf_counter()
+        if self.profiler is not None:
+            with self.profiler.phase(f"llvm {name}"):
+                result = fn(*args)
+        else:
+            result = fn(*args)
+        self.stages.append((name, time.perf_counter() - t0))
+        return result
+
+    def __str__(self):
+        return ", ".join(f"{name} {secs * 1000:.1f}ms" for name, secs in self.stages)
+
+def compile_ir(ir_code, opt_level=0, target_machine=None, timings=None):
+    """Parse, verify and optimize LLVM IR in-process; returns the ModuleRef."""
+    timings = timings if timings is not None else Timings()
+    target_machine = target_machine or create_target_machine(opt_level)
+    mod = timings.stage("parse", llvm.parse_assembly, ir_code)
+    timings.stage("verify", mod.verify)
+    mod.triple = target_machine.triple
+    mod.data_layout = str(target_machine.target_data)
+    timings.stage(f"optimize O{opt_level}", optimize, mod, target_machine, opt_level)
+    return mod
+
+def emit(mod, target_machine, obj_file, asm_file=None, bc_file=None, timings=None):
+    """Write the object file (and optionally assembly/bitcode) straight from memory."""
+    timings = timings if timings is not None else Timings()
+    obj = timings.stage("emit-object", target_machine.emit_object, mod)
+    with open(obj_file, "wb") as f:
+        f.write(obj)
+    if asm_file:
+        asm = timings.stage("emit-assembly", target_machine.emit_assembly, mod)
+        with open(asm_file, "w") as f:
+            f.write(asm)
+    if bc_file:
+        with open(bc_file, "wb") as f:
+            f.write(timings.stage("emit-bitcode", mod.as_bitcode))
+    return timings
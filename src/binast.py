@@ -0,0 +1,170 @@
+"""Binary AST files (`--emit-ast=bin`) and their memory-mapped loader.
+
+The file is an Arena laid out flat, little-endian, every section padded to
+4 bytes:
+
+    header       magic, n_kinds, n_strings, n_values, n_nodes, root
+    kinds        u32 string index per kind id (the node-kind enum)
+    strings      u32 offsets[n_strings + 1], then the UTF-8 blob
+    values       u32 offsets[n_values] into a u32 word blob; a value is
+                 [1, string] or [2, count, value...], value 0 is None
+    nodes        u8 kind[n], u32 value[n], i32 first_child[n], i32 next_sibling[n]
+
+load() maps the file and returns a NodeRef over it: node columns are
+memoryviews straight into the mapping and values and strings are decoded
+on first access, so opening a large letter costs a header read.
+"""
+import mmap
+import struct
+from array import array
+
+from nodes import NIL, Arena, NodeRef
+
+MAGIC = b"LTRAST01"
+HEADER = struct.Struct("<8s5I")
+STR, TUPLE = 1, 2
+
+def pad4(buf):
+    buf.extend(b"\0" * (-len(buf) % 4))
+
+def dumps(node):
+    """Binary image of the tree under node (a Node or a NodeRef).
+
+    A NodeRef's arena is written as is, nodes outside the tree included;
+    Node trees are packed into a fresh Arena first.
+    """
+    if isinstance(node, NodeRef) and not isinstance(node.arena, MappedArena):
+        arena, root = node.arena, node.h
+    else:
+        arena = Arena()
+        root = arena.adopt(node)
+
+    strings, string_ids = [], {}
+    def string(s):
+        idx = string_ids.get(s)
+        if idx is None:
+            idx = string_ids[s] = len(strings)
+            strings.append(s.encode())
+        return idx
+
+    words, value_offsets = array("I"), array("I", [0])
+    def encode(value):
+        if isinstance(value, tuple):
+            words.extend((TUPLE, len(value)))
+            for v in value:
+                encode(v)
+        else:
+            words.extend((STR, string(value)))
+    for value in arena.pool[1:]:
+        value_offsets.append(len(words))
+        encode(value)
+
+    kinds = array("I", [string(k) for k in arena.kind_names])
+    string_offsets, pos = array("I"), 0
+    for s in strings:
+        string_offsets.append(pos)
+        pos += len(s)
+    string_offsets.append(pos)
+
+    out = bytearray(HEADER.pack(MAGIC, len(kinds), len(strings), len(value_offsets), len(arena), root))
+    out += kinds.tobytes()
+    out += string_offsets.tobytes()
+    out += b"".join(strings)
+    pad4(out)
+    out += value_offsets.tobytes()
+    out += struct.pack("<I", len(words))
+    out += words.tobytes()
+    out += arena.kinds.tobytes()
+    pad4(out)
+    for column in (arena.values, arena.first_child, arena.next_sibling):
+        out += column.tobytes()
+    return bytes(out)
+
+def dump(node, path):
+    with open(path, "wb") as f:
+        f.write(dumps(node))
+
+class LazyValues:
+    """The value pool of a mapped file, decoded one entry at a time."""
+
+    def __init__(self, arena, offsets, words):
+        self.arena = arena
+        self.offsets = offsets
+        self.words = words
+        self.decoded = {0: None}
+
+    def __getitem__(self, idx):
+        try:
+            return self.decoded[idx]
+        except KeyError:
+            value = self.decoded[idx] = self.decode(self.offsets[idx])[0]
+            return value
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def decode(self, pos):
+        words = self.words
+        if words[pos] == STR:
+            return self.arena.string(words[pos + 1]), pos + 2
+        count, pos = words[pos + 1], pos + 2
+        items = []
+        for _ in range(count):
+            item, pos = self.decode(pos)
+            items.append(item)
+        return tuple(items), pos
+
+class MappedArena(Arena):
+    """A read-only Arena over a memory-mapped binary AST file."""
+
+    def __init__(self, buf):
+        self.buf = memoryview(buf)
+        magic, n_kinds, n_strings, n_values, n_nodes, self.root = HEADER.unpack_from(self.buf)
+        if magic != MAGIC:
+            raise ValueError("not a binary Lettera AST")
+        pos = HEADER.size
+
+        def column(fmt, n, size=4):
+            nonlocal pos
+            view = self.buf[pos:pos + n * size].cast(fmt)
+            pos += n * size
+            return view
+
+        kind_strings = column("I", n_kinds)
+        self.string_offsets = column("I", n_strings + 1)
+        self.blob = self.buf[pos:pos + self.string_offsets[-1]]
+        pos += self.string_offsets[-1] + (-self.string_offsets[-1] % 4)
+        value_offsets = column("I", n_values)
+        words = column("I", struct.unpack_from("<I", self.buf, pos)[0] + 1)[1:]
+        self.kinds = column("B", n_nodes, 1)
+        pos += -pos % 4
+        self.values = column("I", n_nodes)
+        self.first_child = column("i", n_nodes)
+        self.next_sibling = column("i", n_nodes)
+
+        self.strings = {}
+        self.kind_names = [self.string(i) for i in kind_strings]
+        self.kind_ids = {k: i for i, k in enumerate(self.kind_names)}
+        self.pool = LazyValues(self, value_offsets, words)
+
+    def string(self, idx):
+        s = self.strings.get(idx)
+        if s is None:
+            s = self.strings[idx] = str(self.blob[self.string_offsets[idx]:self.string_offsets[idx + 1]], "utf-8")
+        return s
+
+    def add(self, kind, value=None, children=()):
+        raise TypeError("a mapped AST is read-only; detach() it to edit")
+
+    def intern(self, value):
+        raise TypeError("a mapped AST is read-only; detach() it to edit")
+
+def loads(buf):
+    """Root NodeRef of a binary AST held in buf (bytes, mmap, ...)."""
+    arena = MappedArena(buf)
+    return NodeRef(arena, arena.root) if arena.root != NIL else None
+
+def load(path):
+    """Map path and return its root NodeRef; nodes materialize as they are visited."""
+    with open(path, "rb") as f:
+        return loads(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
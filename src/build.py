@@ -0,0 +1,189 @@
+"""`lettera build <dir|glob>`: compile many letters in one run.
+
+Files are ordered by their `Import "..."` directives, as the parser reads
+them (through the module cache), so a library is built before the letters
+that import it, and compiled on a process pool whose workers each keep one
+LLVM target machine, compile cache and parsed-module cache for every file
+they are handed. Outputs mirror the input tree under --out-dir.
+"""
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from backend import compile_ir, create_target_machine, emit
+from cache import CompileCache
+from irgen import generate_ir
+from main import front_end
+from modules import ModuleCache, resolve
+from nodes import Arena
+
+DEFAULT_OUT_DIR = "out"
+
+# Per-worker state, set up once by init_worker
+_opt_level = 0
+_cache = None
+_modules = None
+_root = None
+
+def discover(target):
+    """Absolute paths of the .let files under a directory, or matching a glob."""
+    if os.path.isdir(target):
+        paths = glob.glob(os.path.join(target, "**", "*.let"), recursive=True)
+    else:
+        paths = glob.glob(target, recursive=True)
+    return sorted(os.path.abspath(p) for p in paths if p.endswith(".let") and os.path.isfile(p))
+
+def dependency_graph(files, root, modules):
+    """path -> set of paths it imports (only those being built), plus unresolved
+    imports and files that do not parse. Import names come from the parsed
+    letter (modules.load), as main sees them, and resolve against the usual
+    search path with the build root added."""
+    building = set(files)
+    deps, missing, broken = {}, {}, {}
+    for path in files:
+        deps[path] = set()
+        try:
+            names = modules.load(path).imports
+        except SyntaxError as e:
+            broken[path] = f"SyntaxError: {e}"
+            continue
+        for name in names:
+            dep = resolve(name, path, extra=(root,))
+            if dep is None:
+                missing.setdefault(path, []).append(name)
+            elif dep in building and dep != path:
+                deps[path].add(dep)
+    return deps, missing, broken
+
+def output_base(path, root, out_dir):
+    return os.path.join(out_dir, os.path.splitext(os.path.relpath(path, root))[0])
+
+def init_worker(opt_level, use_cache, root):
+    global _opt_level, _cache, _modules, _root
+    _opt_level = opt_level
+    _cache = CompileCache() if use_cache else None
+    _modules = ModuleCache() if use_cache else ModuleCache(path=None)
+    _root = root
+    create_target_machine(opt_level)
+
+def compile_file(path, out_base):
+    """Lex, parse, lower and emit one letter to out_base.ll / out_base.o."""
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    ast, libraries = front_end(source, path, _modules, (_root,), Arena())
+    ir_code = generate_ir(ast, cache=_cache, libraries=libraries)
+
+    os.makedirs(os.path.dirname(out_base) or ".", exist_ok=True)
+    with open(out_base + ".ll", "w") as f:
+        f.write(ir_code)
+    target_machine = create_target_machine(_opt_level)
+    emit(compile_ir(ir_code, _opt_level, target_machine), target_machine, out_base + ".o")
+    return out_base + ".o"
+
+def build(target, out_dir=DEFAULT_OUT_DIR, jobs=None, opt_level=0, use_cache=True):
+    """Compile every letter under target in import order; returns (built, failed, skipped)."""
+    files = discover(target)
+    if not files:
+        print(f"[Lettera] No .let files match {target}")
+        return [], {}, []
+    root = os.path.abspath(target) if os.path.isdir(target) else os.path.commonpath([os.path.dirname(p) for p in files])
+    # parsed here once; forked workers and the disk cache reuse the result
+    modules = ModuleCache() if use_cache else ModuleCache(path=None)
+    deps, missing, broken = dependency_graph(files, root, modules)
+    dependents = {path: [] for path in files}
+    for path, ds in deps.items():
+        for dep in ds:
+            dependents[dep].append(path)
+
+    built, failed, skipped = [], {}, []
+    for path, names in missing.items():
+        failed[path] = f"unresolved Import {', '.join(names)}"
+    failed.update(broken)
+    waiting = {path: len(ds) for path, ds in deps.items() if path not in failed}
+    ready = [path for path, n in waiting.items() if n == 0]
+
+    def finish(path, error=None):
+        """Record path's result and release (or skip) the files waiting on it."""
+        stack = [(path, error)]
+        while stack:
+            path, error = stack.pop()
+            if error is None:
+                built.append(path)
+            elif path not in failed:
+                failed[path] = error
+            for dependent in dependents[path]:
+                if dependent not in waiting:
+                    continue
+                if error is not None:
+                    del waiting[dependent]
+                    skipped.append(dependent)
+                    stack.append((dependent, f"dependency {os.path.relpath(path, root)} failed"))
+                    continue
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    ready.append(dependent)
+
+    for path in failed.copy():
+        waiting.pop(path, None)
+        finish(path, failed[path])
+
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(opt_level, use_cache, root))
+        running = {}
+        with executor:
+            while ready or running:
+                while ready:
+                    path = ready.pop()
+                    del waiting[path]
+                    running[executor.submit(compile_file, path, output_base(path, root, out_dir))] = path
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = running.pop(future)
+                    error = future.exception()
+                    finish(path, None if error is None else f"{type(error).__name__}: {error}")
+    else:
+        init_worker(opt_level, use_cache, root)
+        while ready:
+            path = ready.pop()
+            del waiting[path]
+            try:
+                compile_file(path, output_base(path, root, out_dir))
+            except Exception as e:
+                finish(path, f"{type(e).__name__}: {e}")
+            else:
+                finish(path)
+    elapsed = time.perf_counter() - start
+
+    # Whatever is still waiting sits on an import cycle
+    for path in waiting:
+        failed[path] = "import cycle"
+    for path, error in sorted(failed.items()):
+        if path not in skipped:
+            print(f"[Lettera] FAILED {os.path.relpath(path, root)}: {error}")
+    for path in sorted(skipped):
+        print(f"[Lettera] SKIPPED {os.path.relpath(path, root)}: {failed[path]}")
+    rate = len(built) / elapsed if elapsed > 0 else 0.0
+    print(f"[Lettera] Built {len(built)}/{len(files)} files → {out_dir} "
+          f"({len(failed) - len(skipped)} failed, {len(skipped)} skipped) "
+          f"in {elapsed:.2f}s, {rate:.1f} files/s, jobs={jobs}")
+    return built, failed, skipped
+
+def main(args):
+    from main import option_value
+    if not args or args[0].startswith("-"):
+        print("Usage: lettera build <dir|glob> [--out-dir D] [-j N] [--opt-level=N] [--no-cache]")
+        return 1
+    jobs = option_value(args, "-j", option_value(args, "--jobs", None))
+    _, failed, _ = build(args[0],
+                         out_dir=option_value(args, "--out-dir", DEFAULT_OUT_DIR),
+                         jobs=int(jobs) if jobs else None,
+                         opt_level=int(option_value(args, "--opt-level", "0")),
+                         use_cache="--no-cache" not in args)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
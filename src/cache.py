@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+
+CACHE_DIR = ".lettera-cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# The lowering code, hashed by path so that the front end (which imports this
+# module through modules) does not pull in irgen and llvmlite
+LOWERING_SOURCES = [os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                    for name in ("irgen.py", "expr.py", "commands.py")]
+
+def compiler_tag(*modules):
+    """Hash of the code that produced an entry (by default the lowering code),
+    so entries from another compiler build never match."""
+    digest = hashlib.sha256()
+    for path in [module.__file__ for module in modules] or LOWERING_SOURCES:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+class CompileCache:
+    """On-disk store of lowered Block fragments keyed by Block content hash.
+
+    Entries are JSON files named <compiler tag>-<key> holding a fragment's
+    IR text and pooled strings; a hit refreshes the file's mtime and the
+    least recently used entries (including those left behind by older
+    compilers) are evicted once the total size passes max_bytes.
+    """
+
+    def __init__(self, path=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.tag = compiler_tag()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.path, exist_ok=True)
+        # entry name -> (last use, size)
+        self.entries = {}
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".json"):
+                st = entry.stat()
+                self.entries[entry.name[:-5]] = (st.st_mtime, st.st_size)
+        self.size = sum(size for _, size in self.entries.values())
+
+    def file(self, name):
+        return os.path.join(self.path, name + ".json")
+
+    def get(self, key):
+        from irgen import Fragment
+        key = f"{self.tag}-{key}"
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        try:
+            with open(self.file(key), "r", encoding="utf-8") as f:
+                fragment = Fragment(*json.load(f))
+            os.utime(self.file(key))
+        except (OSError, ValueError, TypeError):
+            self.forget(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries[key] = (os.path.getmtime(self.file(key)), self.entries[key][1])
+        return fragment
+
+    def put(self, key, fragment):
+        key = f"{self.tag}-{key}"
+        data = json.dumps(list(fragment)).encode("utf-8")
+        tmp = self.file(key) + f".{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.file(key))
+        self.forget(key)
+        self.entries[key] = (os.path.getmtime(self.file(key)), len(data))
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def forget(self, key):
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+
+    def evict(self):
+        for key, _ in sorted(self.entries.items(), key=lambda e: e[1][0]):
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(self.file(key))
+            except OSError:
+                pass
+            self.forget(key)
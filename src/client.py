@@ -0,0 +1,56 @@
+"""Thin client for the `lettera serve` compile daemon.
+
+Takes the same arguments as main.py and forwards them, with the working
+directory and environment, over the daemon's Unix socket. If no daemon
+is listening it compiles in-process instead. It deliberately imports
+nothing from the compiler so that it starts quickly.
+"""
+import json
+import os
+import socket
+import sys
+
+EXIT_MARKER = b"\0LETTERA-EXIT "
+
+def socket_path():
+    if os.environ.get("LETTERA_SOCKET"):
+        return os.environ["LETTERA_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+    return os.path.join(runtime_dir, f"lettera-{os.getuid()}.sock")
+
+def request(argv, path=None, out=None):
+    """Run one compile on the daemon, streaming its output to out; returns the exit code."""
+    out = out or sys.stdout.buffer
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path or socket_path())
+    with sock:
+        payload = {"argv": list(argv), "cwd": os.getcwd(), "env": dict(os.environ)}
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        tail = b""
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data = tail + chunk
+            # Hold back enough bytes to never split the exit marker across writes
+            keep = len(EXIT_MARKER) + 8
+            out.write(data[:-keep])
+            tail = data[-keep:]
+        out.flush()
+    body, marker, code = tail.partition(EXIT_MARKER)
+    out.write(body)
+    out.flush()
+    return int(code.strip() or 1) if marker else 1
+
+def main():
+    try:
+        code = request(sys.argv[1:])
+    except (FileNotFoundError, ConnectionRefusedError):
+        import main as lettera
+        sys.argv = ["lettera"] + sys.argv[1:]
+        lettera.main()
+        return
+    sys.exit(code)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""DJ commands: which runtime function a statement such as
+`Crossfade(8s, "linear");` lowers to, and what its arguments must be.
+
+A letter's registry is filled from the libraries it imports (see
+modules.load_imports). A field declaration such as `BPM = <number>` is a
+command taking one argument of that type; a command declaration such as
+`Crossfade = (Duration, Type)` types its parameters by name (PARAM_TYPES, a
+string unless listed). Only commands a runtime implements are registered:
+other statements lower to nothing, as they always have.
+
+Commands are keyed by (name, arity), so djtransitions' simulated
+`Crossfade(Duration, Type)` and djaudio's `Crossfade(FileA, FileB, Duration)`
+are overloads of one name; a later import overrides an earlier one with the
+same arity. Each runtime function has one name per signature (the audio
+runtime's are dj_audio_*), and runtime_sources picks the runtimes to link
+from the functions a module calls, so a letter never links against a
+function with another signature.
+"""
+import os
+from collections import namedtuple
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# command -> the function it calls in the simulated runtime (dj_runtime.c)
+RUNTIME = {
+    "BPM": "dj_bpm", "Key": "dj_key", "Energy": "dj_energy", "Genre": "dj_genre",
+    "Crossfade": "dj_crossfade", "Filter": "dj_filter", "Loop": "dj_loop", "Drop": "dj_drop",
+    "Playlist": "dj_playlist", "Order": "dj_order", "RecordSet": "dj_record",
+    "SealSet": "dj_seal", "Log": "dj_log",
+}
+# djaudio.let's commands -> the real audio runtime (dj_runtime_audio.c)
+AUDIO_RUNTIME = {
+    "Play": "dj_audio_play", "Crossfade": "dj_audio_crossfade", "Filter": "dj_audio_filter",
+    "Loop": "dj_audio_loop", "Drop": "dj_audio_drop",
+}
+# library file name -> its runtime functions, when not RUNTIME's
+LIBRARY_RUNTIMES = {"djaudio.let": AUDIO_RUNTIME}
+# (function name prefix, source, link flags) of the runtimes beyond dj_runtime.c
+EXTRA_RUNTIMES = [("dj_audio_", "dj_runtime_audio.c", ("-lsndfile", "-lportaudio", "-lm"))]
+# parameter name -> argument type; any other parameter is a string
+PARAM_TYPES = {"Duration": "seconds", "Length": "i32", "Count": "i32", "Intensity": "i32",
+               "Start": "i32", "Repeat": "i32", "Port": "i32"}
+# field type (`<number>`) -> argument type; a range such as `<1-10>` is a bounded i32
+FIELD_TYPES = {"number": "i32", "string": "str", "seconds": "seconds"}
+
+# types are argument types: "i32", "str", "seconds" ("8s" or 8) or a range "lo-hi";
+# a variadic command's trailing "Name..." parameter is accepted but not passed
+Command = namedtuple("Command", "name params types extern")
+
+def abi(command):
+    """The runtime function's parameter types: "str" (i8*) or "i32"."""
+    return tuple("str" if t == "str" else "i32" for t in command.types)
+
+def convert(command, args):
+    """args (statement argument text) as the values the runtime is called
+    with: ints and strings. ValueError names the parameter that is wrong."""
+    values = []
+    for param, typ, arg in zip(command.params, command.types, args):
+        what = command.name if param == command.name else f"{command.name}: {param}"
+        if typ == "str":
+            values.append(arg.strip('"'))
+            continue
+        text = arg[:-1] if typ == "seconds" and arg.endswith("s") else arg
+        try:
+            n = int(text)
+        except ValueError:
+            kind = "a duration" if typ == "seconds" else "a number"
+            raise ValueError(f"{what} must be {kind}, got {arg}") from None
+        if "-" in typ:
+            lo, hi = map(int, typ.split("-"))
+            if not lo <= n <= hi:
+                raise ValueError(f"{what} must be from {lo} to {hi}, got {arg}")
+        values.append(n)
+    return values
+
+def block_calls(block, reg):
+    """"Verb/arity" -> the Command each of a Block's DJ statements calls in
+    reg, with every statement's arguments checked. ValueError, naming the
+    Block, for a wrong arity or argument."""
+    calls = {}
+    for stmt in block.children[2].children:
+        verb, args = stmt.value
+        if verb.lower() == "print":
+            continue
+        try:
+            command = reg.lookup(verb, len(args))
+            if command is not None:
+                convert(command, args)
+        except ValueError as e:
+            raise ValueError(f"Block {block.children[0].value[0]}: {e}") from None
+        if command is not None:
+            calls[f"{verb}/{len(args)}"] = command
+    return calls
+
+def runtime_sources(ir_code):
+    """(C sources, link flags) of the runtimes the functions in ir_code need:
+    always dj_runtime.c (dj_write and the simulated commands), plus each
+    extra runtime whose functions are called."""
+    sources, flags = [os.path.join(SRC_DIR, "dj_runtime.c")], []
+    for prefix, source, libs in EXTRA_RUNTIMES:
+        if f'@"{prefix}' in ir_code:
+            sources.append(os.path.join(SRC_DIR, source))
+            flags += libs
+    return sources, flags
+
+class Registry:
+    """Commands by (name, arity), for O(1) dispatch while lowering."""
+    def __init__(self):
+        self.commands = {}   # (name, arity) -> Command
+        self.variadic = {}   # name -> Command that takes extra arguments
+        self.arities = {}    # name -> arities accepted, for error messages
+
+    def add(self, decl, runtime=RUNTIME):
+        """Register a modules.Declaration if runtime implements it, replacing
+        any command of the same name and arity."""
+        extern = runtime.get(decl.name)
+        if extern is None:
+            return
+        if decl.params is None:
+            params = (decl.name,)
+            types = (FIELD_TYPES.get(decl.type, decl.type if "-" in decl.type else "str"),)
+        else:
+            params = tuple(p for p in decl.params if not p.endswith("..."))
+            types = tuple(PARAM_TYPES.get(p, "str") for p in params)
+        command = Command(decl.name, params, types, extern)
+        self.commands[(decl.name, len(params))] = command
+        if decl.params is not None and len(params) < len(decl.params):
+            self.variadic[decl.name] = command
+        self.arities.setdefault(decl.name, set()).add(len(params))
+
+    def lookup(self, name, arity):
+        """The Command a statement calls, or None for one the runtime does not
+        implement. ValueError when the name is known but the arity is not."""
+        command = self.commands.get((name, arity))
+        if command is not None:
+            return command
+        if name not in self.arities:
+            return None
+        command = self.variadic.get(name)
+        if command is not None and arity >= len(command.params):
+            return command
+        expected = " or ".join(str(n) for n in sorted(self.arities[name]))
+        raise ValueError(f"{name} takes {expected} arguments, got {arity}")
+
+# (library file name, digest) of each library -> Registry
+_registries = {}
+
+def registry(libraries):
+    """The Registry for libraries (modules.Library, in import order), built
+    once per process for each distinct set."""
+    key = tuple((os.path.basename(lib.path), lib.digest) for lib in libraries)
+    reg = _registries.get(key)
+    if reg is None:
+        reg = _registries[key] = Registry()
+        for library in libraries:
+            runtime = LIBRARY_RUNTIMES.get(os.path.basename(library.path), RUNTIME)
+            for decl in library.declarations:
+                reg.add(decl, runtime)
+    return reg
@@ -1,3 +1,4 @@
+#include <stdint.h>
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
@@ -57,3 +58,9 @@ void dj_seal(const char *hash) {
 void dj_log(const char *event) {
     printf("[DJ] Event: %s\n", event);
 }
+
+// Coalesced Print output: one stdio write for a run of known text; len is
+// the IR's i64 on every target (long is 32 bits on LLP64 Windows)
+void dj_write(const char *buf, int64_t len) {
+    fwrite(buf, 1, (size_t)len, stdout);
+}
@@ -5,13 +5,17 @@
 #include <sndfile.h>
 #include <math.h>
 
-// Track buffer
+// dj_audio_* are djaudio.let's commands; they are linked together with
+// dj_runtime.c, which provides dj_write and the simulated commands.
+
+// Track buffer: samples holds frames * channels interleaved floats; frame
+// counts (what PortAudio's Pa_WriteStream takes) come from info.frames
 typedef struct {
     SNDFILE *file;
     SF_INFO info;
     float *buffer;
-    int frames;
-    int position;
+    long samples;
+    long position;
 } Track;
 
 Track* load_track(const char *filename) {
@@ -23,27 +27,48 @@ Track* load_track(const char *filename) {
         free(t);
         return NULL;
     }
-    t->frames = t->info.frames * t->info.channels;
-    t->buffer = malloc(sizeof(float) * t->frames);
+    t->samples = (long)t->info.frames * t->info.channels;
+    t->buffer = malloc(sizeof(float) * t->samples);
     sf_readf_float(t->file, t->buffer, t->info.frames);
     sf_close(t->file);
     t->position = 0;
     return t;
 }
 
+void free_track(Track *t) {
+    free(t->buffer);
+    free(t);
+}
+
+// Play frames of interleaved audio (frames * channels floats) repeat times
+void play_frames(const float *buffer, long frames, int repeat, int channels, int samplerate) {
+    Pa_Initialize();
+    PaStream *stream;
+    Pa_OpenDefaultStream(&stream, 0, channels,
+                         paFloat32, samplerate,
+                         512, NULL, NULL);
+    Pa_StartStream(stream);
+    for (int r = 0; r < repeat; r++) {
+        Pa_WriteStream(stream, buffer, frames);
+    }
+    Pa_StopStream(stream);
+    Pa_CloseStream(stream);
+    Pa_Terminate();
+}
+
 // Low-pass filter (simple 1-pole IIR)
-void lowpass_filter(float *buffer, int frames, float alpha) {
+void lowpass_filter(float *buffer, long samples, float alpha) {
     float prev = buffer[0];
-    for (int i = 1; i < frames; i++) {
+    for (long i = 1; i < samples; i++) {
         buffer[i] = alpha * buffer[i] + (1 - alpha) * prev;
         prev = buffer[i];
     }
 }
 
 // High-pass filter
-void highpass_filter(float *buffer, int frames, float alpha) {
+void highpass_filter(float *buffer, long samples, float alpha) {
     float prev_in = buffer[0], prev_out = buffer[0];
-    for (int i = 1; i < frames; i++) {
+    for (long i = 1; i < samples; i++) {
         float out = alpha * (prev_out + buffer[i] - prev_in);
         buffer[i] = out;
         prev_in = buffer[i];
@@ -52,85 +77,102 @@ void highpass_filter(float *buffer, int frames, float alpha) {
 }
 
 // EQ (3-band simple)
-void eq_apply(float *buffer, int frames, float bass, float mid, float treble) {
-    for (int i = 0; i < frames; i++) {
+void eq_apply(float *buffer, long samples, float bass, float mid, float treble) {
+    for (long i = 0; i < samples; i++) {
         float x = buffer[i];
         buffer[i] = (bass * 0.4f + mid * 0.4f + treble * 0.2f) * x;
     }
 }
 
 // Loop a segment
-void dj_loop(const char *filename, int start_sec, int length_sec, int repeat) {
+void dj_audio_loop(const char *filename, int start_sec, int length_sec, int repeat) {
     Track *t = load_track(filename);
     if (!t) return;
-    int start = start_sec * t->info.samplerate;
-    int length = length_sec * t->info.samplerate;
-    if (start + length > t->frames) length = t->frames - start;
-
-    Pa_Initialize();
-    PaStream *stream;
-    Pa_OpenDefaultStream(&stream, 0, t->info.channels,
-                         paFloat32, t->info.samplerate,
-                         512, NULL, NULL);
-    Pa_StartStream(stream);
+    // in frames
+    long start = (long)start_sec * t->info.samplerate;
+    long length = (long)length_sec * t->info.samplerate;
+    if (start > t->info.frames) start = t->info.frames;
+    if (start + length > t->info.frames) length = t->info.frames - start;
 
-    for (int r = 0; r < repeat; r++) {
-        Pa_WriteStream(stream, &t->buffer[start], length);
-    }
-
-    Pa_StopStream(stream);
-    Pa_CloseStream(stream);
-    Pa_Terminate();
+    play_frames(&t->buffer[start * t->info.channels], length, repeat,
+                t->info.channels, t->info.samplerate);
 
-    free(t->buffer); free(t);
+    free_track(t);
     printf("[DJ] Loop %d sec from %d s, repeated %d times\n", length_sec, start_sec, repeat);
 }
 
 // Drop effect (bass emphasis)
-void dj_drop(const char *filename, int intensity) {
+void dj_audio_drop(const char *filename, int intensity) {
     Track *t = load_track(filename);
     if (!t) return;
 
     // simple bass boost: scale low freqs
-    for (int i = 0; i < t->frames; i++) {
+    for (long i = 0; i < t->samples; i++) {
         t->buffer[i] *= (1.0f + intensity * 0.1f);
     }
+    play_frames(t->buffer, t->info.frames, 1, t->info.channels, t->info.samplerate);
 
-    Pa_Initialize();
-    PaStream *stream;
-    Pa_OpenDefaultStream(&stream, 0, t->info.channels,
-                         paFloat32, t->info.samplerate,
-                         512, NULL, NULL);
-    Pa_StartStream(stream);
-    Pa_WriteStream(stream, t->buffer, t->frames);
-    Pa_StopStream(stream);
-    Pa_CloseStream(stream);
-    Pa_Terminate();
-
-    free(t->buffer); free(t);
+    free_track(t);
     printf("[DJ] Drop applied with intensity %d\n", intensity);
 }
 
 // Wrappers
-void dj_filter(const char *filename, const char *type, const char *param) {
+void dj_audio_filter(const char *filename, const char *type, const char *param) {
     Track *t = load_track(filename);
     if (!t) return;
     if (strcmp(type, "lowpass") == 0) {
-        lowpass_filter(t->buffer, t->frames, atof(param));
+        lowpass_filter(t->buffer, t->samples, atof(param));
         printf("[DJ] Low-pass filter applied alpha=%s\n", param);
     } else if (strcmp(type, "highpass") == 0) {
-        highpass_filter(t->buffer, t->frames, atof(param));
+        highpass_filter(t->buffer, t->samples, atof(param));
         printf("[DJ] High-pass filter applied alpha=%s\n", param);
     }
-    Pa_Initialize();
-    PaStream *stream;
-    Pa_OpenDefaultStream(&stream, 0, t->info.channels,
-                         paFloat32, t->info.samplerate,
-                         512, NULL, NULL);
-    Pa_StartStream(stream);
-    Pa_WriteStream(stream, t->buffer, t->frames);
-    Pa_StopStream(stream);
-    Pa_CloseStream(stream);
-    Pa_Terminate();
-    free(t->buffer); free(t);
+    play_frames(t->buffer, t->info.frames, 1, t->info.channels, t->info.samplerate);
+    free_track(t);
+}
+
+// Play a whole track
+void dj_audio_play(const char *filename) {
+    Track *t = load_track(filename);
+    if (!t) return;
+    play_frames(t->buffer, t->info.frames, 1, t->info.channels, t->info.samplerate);
+    free_track(t);
+    printf("[DJ] Played %s\n", filename);
+}
+
+// Crossfade: the end of a into the start of b over duration_sec (linear).
+// Both files must have the same channel count and sample rate.
+void dj_audio_crossfade(const char *a, const char *b, int duration_sec) {
+    Track *ta = load_track(a);
+    if (!ta) return;
+    Track *tb = load_track(b);
+    if (!tb) { free_track(ta); return; }
+    if (tb->info.channels != ta->info.channels || tb->info.samplerate != ta->info.samplerate) {
+        fprintf(stderr, "[DJ] Cannot crossfade %s (%d ch, %d Hz) into %s (%d ch, %d Hz)\n",
+                a, ta->info.channels, ta->info.samplerate, b, tb->info.channels, tb->info.samplerate);
+        free_track(ta); free_track(tb);
+        return;
+    }
+    int channels = ta->info.channels;
+    // in frames
+    long fade = (long)duration_sec * ta->info.samplerate;
+    if (fade > ta->info.frames) fade = ta->info.frames;
+    if (fade > tb->info.frames) fade = tb->info.frames;
+
+    long frames = ta->info.frames + tb->info.frames - fade;
+    float *mix = malloc(sizeof(float) * frames * channels);
+    long start = (ta->info.frames - fade) * channels;
+    memcpy(mix, ta->buffer, sizeof(float) * start);
+    for (long i = 0; i < fade * channels; i++) {
+        // the gain steps once per frame, the same for every channel
+        float g = (float)(i / channels) / fade;
+        mix[start + i] = (1 - g) * ta->buffer[start + i] + g * tb->buffer[i];
+    }
+    memcpy(&mix[ta->samples], &tb->buffer[fade * channels], sizeof(float) * (tb->samples - fade * channels));
+    play_frames(mix, frames, 1, channels, ta->info.samplerate);
+
+    free(mix);
+    free_track(ta);
+    free_track(tb);
+    printf("[DJ] Crossfade %s -> %s over %d sec\n", a, b, duration_sec);
 }
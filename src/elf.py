@@ -0,0 +1,119 @@
+"""Minimal ELF64 section access for seals: read one section by name, or add
+(or replace) a non-loaded section in place.
+
+Only the section header table, .shstrtab and the section's bytes are
+touched; nothing else in the file is read or rewritten. Files this cannot
+handle (not ELF64, extended section numbering) raise ValueError.
+"""
+import mmap
+import os
+import struct
+
+ELF_MAGIC = b"\x7fELF"
+ELFCLASS64 = 2
+ELFDATA2LSB, ELFDATA2MSB = 1, 2
+SHT_PROGBITS = 1
+SHN_LORESERVE = 0xff00
+
+HEADER_FIELDS = "16sHHIQQQIHHHHHH"
+SECTION_FIELDS = "IIQQQQIIQQ"
+# offsets of e_shoff and e_shnum in the ELF64 header
+E_SHOFF, E_SHNUM = 40, 60
+
+class ElfFile:
+    """Parsed header and section table of an ELF64 image held in buf."""
+
+    def __init__(self, buf):
+        if len(buf) < 64 or buf[:4] != ELF_MAGIC:
+            raise ValueError("not an ELF file")
+        if buf[4] != ELFCLASS64:
+            raise ValueError("only ELF64 is supported")
+        if buf[5] not in (ELFDATA2LSB, ELFDATA2MSB):
+            raise ValueError("unknown ELF byte order")
+        self.endian = "<" if buf[5] == ELFDATA2LSB else ">"
+        self.header = struct.Struct(self.endian + HEADER_FIELDS)
+        self.section = struct.Struct(self.endian + SECTION_FIELDS)
+        fields = self.header.unpack_from(buf)
+        self.shoff, self.shentsize, self.shnum, self.shstrndx = fields[6], fields[11], fields[12], fields[13]
+        if self.shoff == 0 or self.shnum == 0 or self.shnum >= SHN_LORESERVE or self.shstrndx >= SHN_LORESERVE:
+            raise ValueError("extended or missing section header table")
+        if self.shentsize != self.section.size:
+            raise ValueError("unexpected section header size")
+        if self.shoff + self.shnum * self.shentsize > len(buf):
+            raise ValueError("truncated section header table")
+        self.sections = [list(self.section.unpack_from(buf, self.shoff + i * self.shentsize))
+                         for i in range(self.shnum)]
+        _, _, _, _, offset, size, *_ = self.sections[self.shstrndx]
+        self.shstrtab = bytes(buf[offset:offset + size])
+
+    def name(self, sh):
+        end = self.shstrtab.index(b"\0", sh[0])
+        return self.shstrtab[sh[0]:end].decode("ascii", "replace")
+
+    def find(self, name):
+        for i, sh in enumerate(self.sections):
+            if self.name(sh) == name:
+                return i
+        return None
+
+    def table(self):
+        return b"".join(self.section.pack(*sh) for sh in self.sections)
+
+def read_section(path, name):
+    """Bytes of section name in the ELF file at path, or None if it has none."""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            elf = ElfFile(mm)
+            i = elf.find(name)
+            if i is None:
+                return None
+            offset, size = elf.sections[i][4], elf.sections[i][5]
+            return bytes(mm[offset:offset + size])
+
+def align(n, to=8):
+    return n + (-n % to)
+
+def add_section(path, name, data):
+    """Add section name holding data to the ELF file at path, in place.
+
+    A section that already exists and is large enough is overwritten where
+    it is. Otherwise the data, a grown copy of .shstrtab and the section
+    header table are written past the last section (over the old table when
+    it ends the file, as it does for linker output) and the ELF header is
+    pointed at them.
+    """
+    with open(path, "r+b") as f:
+        size = os.fstat(f.fileno()).st_size
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            elf = ElfFile(mm)
+        i = elf.find(name)
+
+        if i is not None and elf.sections[i][5] >= len(data):
+            sh = elf.sections[i]
+            sh[5] = len(data)
+            with mmap.mmap(f.fileno(), 0) as mm:
+                mm[sh[4]:sh[4] + len(data)] = data
+                elf.section.pack_into(mm, elf.shoff + i * elf.shentsize, *sh)
+            return
+
+        table_end = elf.shoff + elf.shnum * elf.shentsize
+        base = elf.shoff if table_end == size else align(size)
+        tail = bytearray(data)
+        if i is None:
+            shstrtab = elf.shstrtab + name.encode("ascii") + b"\0"
+            elf.sections[elf.shstrndx][4] = base + len(tail)
+            elf.sections[elf.shstrndx][5] = len(shstrtab)
+            elf.sections.append([len(elf.shstrtab), SHT_PROGBITS, 0, 0, base, len(data), 0, 0, 1, 0])
+            tail += shstrtab
+        else:
+            elf.sections[i][4] = base
+            elf.sections[i][5] = len(data)
+        tail.extend(b"\0" * (align(base + len(tail)) - base - len(tail)))
+        shoff = base + len(tail)
+        tail += elf.table()
+
+        f.truncate(base + len(tail))
+        with mmap.mmap(f.fileno(), 0) as mm:
+            mm[base:base + len(tail)] = tail
+            struct.pack_into(elf.endian + "Q", mm, E_SHOFF, shoff)
+            struct.pack_into(elf.endian + "H", mm, E_SHNUM, len(elf.sections))
@@ -1,17 +1,198 @@
-import socket
+"""Above/Below transport between entangled compiler nodes.
+
+Messages are length-prefixed frames (an 8-byte big-endian size, then the
+payload), so IR modules of any size arrive whole. Every frame is answered
+with one reply frame. A BelowServer serves any number of peers for as long
+as it runs, and an AbovePool keeps one connection per peer Address.
+
+Backpressure comes from three places. A sender waits on drain() before it
+queues more data. A connection carries one frame at a time, and the next
+frame is only sent after the reply. The server reads nothing more from a
+peer while its handler runs, and handlers from all peers share a
+concurrency limit.
+"""
+import asyncio
+import inspect
+import struct
+
+from dual import import_address
+
+FRAME_HEADER = struct.Struct("!Q")
+# Largest frame read by default: the header alone would otherwise let any
+# peer make a listener buffer gigabytes. Pass max_frame to raise it.
+MAX_FRAME = 256 << 20
+DEFAULT_PORT = 5555
+
+async def write_frame(writer, payload):
+    if isinstance(payload, str):
+        payload = payload.encode()
+    writer.write(FRAME_HEADER.pack(len(payload)))
+    writer.write(payload)
+    await writer.drain()
+
+async def read_frame(reader, max_frame=MAX_FRAME):
+    """Next frame's payload, or None when the peer closed cleanly between frames."""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > max_frame:
+        raise ValueError(f"frame of {size} bytes exceeds the {max_frame} byte limit")
+    return await reader.readexactly(size)
+
+def parse_address(address, peers=None):
+    """(host, port) for a peer: an entry in peers, or a literal "host:port"."""
+    if peers and address in peers:
+        return peers[address]
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit():
+        raise ValueError(f"no route to {address!r}: not host:port and not in the peer table")
+    return host, int(port)
+
+class BelowServer:
+    """Persistent Below side: handler(payload, peer) is called for every frame
+    from every connected peer, and its return value (bytes, str or None) is
+    sent back as the reply. The handler may be a coroutine function."""
+
+    def __init__(self, handler, host="127.0.0.1", port=DEFAULT_PORT, max_frame=MAX_FRAME, max_concurrency=64):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.max_frame = max_frame
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.server = None
+        # writer -> the task serving that peer
+        self.connections = {}
+        self.frames = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.serve_peer, self.host, self.port)
+        # port 0 asks the OS for a free port; report the real one
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_peer(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                payload = await read_frame(reader, self.max_frame)
+                if payload is None:
+                    break
+                async with self.slots:
+                    reply = self.handler(payload, peer)
+                    if inspect.isawaitable(reply):
+                        reply = await reply
+                self.frames += 1
+                await write_frame(writer, reply or b"")
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self, wait_for_peers=False):
+        """Stop listening and hang up on every connected peer, or with
+        wait_for_peers let them finish and disconnect first."""
+        if self.server is not None:
+            self.server.close()
+            if wait_for_peers:
+                await asyncio.gather(*self.connections.values())
+            tasks = list(self.connections.values())
+            for writer in list(self.connections):
+                writer.close()
+            # the peer tasks end once their transports report the close
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.server.wait_closed()
+
+class AbovePool:
+    """Client side: one persistent connection per peer Address, reused by every
+    send to that peer and reopened (once per send) if it was dropped.
+
+    Addresses are the `Address:` values from the letters' Module gates
+    (see dual.import_address), mapped to (host, port) through peers, or
+    literal host:port strings.
+    """
+
+    def __init__(self, peers=None, max_frame=MAX_FRAME):
+        self.peers = dict(peers or {})
+        self.max_frame = max_frame
+        self.connections = {}
+        self.locks = {}
+        self.opened = 0
+
+    async def connection(self, address):
+        conn = self.connections.get(address)
+        if conn is None or conn[1].is_closing():
+            host, port = parse_address(address, self.peers)
+            conn = self.connections[address] = await asyncio.open_connection(host, port)
+            self.opened += 1
+        return conn
+
+    async def send(self, address, payload):
+        """Send one frame to address and return the reply payload."""
+        lock = self.locks.setdefault(address, asyncio.Lock())
+        async with lock:
+            for attempt in (0, 1):
+                reader, writer = await self.connection(address)
+                try:
+                    await write_frame(writer, payload)
+                    reply = await read_frame(reader, self.max_frame)
+                    if reply is None:
+                        raise ConnectionResetError(f"{address} closed the connection")
+                    return reply
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    self.drop(address)
+                    if attempt:
+                        raise
+
+    async def send_letter(self, module_node, code):
+        """Send code to the peer named by a Module gate's Address: entry."""
+        address = import_address(module_node)
+        if address is None:
+            raise ValueError("the Module gate has no Address:")
+        return await self.send(address, code)
+
+    def drop(self, address):
+        conn = self.connections.pop(address, None)
+        if conn is not None:
+            conn[1].close()
+
+    async def close(self):
+        for address in list(self.connections):
+            self.drop(address)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
 
 def send_above(node_addr, code):
-    s = socket.socket()
-    host, port = node_addr.split(":")
-    s.connect((host, int(port)))
-    s.sendall(code.encode())
-    s.close()
-
-def recv_below(port=5555):
-    s = socket.socket()
-    s.bind(('0.0.0.0', port))
-    s.listen(1)
-    conn, _ = s.accept()
-    data = conn.recv(4096).decode()
-    conn.close()
-    return data
+    """Send code to node_addr ("host:port") in one frame and wait for the reply."""
+    async def send():
+        async with AbovePool() as pool:
+            return await pool.send(node_addr, code)
+    return asyncio.run(send())
+
+def recv_below(port=DEFAULT_PORT, host="0.0.0.0", max_frame=MAX_FRAME):
+    """Wait for one frame on port and return it as text (the one-shot form of BelowServer)."""
+    async def receive():
+        received = asyncio.get_running_loop().create_future()
+        def handler(payload, peer):
+            if not received.done():
+                received.set_result(payload)
+        server = await BelowServer(handler, host, port, max_frame=max_frame).start()
+        try:
+            return await received
+        finally:
+            # let the sender read its reply before the connection goes
+            await server.close(wait_for_peers=True)
+    return asyncio.run(receive()).decode()
@@ -0,0 +1,156 @@
+"""Equation right-hand sides: expressions over base-12 integers, strings and
+the symbols of earlier Equations, folded at compile time where possible.
+
+    expr  := term (("+" | "-") term)*
+    term  := unary (("*" | "/") unary)*
+    unary := "-" unary | atom
+    atom  := NUMBER | STRING | IDENT | "(" expr ")"
+
+A whole right-hand side may instead be a typed placeholder (`<number>`,
+`<string>`) for a value only known at run time. Anything else, such as
+`hello world` or a word that names no symbol, is taken as a string, as it
+always has been.
+"""
+from collections import namedtuple
+
+from lexer import lex
+
+# type is "i32" or "str"; value is the folded constant, or None when it varies
+Symbol = namedtuple("Symbol", "type value")
+
+# Trees are tuples: ("num", n), ("str", s), ("sym", name), ("neg", tree),
+# (op, left, right) for op in + - * /, and ("placeholder", type) at the top.
+BASE12_DIGITS = frozenset("0123456789ab")
+STRING_HINTS = {"string", "str", "text"}
+ADDITIVE = (("SYMBOL", "+"), ("SYMBOL", "-"))
+MULTIPLICATIVE = (("SYMBOL", "*"), ("SYMBOL", "/"))
+
+def wrap(n):
+    """n as a two's complement i32, as the generated code computes it."""
+    return (n + (1 << 31)) % (1 << 32) - (1 << 31)
+
+class ExprParser:
+    def __init__(self, text):
+        self.tokens = lex(text)
+        self.i = 0
+
+    def peek(self):
+        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None)
+
+    def take(self):
+        tok = self.peek()
+        self.i += 1
+        return tok
+
+    def parse(self):
+        if self.peek() == ("SYMBOL", "<") and self.tokens[len(self.tokens) - 1] == ("SYMBOL", ">"):
+            hint = self.tokens.span_text(1, len(self.tokens) - 1) if len(self.tokens) > 2 else ""
+            return ("placeholder", "str" if hint.strip().lower() in STRING_HINTS else "i32")
+        tree = self.expr()
+        if self.i < len(self.tokens):
+            raise SyntaxError(f"unexpected {self.peek()[1]!r} in expression")
+        return tree
+
+    def binary(self, operand, ops):
+        tree = operand()
+        while self.peek() in ops:
+            tree = (self.take()[1], tree, operand())
+        return tree
+
+    def expr(self):
+        return self.binary(self.term, ADDITIVE)
+
+    def term(self):
+        return self.binary(self.unary, MULTIPLICATIVE)
+
+    def unary(self):
+        if self.peek() == ("SYMBOL", "-"):
+            self.i += 1
+            return ("neg", self.unary())
+        return self.atom()
+
+    def atom(self):
+        typ, text = self.take()
+        if typ == "NUMBER":
+            return ("num", int(text, 12))
+        if typ == "STRING":
+            return ("str", text[1:-1])
+        if typ == "IDENT":
+            return ("sym", text)
+        if (typ, text) == ("SYMBOL", "("):
+            tree = self.expr()
+            if self.take() != ("SYMBOL", ")"):
+                raise SyntaxError("expected ')' in expression")
+            return tree
+        raise SyntaxError(f"unexpected {text!r} in expression" if typ else "incomplete expression")
+
+def parse_expression(text):
+    """Tree for an Equation right-hand side; SyntaxError if it is not an expression."""
+    return ExprParser(text).parse()
+
+def lookup(name, symbols):
+    """The Symbol a word stands for: a defined symbol, else a base-12 number
+    written with letters (`ab`). KeyError for any other word."""
+    if name in symbols:
+        return symbols[name]
+    if BASE12_DIGITS.issuperset(name):
+        return Symbol("i32", wrap(int(name, 12)))
+    raise KeyError(name)
+
+def evaluate(tree, symbols):
+    """Symbol for tree given the symbols defined so far; its value is None
+    when some operand varies. ValueError for ill-typed expressions."""
+    kind = tree[0]
+    if kind == "num":
+        return Symbol("i32", wrap(tree[1]))
+    if kind == "str":
+        return Symbol("str", tree[1])
+    if kind == "sym":
+        return lookup(tree[1], symbols)
+    if kind == "placeholder":
+        return Symbol(tree[1], None)
+    if kind == "neg":
+        operand = evaluate(tree[1], symbols)
+        if operand.type != "i32":
+            raise ValueError("cannot negate a string")
+        return Symbol("i32", None if operand.value is None else wrap(-operand.value))
+    left, right = evaluate(tree[1], symbols), evaluate(tree[2], symbols)
+    if left.type != right.type or (left.type == "str" and kind != "+"):
+        raise ValueError(f"cannot apply '{kind}' to {left.type} and {right.type}")
+    known = left.value is not None and right.value is not None
+    if left.type == "str":
+        if not known:
+            raise ValueError("strings can only be joined when both are known at compile time")
+        return Symbol("str", left.value + right.value)
+    if not known:
+        return Symbol("i32", None)
+    a, b = left.value, right.value
+    if kind == "/":
+        if b == 0:
+            raise ValueError("division by zero")
+        # truncating, like sdiv
+        q = abs(a) // abs(b)
+        return Symbol("i32", wrap(q if (a < 0) == (b < 0) else -q))
+    return Symbol("i32", wrap(a + b if kind == "+" else a - b if kind == "-" else a * b))
+
+def names(tree):
+    """Every word an expression reads."""
+    if tree[0] == "sym":
+        yield tree[1]
+    elif tree[0] in ("neg", "+", "-", "*", "/"):
+        for sub in tree[1:]:
+            yield from names(sub)
+
+def equation(lhs, rhs, symbols):
+    """(Symbol, tree, operands) for `lhs = rhs` given the symbols defined so
+    far. operands maps the symbols a varying expression reads at run time
+    (empty once it folds); tree is None for free text."""
+    try:
+        tree = parse_expression(rhs)
+        symbol = evaluate(tree, symbols)
+    except (SyntaxError, KeyError):
+        return Symbol("str", rhs.strip('"')), None, {}
+    except ValueError as e:
+        raise ValueError(f"Equation {lhs} = {rhs}: {e}") from None
+    operands = {} if symbol.value is not None else {n: symbols[n] for n in names(tree) if n in symbols}
+    return symbol, tree, operands
@@ -1,215 +1,432 @@
+import hashlib
+import json
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from llvmlite import ir
+from commands import abi, block_calls, convert, registry
+from expr import equation, evaluate, names, parse_expression
+from modules import load_import_names
+from nodes import detach, format_block
+from sealed import create_seal
+
+# Blocks are shipped to worker processes in batches of this many
+JOB_BATCH = 64
+
+SYMBOL_TYPES = {"i32": ir.IntType(32), "str": ir.IntType(8).as_pointer()}
+# parameter types of runtime functions (commands.abi, plus dj_write's length)
+ABI_TYPES = dict(SYMBOL_TYPES, i64=ir.IntType(64))
+PRINT_FORMATS = {"i32": "%d\n", "str": "%s\n"}
+
+# Consecutive Prints are written with one call per run (see PrintRun)
+COALESCE_PRINTS = True
+
+# A lowered Block: its IR definitions, the pooled strings it uses (one entry
+# per use), when all the Block does is print known text, that text, and the
+# (name, parameter types) of the external functions it calls
+Fragment = namedtuple("Fragment", "ir strings output externs")
+
+class ConstantPool:
+    """Module-level string literal pool.
+
+    Each distinct byte string becomes one `internal unnamed_addr constant`
+    named after its content, so fragments built apart agree on the name.
+    Pointers are constant GEP expressions, cached and shared by every use.
+    With define=False (inside a Block fragment) the entries are only
+    declared and the module that links the fragments defines them.
+    """
+    def __init__(self, module, define=True):
+        self.module = module
+        self.define = define
+        self.ptrs = {}
+        self.uses = []
+
+    def pointer(self, s):
+        data = (s + "\0").encode()
+        self.uses.append(s)
+        ptr = self.ptrs.get(data)
+        if ptr is None:
+            arr_ty = ir.ArrayType(ir.IntType(8), len(data))
+            gv = ir.GlobalVariable(self.module, arr_ty, name=".str." + hashlib.sha256(data).hexdigest()[:16])
+            gv.global_constant = True
+            if self.define:
+                gv.linkage = "internal"
+                gv.unnamed_addr = True
+                gv.initializer = ir.Constant(arr_ty, bytearray(data))
+            ptr = self.ptrs[data] = gv.gep([ir.IntType(32)(0), ir.IntType(32)(0)])
+        return ptr
+
+    def stats(self):
+        uses, unique = len(self.uses), len(self.ptrs)
+        return {"string_uses": uses, "string_constants": unique,
+                "string_pool_hit_rate": (uses - unique) / uses if uses else 0.0}
+
+def constant_pool(module):
+    pool = getattr(module, "constant_pool", None)
+    if pool is None:
+        pool = module.constant_pool = ConstantPool(module)
+    return pool
 
-# Symbol table for variables
 class SymbolTable:
-    def __init__(self, builder):
-        self.vars = {}
+    """Typed Equation symbols (expr.Symbol). Values known at compile time are
+    emitted as LLVM constants; only symbols that vary live in module-level
+    globals, @"sym.<name>.<type>", so every Block fragment can reach the
+    ones declared before it."""
+    def __init__(self, module, builder, symbols):
+        self.module = module
         self.builder = builder
+        self.symbols = symbols
+
+    def slot(self, name, typ):
+        slot = self.module.globals.get(f"sym.{name}.{typ}")
+        if slot is None:
+            slot = ir.GlobalVariable(self.module, SYMBOL_TYPES[typ], name=f"sym.{name}.{typ}")
+        return slot
+
+    def constant(self, symbol):
+        if symbol.type == "i32":
+            return ir.Constant(ir.IntType(32), symbol.value)
+        return constant_pool(self.module).pointer(symbol.value)
 
     def declare(self, name, value):
-        ptr = self.builder.alloca(value.type, name=name)
-        self.builder.store(value, ptr)
-        self.vars[name] = ptr
+        self.builder.store(value, self.slot(name, self.symbols[name].type))
 
     def load(self, name):
-        return self.builder.load(self.vars[name], name=name)
+        symbol = self.symbols[name]
+        if symbol.value is not None:
+            return self.constant(symbol)
+        return self.builder.load(self.slot(name, symbol.type), name=name)
 
-def generate_ir(ast):
-    module = ir.Module(name="lettera_module")
+    def emit(self, tree):
+        """Value of an expression tree: a constant where it folds, else
+        instructions over the varying symbols it reads."""
+        folded = evaluate(tree, self.symbols)
+        if folded.value is not None:
+            return self.constant(folded)
+        kind = tree[0]
+        if kind == "sym":
+            return self.load(tree[1])
+        if kind == "neg":
+            return self.builder.neg(self.emit(tree[1]))
+        left, right = self.emit(tree[1]), self.emit(tree[2])
+        op = {"+": self.builder.add, "-": self.builder.sub, "*": self.builder.mul, "/": self.builder.sdiv}[kind]
+        return op(left, right)
+
+def extern(module, name, types=None):
+    """The external function name, declared in module on first call: printf
+    (types None), or a void runtime function taking types (ABI_TYPES keys).
+    module.externs records each one so the module linking a fragment can
+    declare what the fragment calls, and nothing else."""
+    externs = getattr(module, "externs", None)
+    if externs is None:
+        externs = module.externs = {}
+    types = tuple(types) if types is not None else None
+    if name in externs:
+        if externs[name] != types:
+            raise ValueError(f"{name} is called with parameters ({', '.join(externs[name] or ())}) "
+                             f"and ({', '.join(types or ())}); a letter links against one runtime")
+        return module.globals[name]
+    externs[name] = types
+    if types is None:
+        fnty = ir.FunctionType(ir.IntType(32), [ir.IntType(8).as_pointer()], var_arg=True)
+    else:
+        fnty = ir.FunctionType(ir.VoidType(), [ABI_TYPES[t] for t in types])
+    return ir.Function(module, fnty, name=name)
+
+def write_text(module, builder, text):
+    """One dj_write of text, held in the module's string pool."""
+    if text:
+        builder.call(extern(module, "dj_write", ("str", "i64")),
+                     [constant_pool(module).pointer(text), ir.Constant(ir.IntType(64), len(text.encode()))])
+
+def lower_command(module, builder, command, args):
+    """Call command's runtime function (see commands) with args converted
+    and checked once, here at compile time."""
+    values = [constant_pool(module).pointer(v) if isinstance(v, str) else ir.Constant(ir.IntType(32), v)
+              for v in convert(command, args)]
+    builder.call(extern(module, command.extern, abi(command)), values)
+
+class PrintRun:
+    """Print output gathered until something else happens, then emitted as
+    one call: a dj_write when every piece is known at compile time, else one
+    printf over the pieces' combined format string. With COALESCE_PRINTS off
+    every Print is its own printf, as before runs existed."""
+    def __init__(self, module, builder):
+        self.module = module
+        self.builder = builder
+        self.pieces = []   # text, or (format, value) for a varying symbol
+
+    def text(self, s):
+        self.pieces.append(s)
+        if not COALESCE_PRINTS:
+            self.flush()
+
+    def value(self, fmt, value):
+        self.pieces.append((fmt, value))
+        if not COALESCE_PRINTS:
+            self.flush()
+
+    def flush(self):
+        pieces, self.pieces = self.pieces, []
+        args = [p[1] for p in pieces if not isinstance(p, str)]
+        if not args and COALESCE_PRINTS:
+            write_text(self.module, self.builder, "".join(pieces))
+        elif pieces:
+            fmt = "".join(p.replace("%", "%%") if isinstance(p, str) else p[0] for p in pieces)
+            self.builder.call(extern(self.module, "printf"), [constant_pool(self.module).pointer(fmt)] + args)
+
+def format_value(symbol):
+    """What printf(PRINT_FORMATS[type], value) prints for a known symbol."""
+    return f"{symbol.value}\n"
+
+def referenced_symbols(block):
+    eq, above, below = block.children
+    names = {eq.value[0]}
+    for stmt in below.children:
+        verb, args = stmt.value
+        if verb.lower() == "print" and args:
+            names.add(args[0].strip('"'))
+    return names
+
+def block_key(block, symbols, operands, reg):
+    """Content hash of a Block: its normalized source plus the symbols (type
+    and folded value) it reads and the commands it calls (which depend on
+    the letter's imports), which is everything its lowered fragment depends
+    on. Returns (key, refs) where refs is (symbols its statements see,
+    symbols its Equation reads at run time, commands it calls)."""
+    refs = {name: symbols[name] for name in referenced_symbols(block) if name in symbols}
+    calls = block_calls(block, reg)
+    return create_seal(format_block(block), json.dumps([sorted(refs.items()), sorted(operands.items()),
+                                                        sorted(calls.items())])), \
+        (refs, operands, calls)
 
-    # printf declaration
-    voidptr_ty = ir.IntType(8).as_pointer()
-    printf_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty], var_arg=True)
-    printf = ir.Function(module, printf_ty, name="printf")
+# A keyed Block: the words it reads and their symbols when it was keyed, the
+# symbol its Equation defines, its content key, its refs and the registry
+# its commands were looked up in
+Keyed = namedtuple("Keyed", "reads inputs symbol key refs reg")
+
+class LoweringMemo:
+    """What generate_ir keeps between compiles of one letter (see
+    sync.SyncServer): each Block node's Keyed, and the lowered fragments by
+    name. A Block whose inputs are unchanged is neither evaluated nor keyed
+    again and its fragment is linked from memory, so an edit costs about the
+    Blocks it touches. Blocks are held by identity and must not be mutated
+    while memoized."""
+    def __init__(self):
+        self.blocks = {}      # Block node -> Keyed
+        self.fragments = {}   # fragment name -> Fragment
+
+def key_block(block, symbols, reg, memo=None):
+    """Evaluate block's Equation into symbols and key it (block_key); with a
+    memo, also record what the key was computed from."""
+    lhs, rhs = block.children[0].value
+    symbol, tree, operands = equation(lhs, rhs, symbols)
+    reads = inputs = None
+    if memo is not None:
+        if tree is None:
+            try:
+                tree = parse_expression(rhs)
+            except SyntaxError:
+                pass
+        reads = tuple(sorted(set(names(tree) if tree is not None else ()) | referenced_symbols(block)))
+        inputs = tuple(symbols.get(n) for n in reads)
+    symbols[lhs] = symbol
+    key, refs = block_key(block, symbols, operands, reg)
+    return Keyed(reads, inputs, symbol, key, refs, reg)
+
+def is_definition(gv):
+    if isinstance(gv, ir.Function):
+        return not gv.is_declaration
+    return gv.initializer is not None
+
+def lower_block(block, refs, name):
+    """Lower one Block into a standalone fragment: an internal `void @name()`
+    plus the constants it owns. Only definitions are returned as IR text;
+    the functions it calls, the symbol slots and pooled strings are declared
+    by generate_ir."""
+    module = ir.Module(name=name)
+    module.constant_pool = pool = ConstantPool(module, define=False)
+    fn = ir.Function(module, ir.FunctionType(ir.VoidType(), []), name=name)
+    fn.linkage = "internal"
+    builder = ir.IRBuilder(fn.append_basic_block(name="entry"))
+    types, operands, calls = refs
+    symbols = SymbolTable(module, builder, types)
+
+    eq, above, below = block.children
+    lhs, rhs = eq.value
+    # A constant Equation emits nothing: its readers get the folded value.
+    # A varying one stores into its slot (a bare placeholder leaves it be).
+    if types[lhs].value is None:
+        _, tree, _ = equation(lhs, rhs, operands)
+        if tree is not None and tree[0] != "placeholder":
+            symbols.declare(lhs, SymbolTable(module, builder, operands).emit(tree))
+    # output stays a list of text while the Block only prints known text
+    output = [] if len(builder.block.instructions) == 0 else None
+
+    # After S.E.R.A.P. correction Above mirrors Below, so only the
+    # canonical Below statements are lowered.
+    run = PrintRun(module, builder)
+    for stmt in below.children:
+        verb, args = stmt.value
+        if verb.lower() == "print":
+            msg = args[0].strip('"') if args else ""
+            if msg in types and types[msg].value is not None:
+                text = format_value(types[msg])
+            elif msg in types:
+                run.value(PRINT_FORMATS[types[msg].type], symbols.load(msg))
+                output = None
+                continue
+            elif "%" in msg:
+                # printf reads a raw literal as its format, as it always has
+                run.flush()
+                builder.call(extern(module, "printf"), [pool.pointer(msg + "\n")])
+                output = None
+                continue
+            else:
+                text = msg + "\n"
+            run.text(text)
+            if output is not None:
+                output.append(text)
+        else:
+            # a statement the runtime does not implement emits nothing
+            command = calls.get(f"{verb}/{len(args)}")
+            if command is not None:
+                run.flush()
+                lower_command(module, builder, command, args)
+                output = None
+    run.flush()
+
+    builder.ret_void()
+    return Fragment("\n".join(str(gv) for gv in module.global_values if is_definition(gv)), pool.uses,
+                    "".join(output) if output is not None and COALESCE_PRINTS else None,
+                    sorted(getattr(module, "externs", {}).items()))
+
+def lower_blocks(batch):
+    """Worker entry point: lower a batch of (block, types, name) jobs."""
+    return [lower_block(block, types, name) for block, types, name in batch]
+
+def link_fragments(module, fragments):
+    """Print module with each Block function declaration replaced by its fragment."""
+    lines = [f'; ModuleID = "{module.name}"',
+             f'target triple = "{module.triple}"',
+             f'target datalayout = "{module.data_layout}"',
+             ""]
+    lines += [fragments.get(gv.name) or str(gv) for gv in module.global_values]
+    return "\n".join(lines)
+
+def generate_ir(ast, cache=None, jobs=1, stats=None, libraries=None, memo=None):
+    """Lower a Program node, or any iterable of top-level nodes such as
+    Parser.stream(), one Block at a time.
+
+    Each Block becomes its own fragment function named after its content
+    hash; with a cache (see cache.CompileCache) unchanged Blocks reuse the
+    fragment lowered on a previous run. With jobs > 1 the remaining Blocks
+    are lowered on a process pool. Fragment names do not depend on which
+    worker built them and are linked in Block order, so the module text is
+    identical for every jobs value.
+
+    DJ commands lower as declared by libraries, the letter's imports from
+    modules.load_imports; without them the letter's Import names are
+    resolved on the search path alone.
+
+    Pass a LoweringMemo as memo to reuse the Blocks and fragments of the
+    previous call on the same letter.
+
+    Pass a dict as stats to collect string pool counters and, under
+    "block_keys", each Block's content key in Block order.
+    """
+    nodes = ast.children if hasattr(ast, "children") else ast
+    module = ir.Module(name="lettera_module")
 
     # main function
     func_ty = ir.FunctionType(ir.IntType(32), [])
     main_fn = ir.Function(module, func_ty, name="main")
     block = main_fn.append_basic_block(name="entry")
     builder = ir.IRBuilder(block)
-    symbols = SymbolTable(builder)
-
-    # Traverse AST: handle Equations
-    for node in ast.children:
-        if node.kind == "Block":
-            eq = node.children[0]  # Equation
-            above = node.children[1]
-            below = node.children[2]
-
-            lhs, rhs = eq.value
-            # Support numbers (base-12 → int) and strings
-            if rhs.isdigit() or all(c in "0123456789ab" for c in rhs):
-                val = int(rhs, 12)  # base-12 conversion
-                llvm_val = ir.Constant(ir.IntType(32), val)
-            else:
-                # treat as string literal
-                rhs_val = rhs.strip('"') + "\0"
-                str_ty = ir.ArrayType(ir.IntType(8), len(rhs_val))
-                global_str = ir.GlobalVariable(module, str_ty, name=f"{lhs}_str")
-                global_str.global_constant = True
-                global_str.initializer = ir.Constant(str_ty, bytearray(rhs_val.encode()))
-                llvm_val = global_str
-
-            symbols.declare(lhs, llvm_val if isinstance(llvm_val, ir.Constant) else llvm_val)
-
-            # Handle Above + Below Print statements
-            for section in [above, below]:
-                if section.value[0].lower() == "print":
-                    msg = section.value[1].strip('"')
-                    if msg in symbols.vars:
-                        ptr = symbols.load(msg)
-                        builder.call(printf, [ptr])
-                    else:
-                        # print raw literal
-                        fmt_str = msg + "\n\0"
-                        arr_ty = ir.ArrayType(ir.IntType(8), len(fmt_str))
-                        global_fmt = ir.GlobalVariable(module, arr_ty, name=f"str_{lhs}")
-                        global_fmt.global_constant = True
-                        global_fmt.initializer = ir.Constant(arr_ty, bytearray(fmt_str.encode()))
-                        fmt_ptr = builder.gep(global_fmt, [ir.IntType(32)(0), ir.IntType(32)(0)])
-                        builder.call(printf, [fmt_ptr])
 
-    # Return 0
-    builder.ret(ir.IntType(32)(0))
-    return str(module)
-
-def handle_djcmd(cmd, args, builder, module, printf):
-    if cmd == "BPM":
-        bpm_val = int(args[0], 12) if args[0].isdigit() else int(args[0])
-        return ir.Constant(ir.IntType(32), bpm_val)
-
-    if cmd == "Key":
-        key_str = args[0].strip('"') + "\0"
-        arr_ty = ir.ArrayType(ir.IntType(8), len(key_str))
-        gv = ir.GlobalVariable(module, arr_ty, name="key_str")
-        gv.global_constant = True
-        gv.initializer = ir.Constant(arr_ty, bytearray(key_str.encode()))
-        return gv
-
-    if cmd == "Energy":
-        return ir.Constant(ir.IntType(32), int(args[0]))
-
-    if cmd == "Crossfade":
-        dur, typ = args
-        msg = f"Crossfade {dur} {typ}\n\0"
-        arr_ty = ir.ArrayType(ir.IntType(8), len(msg))
-        gv = ir.GlobalVariable(module, arr_ty, name="crossfade_msg")
-        gv.global_constant = True
-        gv.initializer = ir.Constant(arr_ty, bytearray(msg.encode()))
-        return gv
-
-    if cmd == "Filter":
-        typ, sweep = args
-        msg = f"Filter {typ} sweep {sweep}\n\0"
-        arr_ty = ir.ArrayType(ir.IntType(8), len(msg))
-        gv = ir.GlobalVariable(module, arr_ty, name="filter_msg")
-        gv.global_constant = True
-        gv.initializer = ir.Constant(arr_ty, bytearray(msg.encode()))
-        return gv
-
-    return None
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    symbols, fragments, keys, batch, submitted, block_keys, order = {}, {}, {}, [], [], [], []
+    keyed = {}
+    reg = registry(libraries) if libraries is not None else None
+    imports = []
+    try:
+        for node in nodes:
+            if node.kind == "Import":
+                imports.append(node.value)
+            elif node.kind == "Block":
+                if reg is None:
+                    reg = registry(load_import_names(imports))
+                lhs = node.children[0].value[0]
+                entry = memo.blocks.get(node) if memo is not None else None
+                if entry is not None and entry.reg is reg \
+                        and entry.inputs == tuple(symbols.get(n) for n in entry.reads):
+                    symbols[lhs] = entry.symbol
+                else:
+                    entry = key_block(node, symbols, reg, memo)
+                keyed[node] = entry
+                symbol, key, refs = entry.symbol, entry.key, entry.refs
+                # only a value that varies needs somewhere to live
+                slot = f"sym.{lhs}.{symbol.type}"
+                if symbol.value is None and slot not in module.globals:
+                    gv = ir.GlobalVariable(module, SYMBOL_TYPES[symbol.type], name=slot)
+                    gv.linkage = "internal"
+                    gv.initializer = ir.Constant(SYMBOL_TYPES[symbol.type], None)
 
-from llvmlite import ir
+                block_keys.append(key)
+                name = f"blk.{key[:16]}"
+                if name not in fragments:
+                    fragment = memo.fragments.get(name) if memo is not None else None
+                    if fragment is None and cache is not None:
+                        fragment = cache.get(key)
+                    if fragment is None and executor is not None:
+                        keys[name] = key
+                        batch.append((detach(node), refs, name))
+                        if len(batch) == JOB_BATCH:
+                            submitted.append((batch, executor.submit(lower_blocks, batch)))
+                            batch = []
+                    elif fragment is None:
+                        fragment = lower_block(node, refs, name)
+                        if cache is not None:
+                            cache.put(key, fragment)
+                    fragments[name] = fragment
+                order.append(name)
 
-def declare_dj_runtime(module):
-    i32 = ir.IntType(32)
-    i8ptr = ir.IntType(8).as_pointer()
-
-    funcs = {
-        "dj_bpm": ir.FunctionType(ir.VoidType(), [i32]),
-        "dj_key": ir.FunctionType(ir.VoidType(), [i8ptr]),
-        "dj_energy": ir.FunctionType(ir.VoidType(), [i32]),
-        "dj_genre": ir.FunctionType(ir.VoidType(), [i8ptr]),
-        "dj_crossfade": ir.FunctionType(ir.VoidType(), [i32, i8ptr]),
-        "dj_filter": ir.FunctionType(ir.VoidType(), [i8ptr, i8ptr]),
-        "dj_loop": ir.FunctionType(ir.VoidType(), [i32, i32]),
-        "dj_drop": ir.FunctionType(ir.VoidType(), [i8ptr, i32]),
-        "dj_playlist": ir.FunctionType(ir.VoidType(), [i8ptr]),
-        "dj_order": ir.FunctionType(ir.VoidType(), [i8ptr, i8ptr, i8ptr]),
-        "dj_record": ir.FunctionType(ir.VoidType(), [i8ptr]),
-        "dj_seal": ir.FunctionType(ir.VoidType(), [i8ptr]),
-        "dj_log": ir.FunctionType(ir.VoidType(), [i8ptr]),
-    }
-    return {name: ir.Function(module, ftype, name=name) for name, ftype in funcs.items()}
-
-def str_constant(module, builder, name, s):
-    s += "\0"
-    arr_ty = ir.ArrayType(ir.IntType(8), len(s))
-    gv = ir.GlobalVariable(module, arr_ty, name=name)
-    gv.global_constant = True
-    gv.initializer = ir.Constant(arr_ty, bytearray(s.encode()))
-    return builder.gep(gv, [ir.IntType(32)(0), ir.IntType(32)(0)])
-
-def handle_dj_command(cmd, args, builder, module, dj_funcs):
-    if cmd == "BPM":
-        builder.call(dj_funcs["dj_bpm"], [ir.Constant(ir.IntType(32), int(args[0]))])
-    elif cmd == "Key":
-        ptr = str_constant(module, builder, "keystr", args[0].strip('"'))
-        builder.call(dj_funcs["dj_key"], [ptr])
-    elif cmd == "Energy":
-        builder.call(dj_funcs["dj_energy"], [ir.Constant(ir.IntType(32), int(args[0]))])
-    elif cmd == "Genre":
-        ptr = str_constant(module, builder, "genrestr", args[0].strip('"'))
-        builder.call(dj_funcs["dj_genre"], [ptr])
-    elif cmd == "Crossfade":
-        duration = int(args[0].replace("s", ""))
-        ptr = str_constant(module, builder, "cftype", args[1].strip('"'))
-        builder.call(dj_funcs["dj_crossfade"], [ir.Constant(ir.IntType(32), duration), ptr])
-    elif cmd == "Filter":
-        tptr = str_constant(module, builder, "ftype", args[0].strip('"'))
-        sptr = str_constant(module, builder, "fsweep", args[1].strip('"'))
-        builder.call(dj_funcs["dj_filter"], [tptr, sptr])
-    elif cmd == "Loop":
-        length, count = map(int, args)
-        builder.call(dj_funcs["dj_loop"], [ir.Constant(ir.IntType(32), length),
-                                           ir.Constant(ir.IntType(32), count)])
-    elif cmd == "Drop":
-        ptr = str_constant(module, builder, "dropeffect", args[0].strip('"'))
-        builder.call(dj_funcs["dj_drop"], [ptr, ir.Constant(ir.IntType(32), int(args[1]))])
-    elif cmd == "Playlist":
-        ptr = str_constant(module, builder, "plname", args[0].strip('"'))
-        builder.call(dj_funcs["dj_playlist"], [ptr])
-    elif cmd == "Order":
-        a, b, method = args
-        aptr = str_constant(module, builder, "ordera", a.strip('"'))
-        bptr = str_constant(module, builder, "orderb", b.strip('"'))
-        mptr = str_constant(module, builder, "orderm", method.strip('"'))
-        builder.call(dj_funcs["dj_order"], [aptr, bptr, mptr])
-    elif cmd == "RecordSet":
-        ptr = str_constant(module, builder, "recfile", args[0].strip('"'))
-        builder.call(dj_funcs["dj_record"], [ptr])
-    elif cmd == "SealSet":
-        ptr = str_constant(module, builder, "sealhash", args[0].strip('"'))
-        builder.call(dj_funcs["dj_seal"], [ptr])
-    elif cmd == "Log":
-        ptr = str_constant(module, builder, "logevt", args[0].strip('"'))
-        builder.call(dj_funcs["dj_log"], [ptr])
-
-def handle_dj_audio(cmd, args, builder, module, dj_funcs):
-    if cmd == "Play":
-        ptr = str_constant(module, builder, "playfile", args[0].strip('"'))
-        builder.call(dj_funcs["dj_play"], [ptr])
-    elif cmd == "Crossfade":
-        a = str_constant(module, builder, "filea", args[0].strip('"'))
-        b = str_constant(module, builder, "fileb", args[1].strip('"'))
-        duration = ir.Constant(ir.IntType(32), int(args[2].replace("s","")))
-        builder.call(dj_funcs["dj_crossfade"], [a, b, duration])
-
-def handle_dj_audio_effects(cmd, args, builder, module, dj_funcs):
-    if cmd == "Filter":
-        fileptr = str_constant(module, builder, "fileflt", args[0].strip('"'))
-        tptr = str_constant(module, builder, "ftype", args[1].strip('"'))
-        pptr = str_constant(module, builder, "fparam", args[2].strip('"'))
-        builder.call(dj_funcs["dj_filter"], [fileptr, tptr, pptr])
-    elif cmd == "Loop":
-        fileptr = str_constant(module, builder, "fileloop", args[0].strip('"'))
-        start = ir.Constant(ir.IntType(32), int(args[1]))
-        length = ir.Constant(ir.IntType(32), int(args[2]))
-        repeat = ir.Constant(ir.IntType(32), int(args[3]))
-        builder.call(dj_funcs["dj_loop"], [fileptr, start, length, repeat])
-    elif cmd == "Drop":
-        fileptr = str_constant(module, builder, "filedrop", args[0].strip('"'))
-        intensity = ir.Constant(ir.IntType(32), int(args[1]))
-        builder.call(dj_funcs["dj_drop"], [fileptr, intensity])
+        if batch:
+            submitted.append((batch, executor.submit(lower_blocks, batch)))
+        for jobs_done, future in submitted:
+            for (_, _, name), fragment in zip(jobs_done, future.result()):
+                fragments[name] = fragment
+                if cache is not None:
+                    cache.put(keys[name], fragment)
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
+    # Call the fragments in Block order, defining each one's pooled strings
+    # once. A run of Blocks that only print known text is written with one
+    # dj_write instead, and those fragments are left out of the module.
+    pool = constant_pool(module)
+    run = []
+    for name in order:
+        fragment = fragments[name]
+        if fragment.output is not None:
+            run.append(fragment.output)
+            continue
+        write_text(module, builder, "".join(run))
+        run = []
+        if name not in module.globals:
+            for string in fragment.strings:
+                pool.pointer(string)
+            for fn, types in fragment.externs:
+                extern(module, fn, types)
+            ir.Function(module, ir.FunctionType(ir.VoidType(), []), name=name)
+        builder.call(module.globals[name], [])
+    write_text(module, builder, "".join(run))
+    if memo is not None:
+        memo.blocks, memo.fragments = keyed, fragments
+    if stats is not None:
+        stats.update(pool.stats())
+        stats["block_keys"] = block_keys
 
+    # Return 0
+    builder.ret(ir.IntType(32)(0))
+    return link_fragments(module, {name: fragment.ir for name, fragment in fragments.items()})
@@ -0,0 +1,72 @@
+import ctypes
+import hashlib
+import os
+import subprocess
+
+from llvmlite import binding as llvm
+
+from backend import compile_ir, create_target_machine
+from cache import CACHE_DIR
+from commands import runtime_sources
+
+# (IR hash, opt level) -> (engine, main function); lives as long as the process,
+# so a process running a letter twice compiles it once. The compile server
+# does not cache engines: each request runs in a forked child, which starts
+# from the parent's empty ENGINES and exits with whatever it added.
+ENGINES = {}
+# (sources, flags) -> shared library loaded into the process
+_loaded_runtimes = {}
+
+def load_runtime(ir_code, cache_dir=CACHE_DIR):
+    """Build the runtimes ir_code calls into (commands.runtime_sources) as one
+    shared library, once per source hash, and load it so the JIT resolves
+    dj_* calls against it; printf comes from libc. RuntimeError when $CC
+    (clang by default) is missing or fails."""
+    sources, flags = runtime_sources(ir_code)
+    key = (tuple(sources), tuple(flags))
+    if key in _loaded_runtimes:
+        return _loaded_runtimes[key]
+    digest = hashlib.sha256(" ".join(flags).encode())
+    for source in sources:
+        with open(source, "rb") as f:
+            digest.update(f.read())
+    lib = os.path.abspath(os.path.join(cache_dir, f"libdj_runtime-{digest.hexdigest()[:16]}.so"))
+    if not os.path.exists(lib):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{lib}.{os.getpid()}.tmp"
+        cc = os.environ.get("CC", "clang")
+        try:
+            subprocess.run([cc, "-shared", "-fPIC", "-O2"] + sources + ["-o", tmp] + flags, check=True)
+        except FileNotFoundError:
+            raise RuntimeError(f"a C compiler is needed to build the dj_* runtime: {cc} not found "
+                               "(install clang or set $CC)") from None
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"{cc} could not build the dj_* runtime from "
+                               f"{', '.join(os.path.basename(s) for s in sources)} (exit {e.returncode})") from None
+        os.replace(tmp, lib)
+    llvm.load_library_permanently(lib)
+    _loaded_runtimes[key] = lib
+    return lib
+
+def jit_engine(ir_code, opt_level=0):
+    """MCJIT engine with main() resolved for ir_code, reused from ENGINES when possible."""
+    key = (hashlib.sha256(ir_code.encode()).hexdigest(), opt_level)
+    if key not in ENGINES:
+        if '@"dj_' in ir_code:
+            load_runtime(ir_code)
+        target_machine = create_target_machine(opt_level)
+        mod = compile_ir(ir_code, opt_level, target_machine)
+        engine = llvm.create_mcjit_compiler(mod, target_machine)
+        engine.finalize_object()
+        engine.run_static_constructors()
+        main = ctypes.CFUNCTYPE(ctypes.c_int)(engine.get_function_address("main"))
+        ENGINES[key] = (engine, main)
+    return ENGINES[key]
+
+def run_jit(ir_code, opt_level=0):
+    """Run the letter's main() in-process and return its exit code."""
+    _, main = jit_engine(ir_code, opt_level)
+    code = main()
+    # printf output sits in libc's buffer, not Python's
+    ctypes.CDLL(None).fflush(None)
+    return code
@@ -1,11 +1,13 @@
 import re
+from array import array
+from collections import namedtuple
 
 TOKENS = [
     ("MODULE", r"Module:"),
     ("ENTRY", r"Entry:"),
     ("BLOCK", r"Block:"),
     ("END", r"End:"),
-    ("FUNC", r"Func"),
+    ("FUNC", r"Func\b"),
     ("EQUATION", r"Equation:"),
     ("ABOVE", r"Above:"),
     ("BELOW", r"Below:"),
@@ -13,29 +15,167 @@ TOKENS = [
     ("VERSION", r"Version:"),
     ("SUBJECT", r"Subject:"),
     ("ADDRESS", r"Address:"),
-    ("RETURN", r"Return"),
+    ("RETURN", r"Return\b"),
+    ("IMPORT", r'Import(?=[ \t]+")'),   # only a directive when a path follows
     ("IDENT", r"[A-Za-z_][A-Za-z0-9_]*"),
     ("STRING", r"\".*?\""),
     ("NUMBER", r"[0-9ab]+"),   # base-12
-    ("SYMBOL", r"[:;=()]"),
+    ("SYMBOL", r"[:;=(),.+\-*/<>@]|→"),
+    ("COMMENT", r"#[^\n]*"),
     ("NEWLINE", r"\n"),
     ("SPACE", r"[ \t]+"),
 ]
 
+SKIP = ("COMMENT", "NEWLINE", "SPACE")
+
+# One alternation in TOKENS order: the regex engine tries the branches
+# left to right at each position, which is exactly the old first-match loop.
+# Leading whitespace and comments are folded into the same match instead of
+# being tokens of their own.
+SKIP_RE = re.compile("(?:" + "|".join(regex for typ, regex in TOKENS if typ in SKIP) + ")*")
+MASTER = re.compile(SKIP_RE.pattern + "(?:" + "|".join(
+    f"(?P<{typ}>{regex})" for typ, regex in TOKENS if typ not in SKIP) + ")")
+
+# Compact streams store a token's kind as its index in TOKENS.
+KINDS = [typ for typ, _ in TOKENS]
+KIND = {typ: k for k, typ in enumerate(KINDS)}
+
+BYTES_SKIP_RE = re.compile(SKIP_RE.pattern.encode())
+BYTES_MASTER = re.compile(MASTER.pattern.encode())
+GROUP_KIND = bytes([0] + [KIND[typ] for typ, _ in sorted(BYTES_MASTER.groupindex.items(), key=lambda g: g[1])])
+
+Token = namedtuple("Token", "typ text start end line col")
+
+def iter_tokens(src: str):
+    """Lazily yield Tokens with their source span (offsets, 1-based line/col)."""
+    line, line_start, pos = 1, 0, 0
+    count, rfind, new = src.count, src.rfind, tuple.__new__
+    for m in iter(MASTER.scanner(src).match, None):
+        group = m.lastindex
+        start, pos = m.span(group)
+        newlines = count("\n", line_start, start)
+        if newlines:
+            line += newlines
+            line_start = rfind("\n", 0, start) + 1
+        yield new(Token, (m.lastgroup, m.group(group), start, pos, line, start - line_start + 1))
+    pos = SKIP_RE.match(src, pos).end()
+    if pos < len(src):
+        line += src.count("\n", line_start, pos)
+        line_start = src.rfind("\n", 0, pos) + 1
+        raise SyntaxError(f"Unexpected char at {pos} (line {line}, col {pos - line_start + 1}): {src[pos]}")
+
+class TokenList(list):
+    """tokenize()'s (typ, text) pairs, carrying a TokenStream over the same
+    spans so a Parser sees the same spacing between tokens as with lex().
+    from_pairs takes that stream as is: to parse edited pairs, edit a plain
+    list(tokens) copy."""
+    __slots__ = ("stream",)
+
 def tokenize(src: str):
-    tokens = []
-    i = 0
-    while i < len(src):
-        match = None
-        for typ, regex in TOKENS:
-            pattern = re.compile(regex)
-            match = pattern.match(src, i)
-            if match:
-                text = match.group(0)
-                if typ not in ("SPACE", "NEWLINE"):  # skip whitespace
-                    tokens.append((typ, text))
-                i = match.end(0)
-                break
-        if not match:
-            raise SyntaxError(f"Unexpected char at {i}: {src[i]}")
+    tokens = TokenList()
+    kinds, starts, ends = array("B"), array("I"), array("I")
+    add, add_kind, add_start, add_end, kind = tokens.append, kinds.append, starts.append, ends.append, KIND
+    for typ, text, start, end, _, _ in iter_tokens(src):
+        add((typ, text))
+        add_kind(kind[typ])
+        add_start(start)
+        add_end(end)
+    buf = src.encode()
+    if len(buf) != len(src):
+        # the spans are str offsets; a stream's are UTF-8 byte offsets
+        pos = byte = 0
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            byte += len(src[pos:start].encode())
+            starts[i] = byte
+            byte += len(src[start:end].encode())
+            ends[i] = byte
+            pos = end
+    tokens.stream = TokenStream(buf, kinds, starts, ends)
     return tokens
+
+class TokenStream:
+    """Tokens as parallel typed arrays over one shared UTF-8 source buffer.
+
+    Kinds are indexes into KINDS (array('B')), spans are byte offsets
+    (array('I')); token text is only decoded when asked for.
+    """
+    __slots__ = ("buf", "kinds", "starts", "ends")
+
+    def __init__(self, buf, kinds, starts, ends):
+        self.buf = memoryview(buf)
+        self.kinds = kinds
+        self.starts = starts
+        self.ends = ends
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Build a stream from a tokenize()-style list of (typ, text) tuples.
+
+        A tokenize() result hands back the stream over its spans, so
+        span_text (and with it every Version, Address and argument value)
+        matches lex(). Pairs built by hand have no spacing to keep: their
+        texts are joined as they are, so `2 . 0` reads back as "2.0", as it
+        would from source.
+        """
+        stream = getattr(pairs, "stream", None)
+        if stream is not None and len(stream) == len(pairs):
+            return stream
+        kinds, starts, ends = array("B"), array("I"), array("I")
+        chunks, pos = [], 0
+        for typ, text in pairs:
+            data = text.encode()
+            kinds.append(KIND[typ])
+            starts.append(pos)
+            pos += len(data)
+            ends.append(pos)
+            chunks.append(data)
+        return cls(b"".join(chunks), kinds, starts, ends)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, i):
+        return KINDS[self.kinds[i]], self.text(i)
+
+    def __iter__(self):
+        for i in range(len(self.kinds)):
+            yield self[i]
+
+    def typ(self, i):
+        return KINDS[self.kinds[i]]
+
+    def text(self, i):
+        return str(self.buf[self.starts[i]:self.ends[i]], "utf-8")
+
+    def raw(self, i):
+        return self.buf[self.starts[i]:self.ends[i]]
+
+    def span_text(self, i, j):
+        """Source text covering tokens i..j-1, including the spacing between them."""
+        return str(self.buf[self.starts[i]:self.ends[j - 1]], "utf-8")
+
+    def position(self, i):
+        """1-based (line, col) of token i, computed on demand for diagnostics."""
+        start = self.starts[i]
+        buf = self.buf.obj
+        return buf.count(b"\n", 0, start) + 1, start - buf.rfind(b"\n", 0, start)
+
+def lex(src):
+    """Tokenize into a TokenStream; accepts str or UTF-8 bytes."""
+    buf = src.encode() if isinstance(src, str) else bytes(src)
+    kinds, starts, ends = array("B"), array("I"), array("I")
+    add_kind, add_start, add_end = kinds.append, starts.append, ends.append
+    group_kind = GROUP_KIND
+    pos = 0
+    for m in iter(BYTES_MASTER.scanner(buf).match, None):
+        group = m.lastindex
+        start, pos = m.span(group)
+        add_kind(group_kind[group])
+        add_start(start)
+        add_end(pos)
+    pos = BYTES_SKIP_RE.match(buf, pos).end()
+    if pos < len(buf):
+        line = buf.count(b"\n", 0, pos) + 1
+        col = pos - buf.rfind(b"\n", 0, pos)
+        raise SyntaxError(f"Unexpected char at {pos} (line {line}, col {col}): {buf[pos:pos + 4].decode(errors='ignore')[:1]}")
+    return TokenStream(buf, kinds, starts, ends)
@@ -1,452 +1,309 @@
+import os
 import sys
-import json
-from lexer import tokenize
+import subprocess
+from lexer import lex
 from parser import Parser
-from ail import entangle_correction
-from sealed import create_seal
-from llvmlite import ir, binding as llvm
-
-def serialize_ast(node):
-    """Recursively serialize AST nodes to handle nested structures."""
-    if isinstance(node, list):
-        return [serialize_ast(n) for n in node]
-    elif hasattr(node, '__dict__'):
-        return {k: serialize_ast(v) for k, v in node.__dict__.items()}
-    else:
-        return node
-
-def generate_ir(ast):
-    module = ir.Module(name="lettera_module")
-
-    # Declare printf
-    voidptr_ty = ir.IntType(8).as_pointer()
-    printf_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty], var_arg=True)
-    printf = ir.Function(module, printf_ty, name="printf")
-
-    # Define main function
-    func_ty = ir.FunctionType(ir.IntType(32), [])
-    main_fn = ir.Function(module, func_ty, name="main")
-    block = main_fn.append_basic_block(name="entry")
-    builder = ir.IRBuilder(block)
-
-    # Extract message from AST
-    msg = "Hello, World"
+import binast
+from nodes import Arena, iter_ast_json
+from ail import correct_program
+from cache import CompileCache, compiler_tag
+from commands import block_calls, registry, runtime_sources
+from expr import equation
+from modules import ModuleCache, imported_declarations, load_imports
+from sealed import create_seal, format_merkle_seal, inject_seal, merkle_seal
+from phases import Profiler, count_ir, count_nodes, hooks_active
+# irgen (llvmlite.ir) and backend/jit (llvmlite.binding, which loads the LLVM
+# shared library) are imported where they are first needed, so `check`,
+# `emit-ast` and `ir` start without paying for what they never use.
+
+# S.E.R.A.P. corrections listed individually before the rest are summarized
+MAX_REPORTED = 10
+
+def option_value(args, name, default):
+    """Value of `--name=V` or `--name V` in args."""
+    for i, a in enumerate(args):
+        if a.startswith(name + "="):
+            return a.split("=", 1)[1]
+        if a == name and i + 1 < len(args):
+            return args[i + 1]
+    return default
+
+def front_end(source, input_file, modules, import_path=(), arena=None):
+    """(ast, libraries) for a letter: lex, parse, load its imports and run
+    S.E.R.A.P., as main does phase by phase. Every stage that compiles a
+    letter outside main (build, verify) goes through here. Raises
+    SyntaxError or ImportError."""
+    ast = Parser(lex(source), starched_mode=True, arena=arena).parse()
+    libraries = load_imports(ast, input_file, modules, extra=import_path)
+    return correct_program(ast), libraries
+
+def seal_envelope(ast):
+    """What a Merkle seal covers besides the Blocks: the compiler that lowered
+    them and every other top-level node."""
+    yield compiler_tag()
     for node in ast.children:
-        if node.kind == "Block":
-            above_nodes = [c for c in node.children if c.kind == "Above"]
-            if above_nodes:
-                msg = above_nodes[0].value[1].strip('"')
-            break
-
-    # Create global string
-    fmt_str = msg + "\n\0"
-    global_fmt = ir.GlobalVariable(module,
-                                   ir.ArrayType(ir.IntType(8), len(fmt_str)),
-                                   name="fmt")
-    global_fmt.linkage = "internal"
-    global_fmt.global_constant = True
-    global_fmt.initializer = ir.Constant(
-        ir.ArrayType(ir.IntType(8), len(fmt_str)),
-        bytearray(fmt_str.encode("utf8"))
-    )
-
-    # Get pointer to string
-    fmt_ptr = builder.gep(global_fmt, [ir.IntType(32)(0), ir.IntType(32)(0)])
-
-    # Call printf
-    builder.call(printf, [fmt_ptr])
-    builder.ret(ir.IntType(32)(0))
-
-    return str(module)
-
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: lettera <file.let> [output.ll]")
-        sys.exit(1)
-
-    input_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else "output.ll"
-
-    try:
-        with open(input_file, "r") as f:
-            source = f.read()
-    except FileNotFoundError:
-        print(f"Error: File '{input_file}' not found.")
-        sys.exit(1)
-
-    try:
-        tokens = tokenize(source)
-        parser = Parser(tokens, starched_mode=True)
-        ast = parser.parse()
-    except Exception as e:
-        print(f"Parsing error: {e}")
-        sys.exit(1)
-
-    # Apply correction
-    block_nodes = [c for c in ast.children if c.kind == "Block"]
-    if block_nodes:
-        entangle_correction(block_nodes[0])
-
-    # Generate IR
-    ir_code = generate_ir(ast)
-
-    # Create seal
-    serialized_ast = json.dumps(serialize_ast(ast), indent=2)
-    seal = create_seal(serialized_ast, ir_code)
-    print(f"[Lettera] Seal embedded: {seal[:16]}...")
-
-    # Write IR to file
-    try:
-        with open(output_file, "w") as f:
-            f.write(ir_code)
-        print(f"[Lettera] Compilation complete → {output_file}")
-    except IOError as e:
-        print(f"Error writing IR file: {e}")
-        sys.exit(1)
-
-    # Compile to bitcode
-    llvm.initialize()
-    llvm.initialize_native_target()
-    llvm.initialize_native_asmprinter()
-
-    try:
-        mod = llvm.parse_assembly(ir_code)
-        with open("output.bc", "wb") as f:
-            f.write(mod.as_bitcode())
-        print("[Lettera] Compilation complete → output.bc")
-        print("Use: llc output.bc -o output.s && clang output.s -o output.exe")
-    except Exception as e:
-        print(f"LLVM compilation error: {e}")
-        sys.exit(1)
-
-if __name__ == "__main__":
-    main()
-
-import sys
-import json
-from lexer import tokenize
-from parser import Parser
-from ail import entangle_correction
-from sealed import create_seal
-from llvmlite import ir, binding as llvm
-
-def serialize_ast(node):
-    if isinstance(node, list):
-        return [serialize_ast(n) for n in node]
-    elif hasattr(node, '__dict__'):
-        return {k: serialize_ast(v) for k, v in node.__dict__.items()}
-    else:
-        return node
-
-def generate_ir(ast):
-    module = ir.Module(name="lettera_module")
-
-    voidptr_ty = ir.IntType(8).as_pointer()
-    printf_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty], var_arg=True)
-    printf = ir.Function(module, printf_ty, name="printf")
-
-    func_ty = ir.FunctionType(ir.IntType(32), [])
-    main_fn = ir.Function(module, func_ty, name="main")
-    block = main_fn.append_basic_block(name="entry")
-    builder = ir.IRBuilder(block)
-
-    msg = "Hello, World"
+        if node.kind != "Block":
+            yield from iter_ast_json(node)
+
+def create_letter_seal(ast, ir_code, mode="linear", block_keys=(), stats=None):
+    """(seal, section payload) for a compiled letter; stats as for create_seal."""
+    if mode == "merkle":
+        root, leaves = merkle_seal(seal_envelope(ast), block_keys, stats)
+        return root, format_merkle_seal(root, leaves)
+    seal = create_seal(iter_ast_json(ast), ir_code, stats)
+    return seal, seal
+
+def check_blocks(ast, libraries):
+    """Reject what lowering would, without lowering (so without llvmlite):
+    every Equation is evaluated and every DJ command's arity and arguments
+    are checked against the letter's libraries. Raises ValueError."""
+    reg = registry(libraries)
+    symbols = {}
     for node in ast.children:
         if node.kind == "Block":
-            above_nodes = [c for c in node.children if c.kind == "Above"]
-            if above_nodes:
-                msg = above_nodes[0].value[1].strip('"')
-            break
-
-    fmt_str = msg + "\n\0"
-    global_fmt = ir.GlobalVariable(module,
-                                   ir.ArrayType(ir.IntType(8), len(fmt_str)),
-                                   name="fmt")
-    global_fmt.linkage = "internal"
-    global_fmt.global_constant = True
-    global_fmt.initializer = ir.Constant(
-        ir.ArrayType(ir.IntType(8), len(fmt_str)),
-        bytearray(fmt_str.encode("utf8"))
-    )
-
-    fmt_ptr = builder.gep(global_fmt, [ir.IntType(32)(0), ir.IntType(32)(0)])
-    builder.call(printf, [fmt_ptr])
-    builder.ret(ir.IntType(32)(0))
+            lhs, rhs = node.children[0].value
+            symbols[lhs] = equation(lhs, rhs, symbols)[0]
+            block_calls(node, reg)
+
+def finish_profile(profiler, show, trace_file):
+    """Print and/or write the compile's profile, then run the phases hooks."""
+    if show:
+        for line in profiler.table():
+            print(f"[Lettera] {line}")
+    if trace_file:
+        profiler.write_trace(trace_file)
+        print(f"[Lettera] Trace written → {trace_file}")
+    profiler.finish()
+
+def link_binary(seal, ir_code, obj_file="output.o", exe="hello.out", run=False):
+    # Link the in-process object with the runtimes its calls need
+    sources, flags = runtime_sources(ir_code)
+    # $CC is read per link: the compile server sets each request's environment
+    subprocess.run([os.environ.get("CC", "clang"), obj_file] + sources + ["-o", exe] + flags, check=True)
+
+    # Inject seal into final binary
+    if inject_seal(exe, seal):
+        print(f"[Lettera] Final binary sealed → {exe}")
+    else:
+        print("[Lettera] Seal injection skipped or failed.")
 
-    return str(module)
+    if run:
+        print("[Lettera] Running binary for seal verification...")
+        exe_path = exe if os.path.isabs(exe) else os.path.join(".", exe)
+        try:
+            result = subprocess.run([exe_path], check=True, capture_output=True, text=True)
+            print("[Lettera] Runtime output:")
+            print(result.stdout)
+        except subprocess.CalledProcessError as e:
+            print("[Lettera] Runtime verification failed:")
+            print(e.stderr)
 
 def main():
     args = sys.argv[1:]
+    # `lettera serve` keeps a warm compile daemon on a Unix socket (see client.py)
+    if args and args[0] == "serve":
+        from server import serve
+        sys.exit(serve(args[1] if len(args) > 1 else None))
+    # `lettera build <dir|glob>` compiles a whole tree of letters in import order
+    if args and args[0] == "build":
+        import build
+        sys.exit(build.main(args[1:]))
+    # `lettera verify bin=src.let...` checks sealed binaries against their sources
+    if args and args[0] == "verify":
+        import verify
+        sys.exit(verify.main(args[1:]))
+    # `lettera run file.let [--jit]` compiles and executes the letter
+    if args and args[0] == "run":
+        args = args[1:] + ["--run"]
+    # `lettera check|emit-ast|ir file.let` stop after S.E.R.A.P., after
+    # dumping the AST, or after writing the IR: none of them loads LLVM
+    stop = None
+    if args and args[0] in ("check", "emit-ast", "ir"):
+        stop, args = args[0], args[1:]
+        if stop == "emit-ast" and not any(a.startswith("--emit-ast") for a in args):
+            args = args + ["--emit-ast=" + option_value(args, "--format", "json")]
     if not args or args[0].startswith("-"):
-        print("Usage: lettera <file.let> [output.ll] [--emit-ast] [--opt-level=N]")
+        print("Usage: lettera serve [socket] | lettera build <dir|glob> [--out-dir D] [-j N] | lettera verify <bin=src.let>... [--path DIRS] | lettera check <file.let> | lettera emit-ast <file.let> [--format=bin|json] | lettera ir <file.let> [output.ll] | lettera [run] <file.let> [--jit] [output.ll] [--emit-ast[=bin|json]] [--arena] [--no-cache] [--jobs N] [--path DIRS] [--opt-level=N] [--emit-asm] [--emit-bc] [--seal] [--seal-mode=linear|merkle] [--run] [--profile] [--trace=out.json]")
         sys.exit(1)
 
     input_file = args[0]
     output_file = next((a for a in args if a.endswith(".ll")), "output.ll")
-    emit_ast = "--emit-ast" in args
+    # --emit-ast alone keeps the JSON dump; --emit-ast=bin writes the mmap-able binary form
+    emit_ast = next(("json" if a == "--emit-ast" else a.split("=", 1)[1] for a in args
+                     if a == "--emit-ast" or a.startswith("--emit-ast=")), None)
+    if emit_ast not in (None, "json", "bin"):
+        print(f"Error: --emit-ast must be bin or json, not {emit_ast}")
+        sys.exit(1)
+    arena = Arena() if "--arena" in args else None
+    use_cache = "--no-cache" not in args
+    jobs = int(option_value(args, "--jobs", "1"))
+    import_path = [p for p in option_value(args, "--path", "").split(os.pathsep) if p]
     opt_level = next((a.split("=")[1] for a in args if a.startswith("--opt-level=")), "0")
+    emit_asm = "--emit-asm" in args
+    emit_bc = "--emit-bc" in args
+    seal_enabled = "--seal" in args
+    seal_mode = option_value(args, "--seal-mode", "linear")
+    if seal_mode not in ("linear", "merkle"):
+        print(f"Error: --seal-mode must be linear or merkle, not {seal_mode}")
+        sys.exit(1)
+    run_enabled = "--run" in args
+    jit_enabled = "--jit" in args
+    # --profile prints a phase table, --trace=FILE writes a Chrome trace;
+    # registered phases hooks turn recording on as well
+    show_profile = "--profile" in args
+    trace_file = option_value(args, "--trace", None)
+    profiler = Profiler(enabled=show_profile or trace_file is not None or hooks_active(), label=input_file)
 
     try:
-        with open(input_file, "r") as f:
+        with profiler.phase("read") as phase, open(input_file, "r") as f:
             source = f.read()
+        phase.counters["bytes"] = len(source)
     except FileNotFoundError:
         print(f"Error: File '{input_file}' not found.")
         sys.exit(1)
 
     try:
-        tokens = tokenize(source)
-        parser = Parser(tokens, starched_mode=True)
-        ast = parser.parse()
+        with profiler.phase("lex") as phase:
+            tokens = lex(source)
+        phase.counters["tokens"] = len(tokens)
+        with profiler.phase("parse") as phase:
+            parser = Parser(tokens, starched_mode=True, arena=arena)
+            ast = parser.parse()
+        if profiler.enabled:
+            phase.counters["nodes"] = count_nodes(ast)
     except Exception as e:
         print(f"Parsing error: {e}")
         sys.exit(1)
 
-    block_nodes = [c for c in ast.children if c.kind == "Block"]
-    if block_nodes:
-        entangle_correction(block_nodes[0])
-
-    if emit_ast:
-        serialized_ast = json.dumps(serialize_ast(ast), indent=2)
-        with open("ast.json", "w") as f:
-            f.write(serialized_ast)
-        print("[Lettera] AST emitted → ast.json")
-        sys.exit(0)
-
-    ir_code = generate_ir(ast)
-    seal = create_seal(json.dumps(serialize_ast(ast)), ir_code)
-    print(f"[Lettera] Seal embedded: {seal[:16]}...")
-
+    # check leaves nothing behind in the working directory (editor save hooks)
+    modules = ModuleCache() if use_cache and stop != "check" else ModuleCache(path=None)
     try:
-        with open(output_file, "w") as f:
-            f.write(ir_code)
-        print(f"[Lettera] Compilation complete → {output_file}")
-    except IOError as e:
-        print(f"Error writing IR file: {e}")
+        with profiler.phase("imports") as phase:
+            libraries = load_imports(ast, input_file, modules, extra=import_path)
+        phase.counters.update(modules=len(libraries), parsed=modules.parsed, cached=modules.hits)
+    except (ImportError, SyntaxError) as e:
+        print(f"Import error: {e}")
         sys.exit(1)
+    if libraries:
+        print(f"[Lettera] Imports: {len(libraries)} modules, {len(imported_declarations(libraries))} declarations "
+              f"({modules.parsed} parsed, {modules.hits} cached)")
+
+    mismatches = []
+    with profiler.phase("serap") as phase:
+        correct_program(ast, tokens, mismatches)
+    phase.counters["corrected"] = len(mismatches)
+    if mismatches:
+        print(f"[Lettera] S.E.R.A.P.: corrected {len(mismatches)} asymmetric Blocks (Above ← Below)")
+        for m in mismatches[:MAX_REPORTED]:
+            where = f"lines {m.span[0]}-{m.span[2]}" if m.span else "no span"
+            print(f"[Lettera]   Block {m.block} ({where}): Above {m.above or '(empty)'} ≠ Below {m.below or '(empty)'}")
+        if len(mismatches) > MAX_REPORTED:
+            print(f"[Lettera]   ... and {len(mismatches) - MAX_REPORTED} more")
+
+    if stop == "check":
+        try:
+            with profiler.phase("check"):
+                check_blocks(ast, libraries)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        blocks = sum(1 for node in ast.children if node.kind == "Block")
+        print(f"[Lettera] Check passed: {input_file} ({blocks} Blocks)")
+        finish_profile(profiler, show_profile, trace_file)
+        sys.exit(0)
 
-    llvm.initialize()
-    llvm.initialize_native_target()
-    llvm.initialize_native_asmprinter()
-
-    try:
-        mod = llvm.parse_assembly(ir_code)
-        mod.verify()
-
-        target = llvm.Target.from_default_triple()
-        target_machine = target.create_target_machine(opt=int(opt_level))
-        with open("output.bc", "wb") as f:
-            f.write(mod.as_bitcode())
-        print(f"[Lettera] Bitcode emitted → output.bc (opt-level={opt_level})")
-        print("Use: llc output.bc -o output.s && clang output.s -o output.exe")
-    except Exception as e:
-        print(f"LLVM compilation error: {e}")
-        sys.exit(1)
-
-if __name__ == "__main__":
-    main()
-
-import sys
-import json
-from lexer import tokenize
-from parser import Parser
-from ail import entangle_correction
-from sealed import create_seal
-from llvmlite import ir, binding as llvm
-
-def serialize_ast(node):
-    if isinstance(node, list):
-        return [serialize_ast(n) for n in node]
-    elif hasattr(node, '__dict__'):
-        return {k: serialize_ast(v) for k, v in node.__dict__.items()}
-    else:
-        return node
-
-def generate_ir(ast):
-    module = ir.Module(name="lettera_module")
-
-    voidptr_ty = ir.IntType(8).as_pointer()
-    printf_ty = ir.FunctionType(ir.IntType(32), [voidptr_ty], var_arg=True)
-    printf = ir.Function(module, printf_ty, name="printf")
-
-    func_ty = ir.FunctionType(ir.IntType(32), [])
-    main_fn = ir.Function(module, func_ty, name="main")
-    block = main_fn.append_basic_block(name="entry")
-    builder = ir.IRBuilder(block)
-
-    msg = "Hello, World"
-    for node in ast.children:
-        if node.kind == "Block":
-            above_nodes = [c for c in node.children if c.kind == "Above"]
-            if above_nodes:
-                msg = above_nodes[0].value[1].strip('"')
-            break
-
-    fmt_str = msg + "\n\0"
-    global_fmt = ir.GlobalVariable(module,
-                                   ir.ArrayType(ir.IntType(8), len(fmt_str)),
-                                   name="fmt")
-    global_fmt.linkage = "internal"
-    global_fmt.global_constant = True
-    global_fmt.initializer = ir.Constant(
-        ir.ArrayType(ir.IntType(8), len(fmt_str)),
-        bytearray(fmt_str.encode("utf8"))
-    )
-
-    fmt_ptr = builder.gep(global_fmt, [ir.IntType(32)(0), ir.IntType(32)(0)])
-    builder.call(printf, [fmt_ptr])
-    builder.ret(ir.IntType(32)(0))
-
-    return str(module)
-
-def main():
-    args = sys.argv[1:]
-    if not args or args[0].startswith("-"):
-        print("Usage: lettera <file.let> [output.ll] [--emit-ast] [--opt-level=N]")
-        sys.exit(1)
-
-    input_file = args[0]
-    output_file = next((a for a in args if a.endswith(".ll")), "output.ll")
-    emit_ast = "--emit-ast" in args
-    opt_level = next((a.split("=")[1] for a in args if a.startswith("--opt-level=")), "0")
-
-    try:
-        with open(input_file, "r") as f:
-            source = f.read()
-    except FileNotFoundError:
-        print(f"Error: File '{input_file}' not found.")
-        sys.exit(1)
-
-    try:
-        tokens = tokenize(source)
-        parser = Parser(tokens, starched_mode=True)
-        ast = parser.parse()
-    except Exception as e:
-        print(f"Parsing error: {e}")
-        sys.exit(1)
-
-    block_nodes = [c for c in ast.children if c.kind == "Block"]
-    if block_nodes:
-        entangle_correction(block_nodes[0])
-
-    serialized_ast = json.dumps(serialize_ast(ast), indent=2)
+    if emit_ast == "bin":
+        with profiler.phase("emit-ast"):
+            binast.dump(ast, "ast.bin")
+        print("[Lettera] AST emitted → ast.bin")
+        finish_profile(profiler, show_profile, trace_file)
+        sys.exit(0)
 
     if emit_ast:
-        with open("ast.json", "w") as f:
-            f.write(serialized_ast)
+        with profiler.phase("emit-ast"), open("ast.json", "w") as f:
+            f.writelines(iter_ast_json(ast))
         print("[Lettera] AST emitted → ast.json")
+        finish_profile(profiler, show_profile, trace_file)
         sys.exit(0)
 
-    ir_code = generate_ir(ast)
-    seal = create_seal(serialized_ast, ir_code)
-    print(f"[Lettera] Seal embedded: {seal[:16]}...")
+    from irgen import generate_ir
+    cache = CompileCache() if use_cache else None
+    stats = {}
+    try:
+        with profiler.phase("lower") as phase:
+            ir_code = generate_ir(ast, cache=cache, jobs=jobs, stats=stats, libraries=libraries)
+    except ValueError as e:
+        # ill-typed Equations (expr), bad DJ command arguments (commands)
+        print(f"Error: {e}")
+        sys.exit(1)
+    phase.counters.update(blocks=len(stats["block_keys"]), ir_bytes=len(ir_code),
+                          string_constants=stats["string_constants"])
+    if cache is not None:
+        phase.counters.update(cache_hits=cache.hits, cache_misses=cache.misses)
+    print(f"[Lettera] String pool: {stats['string_uses']} uses → {stats['string_constants']} constants "
+          f"({stats['string_pool_hit_rate']:.1%} hits)")
+    if cache is not None:
+        print(f"[Lettera] Cache: {cache.hits} hits, {cache.misses} misses")
+    with profiler.phase("seal") as phase:
+        seal, seal_payload = create_letter_seal(ast, ir_code, seal_mode, stats["block_keys"], phase.counters)
+    print(f"[Lettera] Seal embedded: {seal[:16]}..." + (f" (merkle, {len(stats['block_keys']) + 1} leaves)" if seal_mode == "merkle" else ""))
 
     try:
-        with open(output_file, "w") as f:
+        with profiler.phase("write-ir"), open(output_file, "w") as f:
             f.write(ir_code)
         print(f"[Lettera] Compilation complete → {output_file}")
     except IOError as e:
         print(f"Error writing IR file: {e}")
         sys.exit(1)
 
-    llvm.initialize()
-    llvm.initialize_native_target()
-    llvm.initialize_native_asmprinter()
+    if stop == "ir":
+        finish_profile(profiler, show_profile, trace_file)
+        sys.exit(0)
 
+    if jit_enabled:
+        from jit import run_jit
+        print("[Lettera] Running in-process (MCJIT)...")
+        sys.stdout.flush()
+        try:
+            with profiler.phase("jit"):
+                code = run_jit(ir_code, int(opt_level))
+        except RuntimeError as e:
+            print(f"JIT error: {e}")
+            sys.exit(1)
+        finish_profile(profiler, show_profile, trace_file)
+        sys.exit(code)
+
+    from backend import Timings, compile_ir, create_target_machine, emit
     try:
-        mod = llvm.parse_assembly(ir_code)
-        mod.verify()
-
-        target = llvm.Target.from_default_triple()
-        target_machine = target.create_target_machine(opt=int(opt_level))
-        with open("output.bc", "wb") as f:
-            f.write(mod.as_bitcode())
-        print(f"[Lettera] Bitcode emitted → output.bc (opt-level={opt_level})")
-        print("Use: llc output.bc -o output.s && clang output.s -o output.exe")
+        timings = Timings(profiler if profiler.enabled else None)
+        target_machine = create_target_machine(int(opt_level))
+        mod = compile_ir(ir_code, int(opt_level), target_machine, timings)
+        if profiler.enabled:
+            # the module as optimized, counted outside any phase's time
+            ir_globals, functions, instructions = count_ir(mod)
+            profiler.phases[-1].counters.update(globals=ir_globals, functions=functions, instructions=instructions)
+        emit(mod, target_machine, "output.o",
+             asm_file="output.s" if emit_asm else None,
+             bc_file="output.bc" if emit_bc else None,
+             timings=timings)
+        print(f"[Lettera] Object emitted → output.o (opt-level={opt_level})")
+        print(f"[Lettera] Backend: {timings}")
     except Exception as e:
         print(f"LLVM compilation error: {e}")
         sys.exit(1)
 
-if __name__ == "__main__":
-    main()
-
-import subprocess
-import os
-from sealed import inject_seal
-
-# Compile down to object file
-subprocess.run(["llc", "output.bc", "-filetype=obj", "-o", "output.o"], check=True)
-
-# Link with runtime
-subprocess.run(["clang", "output.o", "src/runtime.c", "-o", "hello.out"], check=True)
-
-# Inject seal into final binary
-seal = create_seal(serialized_ast, ir_code)
-if inject_seal("hello.out", seal):
-    print("[Lettera] Final binary sealed → hello.out")
-else:
-    print("[Lettera] Seal injection skipped or failed.")
-
-seal_enabled = "--seal" in args
-if seal_enabled:
-    # run sealing logic
-
-import subprocess
-import os
-from sealed import inject_seal
-
-# Compile down to object file
-subprocess.run(["llc", "output.bc", "-filetype=obj", "-o", "output.o"], check=True)
-
-# Link with runtime
-subprocess.run(["clang", "output.o", "src/runtime.c", "-o", "hello.out"], check=True)
-
-# Inject seal into final binary
-seal = create_seal(serialized_ast, ir_code)
-if inject_seal("hello.out", seal):
-    print("[Lettera] Final binary sealed → hello.out")
-else:
-    print("[Lettera] Seal injection skipped or failed.")
-
-# ✅ Automatically run the binary to verify seal
-try:
-    result = subprocess.run(["./hello.out"], check=True, capture_output=True, text=True)
-    print("[Lettera] Runtime output:")
-    print(result.stdout)
-except subprocess.CalledProcessError as e:
-    print("[Lettera] Runtime verification failed:")
-    print(e.stderr)
-
-run_enabled = "--run" in args
-if run_enabled:
-    # run the binary
-
-seal_enabled = "--seal" in args
-if seal_enabled:
-    # Compile object file
-    subprocess.run(["llc", "output.bc", "-filetype=obj", "-o", "output.o"], check=True)
-
-    # Link with runtime
-    subprocess.run(["clang", "output.o", "src/runtime.c", "-o", "hello.out"], check=True)
-
-    # Inject seal
-    if inject_seal("hello.out", seal):
-        print("[Lettera] Final binary sealed → hello.out")
+    if seal_enabled or run_enabled:
+        try:
+            with profiler.phase("link"):
+                link_binary(seal_payload, ir_code, run=run_enabled)
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            print(f"Link error: {e}")
+            sys.exit(1)
     else:
-        print("[Lettera] Seal injection skipped or failed.")
-
-    # Run binary for verification
-    try:
-        result = subprocess.run(["./hello.out"], check=True, capture_output=True, text=True)
-        print("[Lettera] Runtime output:")
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print("[Lettera] Runtime verification failed:")
-        print(e.stderr)
-
-exe_name = "hello.out.exe" if os.name == "nt" else "./hello.out"
-subprocess.run([exe_name], ...)
-
-print("[Lettera] Running binary for seal verification...")
-
-subprocess.run(["clang", "output.o", "src/dj_runtime.c", "-o", "djset.out"])
+        sources, flags = runtime_sources(ir_code)
+        print("Use: " + " ".join(["clang", "output.o"] + [os.path.relpath(s) for s in sources]
+                                 + ["-o", "output.exe"] + flags))
+    finish_profile(profiler, show_profile, trace_file)
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""`Import "dj/djmeta.let"` resolution and the parsed-module cache.
+
+An import names a library letter relative to a search path: the importing
+file's directory, any --path/LETTERA_PATH directories, then stdlib/.
+Libraries contribute declarations, not code: each Block's Equation names a
+command and its parameters (`Crossfade = (Duration, Type)`) or a field and
+its type (`BPM = <number>`).
+"""
+import hashlib
+import json
+import os
+import sys
+from collections import namedtuple
+
+import lexer
+import nodes
+import parser
+from cache import CACHE_DIR, compiler_tag
+
+STDLIB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "stdlib")
+MODULE_CACHE_DIR = os.path.join(CACHE_DIR, "modules")
+
+# params is a tuple for commands (a trailing "..." marks a variadic one), None for fields
+Declaration = namedtuple("Declaration", "name params type")
+# imports are the names as written; they are resolved against the search path on load
+Library = namedtuple("Library", "path digest imports ast declarations")
+
+# abs path -> ((mtime_ns, size), Library), shared by every ModuleCache in the
+# process so a build worker or the compile daemon parses each library once.
+_loaded = {}
+
+def search_path(importer=None, extra=()):
+    dirs = [os.path.dirname(os.path.abspath(importer))] if importer else []
+    dirs += list(extra)
+    dirs += [d for d in os.environ.get("LETTERA_PATH", "").split(os.pathsep) if d]
+    dirs.append(STDLIB_DIR)
+    return dirs
+
+def resolve(name, importer=None, extra=()):
+    """Absolute path of the library an Import names, or None."""
+    for d in search_path(importer, extra):
+        path = os.path.join(d, name)
+        if os.path.isfile(path):
+            return os.path.abspath(path)
+    return None
+
+def declarations(ast):
+    decls = []
+    for node in ast.children:
+        if node.kind != "Block":
+            continue
+        name, rhs = node.children[0].value
+        rhs = rhs.strip()
+        if rhs.startswith("(") and rhs.endswith(")"):
+            params = tuple(p.strip() for p in rhs[1:-1].split(",") if p.strip())
+            decls.append(Declaration(name, params, None))
+        else:
+            decls.append(Declaration(name, None, rhs.strip("<>")))
+    return tuple(decls)
+
+class ModuleCache:
+    """Parsed libraries, memoized in-process by (mtime, size) and on disk by
+    content hash under path (None keeps them in memory only).
+
+    A disk entry holds the library's AST, its import names and its
+    declarations, so a library that is imported by many letters is parsed
+    once per content change.
+    """
+
+    def __init__(self, path=MODULE_CACHE_DIR):
+        self.path = path
+        # entries hold ASTs (nodes) parsed (lexer, parser) into Library records (this module)
+        self.tag = compiler_tag(lexer, parser, nodes, sys.modules[__name__])
+        self.parsed = 0
+        self.hits = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def file(self, digest):
+        return os.path.join(self.path, f"{self.tag}-{digest}.json")
+
+    def load(self, path):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = _loaded.get(path)
+        if entry is not None and entry[0] == stamp:
+            self.hits += 1
+            return entry[1]
+        with open(path, "rb") as f:
+            source = f.read()
+        digest = hashlib.sha256(source).hexdigest()[:32]
+        library = self.read(path, digest)
+        if library is None:
+            library = self.parse(path, digest, source)
+            self.write(library)
+        else:
+            self.hits += 1
+        _loaded[path] = (stamp, library)
+        return library
+
+    def parse(self, path, digest, source):
+        ast = parser.Parser(lexer.lex(source), starched_mode=True).parse()
+        self.parsed += 1
+        imports = tuple(node.value for node in ast.children if node.kind == "Import")
+        return Library(path, digest, imports, ast, declarations(ast))
+
+    def read(self, path, digest):
+        if self.path is None:
+            return None
+        try:
+            with open(self.file(digest), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return Library(path, digest, tuple(data["imports"]), nodes.deserialize_ast(data["ast"]),
+                       tuple(Declaration(name, tuple(params) if params is not None else None, typ)
+                             for name, params, typ in data["declarations"]))
+
+    def write(self, library):
+        if self.path is None:
+            return
+        data = {"imports": library.imports, "ast": nodes.serialize_ast(library.ast),
+                "declarations": library.declarations}
+        tmp = self.file(library.digest) + f".{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.file(library.digest))
+
+def load_imports(ast, importer, cache=None, extra=()):
+    """Libraries imported by ast (a Program parsed from importer), transitively,
+    in dependency order with each library listed once."""
+    return load_import_names([node.value for node in ast.children if node.kind == "Import"],
+                             importer, cache, extra)
+
+def load_import_names(names, importer=None, cache=None, extra=()):
+    """As load_imports, for the import names of a letter; with no importer
+    they resolve against the search path alone (LETTERA_PATH, stdlib/)."""
+    cache = cache if cache is not None else ModuleCache(path=None)
+    loaded, active = {}, [os.path.abspath(importer)] if importer else []
+
+    def visit(names, importer):
+        for name in names:
+            path = resolve(name, importer, extra)
+            if path is None:
+                raise ImportError(f"{name} not found (imported by {importer or 'the letter'}; "
+                                  f"searched {os.pathsep.join(search_path(importer, extra))})")
+            if path in active:
+                cycle = " → ".join(os.path.basename(p) for p in active[active.index(path):] + [path])
+                raise ImportError(f"import cycle: {cycle}")
+            if path in loaded:
+                continue
+            library = cache.load(path)
+            active.append(path)
+            visit(library.imports, path)
+            active.pop()
+            loaded[path] = library
+
+    visit(names, importer)
+    return list(loaded.values())
+
+def imported_declarations(libraries):
+    """Name -> Declaration across libraries; a later import overrides an earlier one."""
+    return {decl.name: decl for library in libraries for decl in library.declarations}
@@ -0,0 +1,175 @@
+import json
+from array import array
+
+class Node:
+    __slots__ = ("kind", "value", "children")
+
+    def __init__(self, kind, value=None, children=None):
+        self.kind = kind
+        self.value = value
+        self.children = children or []
+
+    def __repr__(self):
+        return f"Node({self.kind}, {self.value}, {self.children})"
+
+def serialize_ast(node):
+    if isinstance(node, list):
+        return [serialize_ast(n) for n in node]
+    elif hasattr(node, "kind"):
+        return {"kind": node.kind, "value": node.value, "children": serialize_ast(node.children)}
+    else:
+        return node
+
+def iter_ast_json(node, level=0):
+    """json.dumps(serialize_ast(node), indent=2), produced in chunks as the
+    tree is walked instead of as one string built from a dict copy."""
+    pad = "  " * (level + 1)
+    value = json.dumps(node.value, indent=2).replace("\n", "\n" + pad)
+    yield f'{{\n{pad}"kind": {json.dumps(node.kind)},\n{pad}"value": {value},\n{pad}"children": '
+    children = node.children
+    if children:
+        inner = "  " * (level + 2)
+        for i, child in enumerate(children):
+            yield ("[\n" if i == 0 else ",\n") + inner
+            yield from iter_ast_json(child, level + 2)
+        yield f"\n{pad}]"
+    else:
+        yield "[]"
+    yield "\n" + "  " * level + "}"
+
+def deserialize_ast(data):
+    """Inverse of serialize_ast: JSON lists become the tuples Equation and Stmt values use."""
+    value = data["value"]
+    if isinstance(value, list):
+        value = tuple(tuple(v) if isinstance(v, list) else v for v in value)
+    return Node(data["kind"], value, [deserialize_ast(c) for c in data["children"]])
+
+def format_stmt(stmt):
+    verb, args = stmt.value
+    return f"{verb}({', '.join(args)});"
+
+def format_block(block):
+    """Normalized source of a Block: canonical spacing, call-form statements,
+    no comments. It parses back to the same Block."""
+    eq, above, below = block.children
+    lhs, rhs = eq.value
+    return (f"Block:\n    Equation: {lhs} = {rhs};\n"
+            f"    Above: {' '.join(format_stmt(s) for s in above.children)}\n"
+            f"    Below: {' '.join(format_stmt(s) for s in below.children)}\n")
+
+NODE_KINDS = ["Program", "Module", "Entry", "Block", "Equation", "Above", "Below", "Stmt", "End",
+              "TARGET", "VERSION", "SUBJECT", "ADDRESS", "Import"]
+
+NIL = -1
+
+class Arena:
+    """Columnar AST store: nodes are integer handles into parallel arrays.
+
+    kinds[h] indexes kind_names, values[h] indexes the interned value pool
+    (0 is None), and the tree is threaded through first_child/next_sibling.
+    """
+
+    def __init__(self):
+        self.kind_names = list(NODE_KINDS)
+        self.kind_ids = {k: i for i, k in enumerate(self.kind_names)}
+        self.kinds = array("B")
+        self.values = array("I")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.pool = [None]
+        self.pool_ids = {}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def intern(self, value):
+        if value is None:
+            return 0
+        idx = self.pool_ids.get(value)
+        if idx is None:
+            idx = self.pool_ids[value] = len(self.pool)
+            self.pool.append(value)
+        return idx
+
+    def add(self, kind, value=None, children=()):
+        kid = self.kind_ids.get(kind)
+        if kid is None:
+            kid = self.kind_ids[kind] = len(self.kind_names)
+            self.kind_names.append(kind)
+        h = len(self.kinds)
+        self.kinds.append(kid)
+        self.values.append(self.intern(value))
+        self.first_child.append(NIL)
+        self.next_sibling.append(NIL)
+        self.link(h, children)
+        return h
+
+    def link(self, h, children):
+        """Make children (handles) the child list of h, replacing any previous one."""
+        prev = NIL
+        for c in children:
+            if prev == NIL:
+                self.first_child[h] = c
+            else:
+                self.next_sibling[prev] = c
+            prev = c
+        if prev == NIL:
+            self.first_child[h] = NIL
+        else:
+            self.next_sibling[prev] = NIL
+
+    def child_handles(self, h):
+        c = self.first_child[h]
+        while c != NIL:
+            yield c
+            c = self.next_sibling[c]
+
+    def node(self, kind, value=None, children=None):
+        """Node-compatible constructor: returns a NodeRef living in this arena."""
+        return NodeRef(self, self.add(kind, value, [self.adopt(c) for c in children or ()]))
+
+    def adopt(self, node):
+        """Handle for node, copying Node trees (or refs from another arena) in."""
+        if isinstance(node, NodeRef) and node.arena is self:
+            return node.h
+        return self.add(node.kind, node.value, [self.adopt(c) for c in node.children])
+
+    def to_node(self, h):
+        return Node(self.kind_names[self.kinds[h]], self.pool[self.values[h]],
+                    [self.to_node(c) for c in self.child_handles(h)])
+
+class NodeRef:
+    """A Node-shaped view of one arena handle, so AST consumers accept either form."""
+    __slots__ = ("arena", "h")
+
+    def __init__(self, arena, h):
+        self.arena = arena
+        self.h = h
+
+    @property
+    def kind(self):
+        return self.arena.kind_names[self.arena.kinds[self.h]]
+
+    @property
+    def value(self):
+        return self.arena.pool[self.arena.values[self.h]]
+
+    @value.setter
+    def value(self, value):
+        self.arena.values[self.h] = self.arena.intern(value)
+
+    @property
+    def children(self):
+        arena = self.arena
+        return [NodeRef(arena, c) for c in arena.child_handles(self.h)]
+
+    @children.setter
+    def children(self, nodes):
+        self.arena.link(self.h, [self.arena.adopt(n) for n in nodes])
+
+    def __repr__(self):
+        return f"Node({self.kind}, {self.value}, {self.children})"
+
+def detach(node):
+    """A standalone Node tree for node, e.g. to pickle it to a worker process."""
+    return node.arena.to_node(node.h) if isinstance(node, NodeRef) else node
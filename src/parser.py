@@ -1,84 +1,198 @@
-from ast import Node
+from nodes import Node
+from lexer import KIND, TokenStream
+
+METADATA = {KIND[t] for t in ("TARGET", "VERSION", "SUBJECT", "ADDRESS")}
+# Gate keywords close whatever statement or section is open before them.
+GATES = {KIND[t] for t in ("MODULE", "ENTRY", "BLOCK", "END", "EQUATION", "ABOVE", "BELOW")} | METADATA
+IDENT, STRING, SYMBOL = KIND["IDENT"], KIND["STRING"], KIND["SYMBOL"]
 
 class Parser:
-    def __init__(self, tokens, starched_mode=True):
+    def __init__(self, tokens, starched_mode=True, arena=None):
+        # A TokenStream is consumed in place; tokenize()-style lists are packed.
+        if not isinstance(tokens, TokenStream):
+            tokens = TokenStream.from_pairs(tokens)
         self.tokens = tokens
+        self.kinds = tokens.kinds
         self.i = 0
         self.starched = starched_mode
+        # Nodes are built either as Node objects or as handles in an Arena.
+        self.arena = arena
+        self.new = arena.node if arena is not None else Node
+
+    def peek_kind(self):
+        return self.kinds[self.i] if self.i < len(self.kinds) else None
 
     def peek(self):
-        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None)
+        return self.tokens[self.i] if self.i < len(self.kinds) else (None, None)
+
+    def at_symbol(self, sym, i=None):
+        i = self.i if i is None else i
+        return i < len(self.kinds) and self.kinds[i] == SYMBOL and self.tokens.raw(i) == sym.encode()
+
+    def error(self, msg):
+        if self.i < len(self.kinds):
+            line, col = self.tokens.position(self.i)
+            return SyntaxError(f"line {line}, col {col}: {msg}")
+        return SyntaxError(f"end of input: {msg}")
+
+    def skip(self, typ):
+        """Consume one token of kind typ without materializing its text."""
+        if self.peek_kind() != KIND[typ]:
+            raise self.error(f"Expected {typ}, got {self.peek()}")
+        self.i += 1
+
+    def skip_symbol(self, sym):
+        if not self.at_symbol(sym):
+            raise self.error(f"Expected '{sym}', got {self.peek()}")
+        self.i += 1
 
     def eat(self, typ=None):
         tok = self.peek()
         if typ and tok[0] != typ:
-            raise SyntaxError(f"Expected {typ}, got {tok}")
+            raise self.error(f"Expected {typ}, got {tok}")
         self.i += 1
         return tok
 
+    def end_statement(self):
+        """Consume the closing ';' — mandatory in Starched Paper Mode."""
+        if self.at_symbol(";"):
+            self.i += 1
+        elif self.starched:
+            raise self.error("Missing semicolon in Starched Paper Mode")
+
     def parse(self):
-        module = self.parse_module()
-        entry = self.parse_entry()
-        block = self.parse_block()
-        end = self.parse_end()
-        return Node("Program", children=[module, entry, block, end])
+        return self.new("Program", children=list(self.stream()))
+
+    def stream(self):
+        """Yield the top-level nodes (each Import, Module, Entry, each Block, End) as they are parsed."""
+        yield from self.iter_imports()
+        yield self.parse_module()
+        yield self.parse_entry()
+        yield from self.iter_blocks()
+        yield self.parse_end()
+        if self.i < len(self.kinds):
+            raise self.error(f"Unexpected {self.peek()} after End:")
+
+    def iter_imports(self):
+        """`Import "dj/djmeta.let"` lines ahead of the Module gate; the ';' is optional."""
+        while self.peek_kind() == KIND["IMPORT"]:
+            self.i += 1
+            path = self.eat("STRING")[1][1:-1]
+            if self.at_symbol(";"):
+                self.i += 1
+            yield self.new("Import", value=path)
+
+    def iter_blocks(self):
+        while self.peek_kind() == KIND["BLOCK"]:
+            yield self.parse_block()
 
     def parse_module(self):
-        self.eat("MODULE")
-        return Node("Module", children=self.collect_metadata())
+        self.skip("MODULE")
+        return self.new("Module", children=self.collect_metadata())
 
     def collect_metadata(self):
         nodes = []
-        while self.peek()[0] in ("TARGET","VERSION","SUBJECT","ADDRESS"):
-            key, val = self.eat()
-            if self.starched and not self.peek()[1].endswith(";"):
-                raise SyntaxError("Missing semicolon in Starched Paper Mode")
-            nodes.append(Node(key, val))
-            self.eat("SYMBOL")  # consume ;
+        while self.peek_kind() in METADATA:
+            key = self.tokens.typ(self.i)
+            self.i += 1
+            nodes.append(self.new(key, self.collect_value()))
+            self.end_statement()
         return nodes
 
+    def collect_value(self):
+        """Source text of the tokens up to the next ';' or gate keyword."""
+        start = self.i
+        while self.i < len(self.kinds) and self.kinds[self.i] not in GATES and not self.at_symbol(";"):
+            self.i += 1
+        return self.tokens.span_text(start, self.i) if self.i > start else ""
+
     def parse_entry(self):
-        self.eat("ENTRY")
-        self.eat("FUNC")
+        self.skip("ENTRY")
+        self.skip("FUNC")
         name = self.eat("IDENT")[1]
-        self.eat("SYMBOL")  # (
-        self.eat("SYMBOL")  # )
-        self.eat("SYMBOL")  # :
-        if self.starched: self.eat("SYMBOL")  # ;
-        return Node("Entry", value=name)
+        self.skip_symbol("(")
+        self.skip_symbol(")")
+        self.skip_symbol(":")
+        self.end_statement()
+        return self.new("Entry", value=name)
 
     def parse_block(self):
-        self.eat("BLOCK")
-        self.eat("EQUATION")
+        self.skip("BLOCK")
+        self.skip("EQUATION")
         eq_left = self.eat("IDENT")[1]
-        self.eat("SYMBOL")
-        eq_right = self.eat("IDENT")[1]
-        eq = Node("Equation", value=(eq_left, eq_right))
+        self.skip_symbol("=")
+        eq_right = self.collect_value()
+        if not eq_right:
+            raise self.error(f"Equation {eq_left} has no right-hand side")
+        self.end_statement()
+        eq = self.new("Equation", value=(eq_left, eq_right))
+
+        self.skip("ABOVE")
+        above = self.new("Above", children=self.parse_statements())
+
+        self.skip("BELOW")
+        below = self.new("Below", children=self.parse_statements())
+
+        return self.new("Block", children=[eq, above, below])
+
+    def parse_statements(self):
+        stmts = []
+        while self.peek_kind() == IDENT:
+            stmts.append(self.parse_statement())
+        if self.i < len(self.kinds) and self.kinds[self.i] not in GATES:
+            raise self.error(f"Expected a statement, got {self.peek()}")
+        return stmts
+
+    def parse_statement(self):
+        """One section statement: `Print "x"`, `BPM=128`, or `Crossfade(8s, "linear")`."""
+        verb = self.eat("IDENT")[1]
+        if self.at_symbol("("):
+            self.i += 1
+            args = self.collect_args()
+        else:
+            if self.at_symbol("="):
+                self.i += 1
+            args = self.collect_operand()
+        self.end_statement()
+        return self.new("Stmt", value=(verb, args))
 
-        self.eat("ABOVE")
-        above_stmt = self.eat("IDENT")[1], self.eat("STRING")[1]
+    def collect_args(self):
+        """Comma-separated arguments up to the matching ')', as source text."""
+        args, start, depth = [], self.i, 0
+        while True:
+            if self.i >= len(self.kinds) or self.kinds[self.i] in GATES:
+                raise self.error("Unclosed '(' in statement")
+            if self.at_symbol("("):
+                depth += 1
+            elif self.at_symbol(")") and depth:
+                depth -= 1
+            elif self.at_symbol(")") or (self.at_symbol(",") and not depth):
+                if self.i > start:
+                    args.append(self.tokens.span_text(start, self.i))
+                closing = self.at_symbol(")")
+                self.i += 1
+                if closing:
+                    return tuple(args)
+                start = self.i
+                continue
+            self.i += 1
 
-        self.eat("BELOW")
-        below_stmt = self.eat("IDENT")[1], self.eat("STRING")[1]
+    def collect_operand(self):
+        """A bare operand up to ';' — or, outside Starched mode, up to the next statement."""
+        start = self.i
+        while self.i < len(self.kinds) and self.kinds[self.i] not in GATES and not self.at_symbol(";"):
+            if not self.starched and self.i > start and self.starts_statement(self.i):
+                break
+            self.i += 1
+        return (self.tokens.span_text(start, self.i),) if self.i > start else ()
 
-        return Node("Block", children=[eq,
-                Node("Above", value=above_stmt),
-                Node("Below", value=below_stmt)])
+    def starts_statement(self, i):
+        return (self.kinds[i] == IDENT and i + 1 < len(self.kinds)
+                and (self.kinds[i + 1] == STRING or self.at_symbol("=", i + 1) or self.at_symbol("(", i + 1)))
 
     def parse_end(self):
-        self.eat("END")
-        self.eat("RETURN")
+        self.skip("END")
+        self.skip("RETURN")
         code = self.eat("NUMBER")[1]
-        if self.starched: self.eat("SYMBOL")
-        return Node("End", value=code)
-
-DJ_KEYWORDS = {"BPM", "Key", "Energy", "Crossfade", "Filter"}
-
-# inside parse_block:
-rhs_tokens = []
-while self.peek()[0] not in ("ABOVE", "BELOW"):
-    tok = self.eat()[1]
-    if tok in DJ_KEYWORDS:
-        rhs_tokens.append(("DJCMD", tok))
-    else:
-        rhs_tokens.append(("TOK", tok))
+        self.end_statement()
+        return self.new("End", value=code)
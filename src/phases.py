@@ -0,0 +1,148 @@
+"""Per-phase compiler instrumentation: wall time, allocations (tracemalloc)
+and counters for each phase of a compile, written as a Chrome trace
+(chrome://tracing, Perfetto) or printed as a table.
+
+main records into a Profiler under --profile / --trace=out.json, or
+whenever a hook is registered. Hooks are the programmatic surface: each is
+called with the finished Profiler after every profiled compile in the
+process, so a build farm can collect the same metrics across many
+compiles:
+
+    import phases
+    phases.add_hook(lambda profile: ship(profile.summary()))
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_hooks = []
+
+def add_hook(fn):
+    """Call fn(profiler) after every profiled compile; returns fn, so it
+    also works as a decorator."""
+    _hooks.append(fn)
+    return fn
+
+def remove_hook(fn):
+    _hooks.remove(fn)
+
+def hooks_active():
+    return bool(_hooks)
+
+class Phase:
+    """One timed phase. counters may be filled in after the phase ends, so
+    counting its output is not charged to its time."""
+    __slots__ = ("name", "start", "seconds", "alloc_net", "alloc_peak", "counters")
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.seconds = 0.0
+        self.alloc_net = 0
+        self.alloc_peak = 0
+        self.counters = {}
+
+    def as_dict(self):
+        return {"name": self.name, "seconds": round(self.seconds, 6), "alloc_net_bytes": self.alloc_net,
+                "alloc_peak_bytes": self.alloc_peak, "counters": self.counters}
+
+class Profiler:
+    """Phases of one compile, in the order they ran. A disabled Profiler
+    hands out throwaway Phases and records nothing, so callers need no
+    checks of their own. With trace_memory, tracemalloc runs for the
+    profiler's lifetime (which slows the compile down noticeably)."""
+
+    def __init__(self, enabled=True, trace_memory=True, label=None):
+        self.enabled = enabled
+        self.label = label
+        self.phases = []
+        self.origin = time.perf_counter()
+        self.tracing = enabled and trace_memory and not tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name, **counters):
+        record = Phase(name, time.perf_counter() - self.origin)
+        record.counters.update(counters)
+        if not self.enabled:
+            yield record
+            return
+        memory = tracemalloc.is_tracing()
+        if memory:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        t0 = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - t0
+            if memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record.alloc_net, record.alloc_peak = current - before, peak - before
+            self.phases.append(record)
+
+    def finish(self):
+        """Stop tracing memory and hand the profile to every hook."""
+        if self.tracing:
+            tracemalloc.stop()
+            self.tracing = False
+        if self.enabled:
+            for hook in list(_hooks):
+                hook(self)
+
+    def summary(self):
+        return {"label": self.label, "seconds": round(sum(p.seconds for p in self.phases), 6),
+                "phases": [p.as_dict() for p in self.phases]}
+
+    def chrome_trace(self):
+        """Trace Event Format: one complete ("X") event per phase carrying its
+        counters, and a counter ("C") event tracking traced memory."""
+        pid, tid = os.getpid(), threading.get_ident()
+        events, memory = [], 0
+        for p in self.phases:
+            ts = round(p.start * 1e6, 3)
+            args = dict(p.counters, alloc_net_bytes=p.alloc_net, alloc_peak_bytes=p.alloc_peak)
+            events.append({"name": p.name, "cat": "lettera", "ph": "X", "ts": ts,
+                           "dur": round(p.seconds * 1e6, 3), "pid": pid, "tid": tid, "args": args})
+            memory += p.alloc_net
+            events.append({"name": "traced memory", "ph": "C", "ts": round(ts + p.seconds * 1e6, 3),
+                           "pid": pid, "args": {"bytes": memory}})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"label": self.label, "summary": self.summary()}}
+
+    def write_trace(self, path):
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f, indent=1)
+
+    def table(self):
+        """The profile as aligned text lines, slowest phases easy to spot."""
+        total = sum(p.seconds for p in self.phases) or 1.0
+        lines = [f"{'phase':<18} {'ms':>10} {'%':>6} {'alloc peak':>12} {'alloc net':>12}  counters"]
+        for p in self.phases:
+            counters = ", ".join(f"{k}={v}" for k, v in p.counters.items())
+            lines.append(f"{p.name:<18} {p.seconds * 1000:10.2f} {p.seconds / total:6.1%} "
+                         f"{p.alloc_peak / 1024:10.1f}kB {p.alloc_net / 1024:10.1f}kB  {counters}")
+        lines.append(f"{'total':<18} {total * 1000:10.2f}")
+        return lines
+
+def count_nodes(node):
+    """Nodes in an AST (Node tree or arena view)."""
+    arena = getattr(node, "arena", None)
+    if arena is not None:
+        return len(arena)
+    count, stack = 0, [node]
+    while stack:
+        n = stack.pop()
+        count += 1
+        stack.extend(n.children)
+    return count
+
+def count_ir(mod):
+    """(globals, functions, instructions) of a parsed llvmlite ModuleRef."""
+    functions = [f for f in mod.functions if not f.is_declaration]
+    instructions = sum(1 for f in functions for b in f.blocks for _ in b.instructions)
+    return sum(1 for _ in mod.global_variables), len(functions), instructions
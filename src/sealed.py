@@ -1,3 +1,4 @@
+import functools
 import hashlib
 import subprocess
 import os
@@ -5,13 +6,108 @@ import tempfile
 import platform
 import shutil
 
-def create_seal(ast_json, ir_code):
+import elf
+
+# Text is encoded and hashed in slices of about this many characters
+CHUNK = 1 << 20
+# Domain separation between Merkle leaves and interior nodes (as in RFC 6962)
+LEAF, NODE = b"\x00", b"\x01"
+MERKLE_TAG = "merkle-sha256"
+
+def feed(digest, text):
+    """
+    Hash text (a str, or an iterable of str chunks such as nodes.iter_ast_json)
+    without building one big encoded copy of it. Returns the bytes hashed.
+    """
+    hashed = 0
+    if isinstance(text, str):
+        for i in range(0, len(text), CHUNK):
+            data = text[i:i + CHUNK].encode()
+            digest.update(data)
+            hashed += len(data)
+        return hashed
+    buf, size = [], 0
+    for chunk in text:
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= CHUNK:
+            data = "".join(buf).encode()
+            digest.update(data)
+            hashed += len(data)
+            buf, size = [], 0
+    if buf:
+        data = "".join(buf).encode()
+        digest.update(data)
+        hashed += len(data)
+    return hashed
+
+def create_seal(ast_json, ir_code, stats=None):
     """
     Create a SHA-256 seal from the serialized AST and LLVM IR code.
+
+    Both may be strings or iterables of string chunks; they are hashed
+    incrementally, so the seal equals sha256(ast_json + ir_code) without
+    that concatenation ever existing. Pass a dict as stats to count the
+    bytes hashed under "bytes_hashed".
+    """
+    digest = hashlib.sha256()
+    hashed = feed(digest, ast_json) + feed(digest, ir_code)
+    if stats is not None:
+        stats["bytes_hashed"] = stats.get("bytes_hashed", 0) + hashed
+    return digest.hexdigest()
+
+def merkle_root(leaves):
+    """
+    Root of the binary hash tree over leaves (raw digests); an odd node
+    at the end of a level is carried up unchanged.
+    """
+    level = [hashlib.sha256(LEAF + leaf).digest() for leaf in leaves]
+    if not level:
+        return hashlib.sha256(b"").digest()
+    while len(level) > 1:
+        paired = [hashlib.sha256(NODE + level[i] + level[i + 1]).digest() for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            paired.append(level[-1])
+        level = paired
+    return level[0]
+
+def merkle_seal(envelope, block_keys, stats=None):
+    """
+    Per-Block seal: one leaf for the envelope (everything outside the
+    Blocks, plus the compiler tag) and one per Block. The Block leaves are
+    the content keys irgen already computed for its fragments, so re-sealing
+    after an edit only hashes the edited Blocks.
+
+    Returns (root hex, leaf digests); stats as for create_seal.
     """
-    data = ast_json.encode() + ir_code.encode()
-    return hashlib.sha256(data).hexdigest()
+    envelope_digest = hashlib.sha256()
+    hashed = feed(envelope_digest, envelope)
+    if stats is not None:
+        # each of the n leaves hashes a tag byte and a digest, each of the
+        # n - 1 interior nodes a tag byte and two digests
+        n = len(block_keys) + 1
+        stats["bytes_hashed"] = stats.get("bytes_hashed", 0) + hashed + 33 * n + 65 * (n - 1)
+    leaves = [envelope_digest.digest()] + [bytes.fromhex(key) for key in block_keys]
+    return merkle_root(leaves).hex(), leaves
 
+def format_merkle_seal(root, leaves):
+    """
+    Section payload for a Merkle seal: a header line with the root, then
+    one leaf per line, so a verifier can tell which Block differs.
+    """
+    return "\n".join([f"{MERKLE_TAG}:{root}"] + [leaf.hex() for leaf in leaves]) + "\n"
+
+def parse_merkle_seal(payload):
+    """
+    Inverse of format_merkle_seal: (root hex, leaf digests), or None for a
+    plain seal.
+    """
+    lines = payload.strip().splitlines()
+    if not lines or not lines[0].startswith(MERKLE_TAG + ":"):
+        return None
+    return lines[0].split(":", 1)[1], [bytes.fromhex(line) for line in lines[1:]]
+
+@functools.lru_cache(maxsize=None)
 def find_objcopy():
     """
     Try to locate a working objcopy tool: prefer llvm-objcopy, fallback to GNU objcopy.
@@ -25,7 +121,10 @@ def find_objcopy():
 
 def inject_seal(obj_file, seal, section_name=".lettera_seal"):
     """
-    Embed the seal into a custom section of the object file using objcopy.
+    Embed the seal into a custom section of the object file.
+
+    ELF64 files are patched in place by elf.add_section, with no subprocess
+    and no temporary file; anything else goes through objcopy.
 
     Supported platforms:
     - ✅ Linux (Ubuntu, Kali): ELF format
@@ -34,6 +133,16 @@ def inject_seal(obj_file, seal, section_name=".lettera_seal"):
 
     Automatically selects between llvm-objcopy and GNU objcopy.
     """
+    try:
+        elf.add_section(obj_file, section_name, seal.encode())
+        print(f"[Lettera] Seal injected into {obj_file} → section {section_name}")
+        return True
+    except ValueError:
+        pass
+    except OSError as e:
+        print(f"[Lettera] Seal injection failed: {e}")
+        return False
+
     current_os = platform.system()
     if current_os == "Darwin":
         print("Seal injection is not supported on macOS (Mach-O binaries).")
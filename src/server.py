@@ -0,0 +1,111 @@
+import ctypes
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+
+import backend
+import main as lettera
+from client import EXIT_MARKER, socket_path
+
+def warm_up():
+    """Pay the per-invocation startup costs once: LLVM init, target machines,
+    lexer tables and the parsed stdlib libraries."""
+    import glob
+    import jit  # noqa: F401  (llvmlite binding, ctypes, runtime helpers)
+    from lexer import lex
+    from modules import STDLIB_DIR, ModuleCache
+    for opt_level in range(4):
+        backend.create_target_machine(opt_level)
+    lex("Module:\nEntry:\n    Func main():;\nEnd:\n    Return 0;\n")
+    libraries = ModuleCache(path=None)
+    for path in glob.glob(os.path.join(STDLIB_DIR, "**", "*.let"), recursive=True):
+        try:
+            libraries.load(path)
+        except SyntaxError:
+            pass
+
+def read_request(conn):
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = conn.recv(65536)
+        if not chunk:
+            raise ConnectionError("client closed before sending a request")
+        data += chunk
+    return json.loads(data)
+
+def handle(conn):
+    """Serve one request in a forked child: the child starts from the warm
+    parent but gets its own cwd, environment, stdout/stderr and exit code,
+    so concurrent requests cannot see each other's state. Nothing a child
+    builds outlives it, JIT engines included: a letter run twice through the
+    daemon is JIT-compiled twice."""
+    code = 1
+    try:
+        req = read_request(conn)
+        os.chdir(req["cwd"])
+        os.environ.clear()
+        os.environ.update(req["env"])
+        os.dup2(conn.fileno(), 1)
+        os.dup2(conn.fileno(), 2)
+        sys.argv = ["lettera"] + req["argv"]
+        try:
+            lettera.main()
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if isinstance(e.code, str):
+                print(e.code, file=sys.stderr)
+    except Exception:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        ctypes.CDLL(None).fflush(None)
+        try:
+            conn.sendall(EXIT_MARKER + str(code).encode() + b"\n")
+        except OSError:
+            pass
+        os._exit(0)
+
+def serve(path=None):
+    path = path or socket_path()
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            print(f"[Lettera] A daemon is already listening on {path}")
+            return 1
+        except ConnectionRefusedError:
+            os.unlink(path)
+        finally:
+            probe.close()
+
+    warm_up()
+    # Children are never waited on; let the kernel reap them.
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(128)
+    print(f"[Lettera] Compile server listening on {path}")
+    sys.stdout.flush()
+    try:
+        while True:
+            conn, _ = server.accept()
+            if os.fork() == 0:
+                # the child waits on its own subprocesses ($CC, the sealed
+                # binary): under SIG_IGN their exit statuses would read as 0
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                server.close()
+                handle(conn)
+            conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
@@ -0,0 +1,262 @@
+"""Delta sync of letters between entangled nodes, over the entangle transport.
+
+A letter is its envelope (the nodes before and after the Blocks) plus an
+ordered manifest of Block hashes, each the sha256 of the Block's normalized
+source (nodes.format_block). The Below side keeps a content-addressed store
+of the Blocks it has seen and the last manifest it accepted for each letter.
+
+One sync is usually a single round trip. The client sends the manifest as
+edits against the version the server last acknowledged, together with the
+Blocks behind those edits. The server asks for anything it still lacks
+(after a restart, say), or for the whole manifest when it no longer has
+the base version. Then it rebuilds the Program and recompiles it with the
+letter's LoweringMemo: unchanged Blocks keep their keys and fragments in
+memory, so only the changed Blocks (and those reading what they define)
+are evaluated and lowered again.
+
+Frames are JSON compressed with a codec both sides agree on in a hello
+exchange. The first byte of every frame names its codec.
+"""
+import asyncio
+import bz2
+import functools
+import hashlib
+import json
+import lzma
+import time
+import zlib
+
+from cache import CompileCache
+from entangle import AbovePool, BelowServer
+from irgen import LoweringMemo, generate_ir
+from lexer import lex
+from nodes import Node, deserialize_ast, format_block, serialize_ast
+from parser import Parser
+
+# name -> (tag byte, compress, decompress), in order of preference
+CODECS = {
+    "lzma": (b"x", lzma.compress, lzma.decompress),
+    "zlib": (b"z", lambda data: zlib.compress(data, 6), zlib.decompress),
+    "bz2": (b"b", bz2.compress, bz2.decompress),
+    "none": (b"n", bytes, bytes),
+}
+BY_TAG = {tag: decompress for tag, _, decompress in CODECS.values()}
+# Frames smaller than this are sent uncompressed whatever the codec
+MIN_COMPRESS = 256
+
+def pack(obj, codec="none"):
+    data = json.dumps(obj, separators=(",", ":")).encode()
+    if len(data) < MIN_COMPRESS:
+        codec = "none"
+    tag, compress, _ = CODECS[codec]
+    return tag + compress(data)
+
+def unpack(frame):
+    return json.loads(BY_TAG[frame[:1]](frame[1:]))
+
+def block_hash(block):
+    return hashlib.sha256(format_block(block).encode()).hexdigest()[:32]
+
+def manifest_digest(envelope_hash, hashes):
+    digest = hashlib.sha256(envelope_hash.encode())
+    for h in hashes:
+        digest.update(h.encode())
+    return digest.hexdigest()[:32]
+
+def split_letter(ast):
+    """(head nodes, Blocks, tail nodes) of a Program."""
+    nodes = ast.children
+    blocks = [n for n in nodes if n.kind == "Block"]
+    first = next((i for i, n in enumerate(nodes) if n.kind == "Block"), len(nodes))
+    head = nodes[:first]
+    tail = [n for n in nodes[first:] if n.kind != "Block"]
+    return head, blocks, tail
+
+def envelope_of(head, tail):
+    envelope = {"head": serialize_ast(head), "tail": serialize_ast(tail)}
+    return envelope, hashlib.sha256(json.dumps(envelope, sort_keys=True).encode()).hexdigest()[:32]
+
+def parse_block(text):
+    return Parser(lex(text), starched_mode=True).parse_block()
+
+class SyncServer:
+    """Below side: applies synced letters and compiles them incrementally.
+
+    compiled[letter] holds the latest IR; on_compiled(letter, ir_code), if
+    given, is called after each compile.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, codecs=tuple(CODECS), cache=None, on_compiled=None):
+        self.codecs = [c for c in codecs if c in CODECS]
+        self.cache = cache if cache is not None else CompileCache()
+        self.on_compiled = on_compiled
+        self.blocks = {}     # block hash -> Block node
+        self.letters = {}    # letter -> (digest, envelope hash, head, hashes, tail)
+        self.pending = {}    # letter -> manifest waiting for missing Blocks
+        self.compiled = {}
+        self.memos = {}      # letter -> irgen.LoweringMemo of its last compile
+        self.below = BelowServer(self.handle, host, port)
+
+    async def start(self):
+        await self.below.start()
+        return self
+
+    @property
+    def port(self):
+        return self.below.port
+
+    async def close(self):
+        await self.below.close()
+
+    async def handle(self, frame, peer):
+        """Reply to one frame; a frame the server cannot use (an unknown codec
+        tag, a Block that does not parse, a letter that does not lower) gets
+        an error reply and leaves the connection up."""
+        try:
+            return await self.dispatch(frame)
+        except (KeyError, SyntaxError, ValueError) as e:
+            return pack({"status": "error", "error": f"{type(e).__name__}: {e}"})
+
+    async def dispatch(self, frame):
+        msg = unpack(frame)
+        op = msg["op"]
+        if op == "hello":
+            codec = next((c for c in msg["codecs"] if c in self.codecs), "none")
+            return pack({"codec": codec})
+        codec = msg.get("codec", "none")
+        if op == "full":
+            ast = Parser(lex(msg["source"]), starched_mode=True).parse()
+            head, blocks, tail = split_letter(ast)
+            envelope, envelope_hash = envelope_of(head, tail)
+            hashes = [block_hash(b) for b in blocks]
+            self.blocks.update(zip(hashes, blocks))
+            self.pending[msg["letter"]] = {"envelope_hash": envelope_hash, "envelope": envelope, "hashes": hashes}
+            return pack(await self.apply(msg["letter"]), codec)
+        if op == "sync":
+            return pack(await self.sync(msg), codec)
+        if op == "blocks":
+            self.store(msg)
+            return pack(await self.apply(msg["letter"]), codec)
+        return pack({"status": "error", "error": f"unknown op {op!r}"})
+
+    def store(self, msg):
+        for h, text in msg.get("blocks", {}).items():
+            self.blocks[h] = parse_block(text)
+        if "envelope" in msg:
+            self.pending[msg["letter"]]["envelope"] = msg["envelope"]
+
+    async def sync(self, msg):
+        letter = msg["letter"]
+        current = self.letters.get(letter)
+        if "hashes" in msg:
+            hashes = msg["hashes"]
+        elif current is not None and current[0] == msg["base"]:
+            hashes = list(current[3][:msg["length"]])
+            hashes += [None] * (msg["length"] - len(hashes))
+            for i, h in msg["edits"]:
+                hashes[i] = h
+        else:
+            return {"status": "resend"}
+        pending = {"envelope_hash": msg["envelope_hash"], "hashes": hashes}
+        if current is not None and current[1] == msg["envelope_hash"]:
+            pending["envelope"] = {"head": current[2], "tail": current[4]}
+        self.pending[letter] = pending
+        self.store(msg)
+        return await self.apply(letter)
+
+    async def apply(self, letter):
+        """Compile the pending manifest, or name what is still missing."""
+        pending = self.pending[letter]
+        missing = sorted({h for h in pending["hashes"] if h not in self.blocks})
+        if missing or "envelope" not in pending:
+            return {"status": "need", "blocks": missing, "envelope": "envelope" not in pending}
+        del self.pending[letter]
+        envelope, hashes = pending["envelope"], pending["hashes"]
+        digest = manifest_digest(pending["envelope_hash"], hashes)
+        program = Node("Program", children=[deserialize_ast(n) for n in envelope["head"]]
+                       + [self.blocks[h] for h in hashes]
+                       + [deserialize_ast(n) for n in envelope["tail"]])
+        t0 = time.perf_counter()
+        memo = self.memos.setdefault(letter, LoweringMemo())
+        ir_code = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(generate_ir, program, self.cache, memo=memo))
+        # only a letter that compiled becomes the base for later edits
+        self.letters[letter] = (digest, pending["envelope_hash"], envelope["head"], hashes, envelope["tail"])
+        self.compiled[letter] = ir_code
+        if self.on_compiled is not None:
+            self.on_compiled(letter, ir_code)
+        return {"status": "ok", "digest": digest,
+                "ir_sha256": hashlib.sha256(ir_code.encode()).hexdigest(),
+                "compile_ms": round((time.perf_counter() - t0) * 1000, 3)}
+
+class SyncClient:
+    """Above side: keeps letters in sync with one peer, sending only what changed.
+
+    bytes_sent / bytes_received count frame payloads after compression.
+    """
+
+    def __init__(self, address, pool=None, codecs=tuple(CODECS)):
+        self.address = address
+        self.pool = pool if pool is not None else AbovePool()
+        self.codecs = list(codecs)
+        self.codec = None
+        self.acked = {}   # letter -> (digest, envelope hash, hashes)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.round_trips = 0
+
+    async def request(self, msg):
+        frame = pack(dict(msg, codec=self.codec or "none"), self.codec or "none")
+        self.bytes_sent += len(frame)
+        reply = await self.pool.send(self.address, frame)
+        self.bytes_received += len(reply)
+        self.round_trips += 1
+        return unpack(reply)
+
+    async def negotiate(self):
+        if self.codec is None:
+            self.codec = (await self.request({"op": "hello", "codecs": self.codecs}))["codec"]
+        return self.codec
+
+    async def send_full(self, letter, source):
+        """The pre-delta path: ship the whole letter source every time."""
+        await self.negotiate()
+        self.acked.pop(letter, None)
+        return await self.request({"op": "full", "letter": letter, "source": source})
+
+    async def sync(self, letter, ast):
+        """Bring the peer's copy of letter (a parsed Program) up to date."""
+        await self.negotiate()
+        head, blocks, tail = split_letter(ast)
+        envelope, envelope_hash = envelope_of(head, tail)
+        hashes = [block_hash(b) for b in blocks]
+        by_hash = dict(zip(hashes, blocks))
+        msg = {"op": "sync", "letter": letter, "envelope_hash": envelope_hash}
+
+        acked = self.acked.get(letter)
+        if acked is not None:
+            base, acked_envelope, acked_hashes = acked
+            edits = [[i, h] for i, h in enumerate(hashes) if i >= len(acked_hashes) or acked_hashes[i] != h]
+            known = set(acked_hashes)
+            msg.update(base=base, length=len(hashes), edits=edits,
+                       blocks={h: format_block(by_hash[h]) for _, h in edits if h not in known})
+            if acked_envelope != envelope_hash:
+                msg["envelope"] = envelope
+        else:
+            msg.update(hashes=hashes)
+        reply = await self.request(msg)
+        if reply["status"] == "resend":
+            msg = {"op": "sync", "letter": letter, "envelope_hash": envelope_hash, "hashes": hashes}
+            reply = await self.request(msg)
+        if reply["status"] == "need":
+            more = {"op": "blocks", "letter": letter,
+                    "blocks": {h: format_block(by_hash[h]) for h in reply["blocks"]}}
+            if reply["envelope"]:
+                more["envelope"] = envelope
+            reply = await self.request(more)
+        if reply["status"] == "ok":
+            self.acked[letter] = (reply["digest"], envelope_hash, hashes)
+        return reply
+
+    async def close(self):
+        await self.pool.close()
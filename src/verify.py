@@ -0,0 +1,146 @@
+"""`lettera verify`: check sealed binaries against the letters they came from.
+
+The seal is read straight out of the binary's .lettera_seal section (see
+elf.read_section); nothing is executed. The expected seal is recomputed
+from the source through the same front end and lowering main uses (with
+the same --path import directories), in the seal's own mode. A Merkle seal also names the Blocks that differ.
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import elf
+from cache import CompileCache
+from irgen import generate_ir
+from modules import ModuleCache
+from nodes import Arena
+from sealed import parse_merkle_seal
+
+SECTION = ".lettera_seal"
+DEFAULT_REPORT = "verify-report.json"
+# Artifacts are handed to the worker pool this many at a time
+VERIFY_BATCH = 16
+
+# Per-worker compile and parsed-module caches and import path, set up by init_worker
+_cache = None
+_modules = None
+_import_path = ()
+
+def init_worker(use_cache, import_path=()):
+    global _cache, _modules, _import_path
+    _cache = CompileCache() if use_cache else None
+    _modules = ModuleCache() if use_cache else ModuleCache(path=None)
+    _import_path = tuple(import_path)
+
+def recompute(source_path, mode):
+    """(seal, leaves) the compiler produces for source_path in mode."""
+    from main import create_letter_seal, front_end
+    with open(source_path, "r") as f:
+        source = f.read()
+    ast, libraries = front_end(source, source_path, _modules, _import_path, Arena())
+    stats = {}
+    ir_code = generate_ir(ast, cache=_cache, stats=stats, libraries=libraries)
+    seal, payload = create_letter_seal(ast, ir_code, mode, stats["block_keys"])
+    return seal, (parse_merkle_seal(payload)[1] if mode == "merkle" else None)
+
+def verify_one(binary, source):
+    """One report entry: status is ok, mismatch, unsealed or error."""
+    t0 = time.perf_counter()
+    result = {"binary": binary, "source": source}
+    try:
+        payload = elf.read_section(binary, SECTION)
+        if payload is None:
+            result["status"] = "unsealed"
+        else:
+            merkle = parse_merkle_seal(payload.decode("ascii", "replace"))
+            found = merkle[0] if merkle else payload.decode("ascii", "replace").strip()
+            mode = "merkle" if merkle else "linear"
+            expected, leaves = recompute(source, mode)
+            result.update(mode=mode, seal=found, expected=expected,
+                          status="ok" if found == expected else "mismatch")
+            if merkle and found != expected:
+                found_leaves = merkle[1]
+                # leaf 0 is the envelope, leaf i the i-th Block (1-based in the report)
+                result["envelope_changed"] = found_leaves[:1] != leaves[:1]
+                result["blocks_changed"] = [i for i in range(1, max(len(found_leaves), len(leaves)))
+                                            if found_leaves[i:i + 1] != leaves[i:i + 1]]
+    except (OSError, ValueError, SyntaxError, ImportError) as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    result["seconds"] = round(time.perf_counter() - t0, 6)
+    return result
+
+def verify_batch(batch):
+    return [verify_one(binary, source) for binary, source in batch]
+
+def read_manifest(path):
+    """Pairs from a manifest: one `binary source.let` per line, # comments allowed."""
+    pairs = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                binary, source = line.split(None, 1)
+                pairs.append((binary, source.strip()))
+    return pairs
+
+def verify(pairs, jobs=None, report=DEFAULT_REPORT, use_cache=True, import_path=()):
+    """Verify (binary, source) pairs, write the JSON report; returns the results.
+    import_path is main's --path: extra directories imports resolve against."""
+    jobs = jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    if jobs > 1 and len(pairs) > 1:
+        batches = [pairs[i:i + VERIFY_BATCH] for i in range(0, len(pairs), VERIFY_BATCH)]
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                 initargs=(use_cache, import_path)) as executor:
+            results = [r for batch in executor.map(verify_batch, batches) for r in batch]
+    else:
+        init_worker(use_cache, import_path)
+        results = verify_batch(pairs)
+    elapsed = time.perf_counter() - start
+
+    counts = {status: 0 for status in ("ok", "mismatch", "unsealed", "error")}
+    for result in results:
+        counts[result["status"]] += 1
+    summary = dict(counts, artifacts=len(results), seconds=round(elapsed, 6), jobs=jobs,
+                   artifacts_per_second=round(len(results) / elapsed, 1) if elapsed > 0 else None)
+    if report:
+        with open(report, "w") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+
+    for result in results:
+        if result["status"] != "ok":
+            detail = result.get("error") or ""
+            if result.get("blocks_changed") or result.get("envelope_changed"):
+                detail = "changed: " + ", ".join((["envelope"] if result["envelope_changed"] else [])
+                                                 + [f"Block {i}" for i in result["blocks_changed"]])
+            print(f"[Lettera] {result['status'].upper()} {result['binary']} ← {result['source']} {detail}".rstrip())
+    print(f"[Lettera] Verified {len(results)} artifacts: {counts['ok']} ok, {counts['mismatch']} mismatched, "
+          f"{counts['unsealed']} unsealed, {counts['error']} errors in {elapsed:.2f}s "
+          f"({summary['artifacts_per_second'] or 0:.1f}/s, jobs={jobs})" + (f" → {report}" if report else ""))
+    return results
+
+def main(args):
+    from main import option_value
+    manifest = option_value(args, "--manifest", None)
+    pairs = read_manifest(manifest) if manifest else []
+    skip = {"--manifest", "--report", "-j", "--jobs", "--path"}
+    positional = [a for i, a in enumerate(args) if not a.startswith("-") and (i == 0 or args[i - 1] not in skip)]
+    for arg in positional:
+        if "=" not in arg:
+            print(f"Error: expected binary=source.let, got {arg}")
+            return 1
+        pairs.append(tuple(arg.split("=", 1)))
+    if not pairs:
+        print("Usage: lettera verify <binary=source.let>... [--manifest FILE] [--report FILE] [-j N] [--path DIRS] [--no-cache]")
+        return 1
+    jobs = option_value(args, "-j", option_value(args, "--jobs", None))
+    results = verify(pairs, jobs=int(jobs) if jobs else None,
+                     report=option_value(args, "--report", DEFAULT_REPORT),
+                     use_cache="--no-cache" not in args,
+                     import_path=[p for p in option_value(args, "--path", "").split(os.pathsep) if p])
+    return 0 if all(r["status"] == "ok" for r in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,3 @@
-python3 src/main.py tests/realmix.let
-llc output.bc -filetype=obj -o output.o
-clang output.o src/dj_runtime_audio.c -lsndfile -lportaudio -o realmix.out
+python3 src/main.py stdlib/dj/realmix.let
+clang output.o src/dj_runtime.c src/dj_runtime_audio.c -lsndfile -lportaudio -lm -o realmix.out
 ./realmix.out
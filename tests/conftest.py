@@ -0,0 +1,10 @@
+import glob
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+# every letter in the tree: the stdlib libraries and examples, and tests/
+LETTERS = sorted(glob.glob(os.path.join(ROOT, "stdlib", "**", "*.let"), recursive=True)
+                 + glob.glob(os.path.join(ROOT, "tests", "*.let")))
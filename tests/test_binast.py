@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import binast
+from conftest import LETTERS
+from lexer import lex
+from nodes import Arena, Node, detach, serialize_ast
+from parser import Parser
+
+def parse(path, arena=None):
+    with open(path, "r", encoding="utf-8") as f:
+        return Parser(lex(f.read()), starched_mode=True, arena=arena).parse()
+
+letters = pytest.mark.parametrize("path", LETTERS, ids=os.path.basename)
+
+@letters
+def test_round_trip_node(path):
+    ast = parse(path)
+    assert serialize_ast(binast.loads(binast.dumps(ast))) == serialize_ast(ast)
+
+@letters
+def test_round_trip_arena(path):
+    ast = parse(path, Arena())
+    assert serialize_ast(binast.loads(binast.dumps(ast))) == serialize_ast(ast)
+
+@letters
+def test_redump_mapped(path, tmp_path):
+    ast = parse(path)
+    mapped = binast.loads(binast.dumps(ast))
+    assert binast.dumps(mapped) == binast.dumps(ast)
+    binast.dump(mapped, tmp_path / "ast.bin")
+    assert serialize_ast(binast.load(tmp_path / "ast.bin")) == serialize_ast(ast)
+
+def test_values_keep_their_types():
+    ast = parse(os.path.join(os.path.dirname(__file__), "example.let"))
+    mapped = binast.loads(binast.dumps(ast))
+    for node, ref in zip(ast.children, mapped.children):
+        assert type(ref.value) is type(node.value)
+        if node.kind == "Block":
+            assert ref.children[0].value == node.children[0].value
+            assert [s.value for s in ref.children[2].children] == [s.value for s in node.children[2].children]
+
+def test_mapped_is_read_only():
+    mapped = binast.loads(binast.dumps(parse(LETTERS[0])))
+    block = next(n for n in mapped.children if n.kind == "Block")
+    with pytest.raises(TypeError, match="read-only"):
+        block.value = "X"
+    with pytest.raises(TypeError, match="read-only"):
+        block.children = [Node("Stmt", ("Print", ('"x"',)))]
+    with pytest.raises(TypeError):
+        mapped.children = mapped.children[:1]
+    with pytest.raises(TypeError, match="read-only"):
+        mapped.arena.add("Import", "x")
+
+def test_detached_copy_is_editable():
+    mapped = binast.loads(binast.dumps(parse(LETTERS[0])))
+    tree = detach(mapped)
+    tree.children = tree.children[:1]
+    assert len(tree.children) == 1
+    assert len(mapped.children) > 1
+
+def test_not_an_ast():
+    with pytest.raises(ValueError, match="not a binary Lettera AST"):
+        binast.loads(b"\0" * binast.HEADER.size)
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+import modules
+from build import build, dependency_graph, discover
+from modules import ModuleCache
+from test_modules import library, write
+
+@pytest.fixture(autouse=True)
+def fresh_process_memo(monkeypatch):
+    monkeypatch.setattr(modules, "_loaded", {})
+
+def run_build(tmp_path, jobs=1):
+    built, failed, skipped = build(str(tmp_path / "src"), out_dir=str(tmp_path / "out"), jobs=jobs, use_cache=False)
+    name = lambda p: os.path.relpath(p, tmp_path / "src")
+    return [name(p) for p in built], {name(p): e for p, e in failed.items()}, sorted(name(p) for p in skipped)
+
+def test_dependency_graph_uses_parsed_imports(tmp_path):
+    write(tmp_path, {"src/a.let": library(["b.let", "dj/djmeta.let"]), "src/b.let": library(),
+                     # only a real Import counts, not text that looks like one
+                     "src/c.let": library().replace("Above: # field", 'Above: # Import "a.let"')})
+    root = str(tmp_path / "src")
+    files = discover(root)
+    deps, missing, broken = dependency_graph(files, root, ModuleCache(path=None))
+    path = lambda name: os.path.join(root, name)
+    assert deps == {path("a.let"): {path("b.let")}, path("b.let"): set(), path("c.let"): set()}
+    assert missing == {} and broken == {}
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_libraries_build_before_their_importers(tmp_path, jobs):
+    # names sort against the import order: a imports b imports c
+    write(tmp_path, {"src/a.let": library(["b.let"]), "src/b.let": library(["lib/c.let"]),
+                     "src/lib/c.let": library()})
+    built, failed, skipped = run_build(tmp_path, jobs)
+    assert failed == {} and skipped == []
+    assert built == ["lib/c.let", "b.let", "a.let"]
+    assert os.path.exists(tmp_path / "out" / "lib" / "c.o")
+
+def test_failures_cycles_and_unparsable_files(tmp_path):
+    write(tmp_path, {"src/ok.let": library(),
+                     "src/broken.let": "Module:\n    Version 1;;;\n",
+                     "src/needs_broken.let": library(["broken.let"]),
+                     "src/x.let": library(["y.let"]), "src/y.let": library(["x.let"]),
+                     "src/lost.let": library(["nowhere.let"])})
+    built, failed, skipped = run_build(tmp_path)
+    assert built == ["ok.let"]
+    assert failed["broken.let"].startswith("SyntaxError: ")
+    assert failed["needs_broken.let"] == "dependency broken.let failed"
+    assert failed["x.let"] == failed["y.let"] == "import cycle"
+    assert failed["lost.let"] == "unresolved Import nowhere.let"
+    assert skipped == ["needs_broken.let"]
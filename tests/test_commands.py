@@ -0,0 +1,56 @@
+import pytest
+
+from commands import Command, block_calls, registry
+from lexer import lex
+from modules import load_import_names
+from parser import Parser
+
+def reg(*names):
+    return registry(load_import_names([f"dj/{name}.let" for name in names]))
+
+def block(statements):
+    source = ("Module:\n    Version: 1.0;\n\nEntry:\n    Func main():;\n\nBlock:\n    Equation: Set = opener;\n"
+              f"    Above: {statements}\n    Below: {statements}\n\nEnd:\n    Return 0;\n")
+    return next(n for n in Parser(lex(source), starched_mode=True).parse().children if n.kind == "Block")
+
+def test_commands_come_from_imported_declarations():
+    r = reg("djmeta", "djtransitions")
+    assert r.lookup("BPM", 1) == Command("BPM", ("BPM",), ("i32",), "dj_bpm")
+    assert r.lookup("Energy", 1).types == ("1-10",)
+    assert r.lookup("Crossfade", 2) == Command("Crossfade", ("Duration", "Type"), ("seconds", "str"), "dj_crossfade")
+    # djeffects is not imported
+    assert r.lookup("Loop", 2) is None
+
+def test_unknown_commands_lower_to_nothing():
+    r = reg("djmeta")
+    assert r.lookup("Scratch", 3) is None
+    assert block_calls(block('Scratch("vinyl"); BPM=120; Print "x";'), r) == {"BPM/1": r.lookup("BPM", 1)}
+
+def test_overloads_by_arity():
+    r = reg("djtransitions", "djaudio")
+    assert r.lookup("Crossfade", 2).extern == "dj_crossfade"
+    assert r.lookup("Crossfade", 3).extern == "dj_audio_crossfade"
+    with pytest.raises(ValueError, match="Crossfade takes 2 or 3 arguments, got 1"):
+        r.lookup("Crossfade", 1)
+
+@pytest.mark.parametrize("statements, error", [
+    ("BPM=fast;", "Block Set: BPM must be a number, got fast"),
+    ("Energy=11;", "Block Set: Energy must be from 1 to 10, got 11"),
+    ('Crossfade(soon, "linear");', "Block Set: Crossfade: Duration must be a duration, got soon"),
+    ('Crossfade(8s, "linear", 2);', "Block Set: Crossfade takes 2 arguments, got 3"),
+])
+def test_argument_and_arity_errors_name_the_block(statements, error):
+    with pytest.raises(ValueError, match=error):
+        block_calls(block(statements), reg("djmeta", "djtransitions"))
+
+def test_durations_take_seconds_or_a_number():
+    r = reg("djtransitions")
+    calls = block_calls(block('Crossfade(8s, "linear");'), r)
+    assert list(calls) == ["Crossfade/2"]
+    block_calls(block('Crossfade(8, "linear");'), r)
+
+def test_variadic_commands_take_extra_arguments():
+    r = reg("djset")
+    assert r.lookup("Playlist", 3) is r.lookup("Playlist", 1)
+    with pytest.raises(ValueError, match="Playlist takes 1 arguments, got 0"):
+        r.lookup("Playlist", 0)
@@ -0,0 +1,65 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import elf
+from conftest import ROOT
+from verify import SECTION, verify
+
+CC = os.environ.get("CC") or shutil.which("clang") or shutil.which("gcc")
+pytestmark = pytest.mark.skipif(CC is None, reason="needs a C compiler")
+
+@pytest.fixture
+def binary(tmp_path):
+    source = tmp_path / "tiny.c"
+    source.write_text('#include <stdio.h>\nint main(void) { puts("tiny"); return 3; }\n')
+    exe = str(tmp_path / "tiny")
+    subprocess.run([CC, str(source), "-o", exe], check=True)
+    return exe
+
+def runs(exe):
+    result = subprocess.run([exe], capture_output=True, text=True)
+    return result.returncode == 3 and result.stdout == "tiny\n"
+
+def test_add_then_read(binary):
+    assert elf.read_section(binary, SECTION) is None
+    elf.add_section(binary, SECTION, b"seal-1")
+    assert elf.read_section(binary, SECTION) == b"seal-1"
+    assert runs(binary)
+
+def test_replace_with_a_longer_then_a_shorter_payload(binary):
+    elf.add_section(binary, SECTION, b"short")
+    longer = b"x" * 4096
+    elf.add_section(binary, SECTION, longer)
+    assert elf.read_section(binary, SECTION) == longer
+    assert runs(binary)
+    # a payload that fits is written in place, without growing the file
+    size = os.path.getsize(binary)
+    elf.add_section(binary, SECTION, b"fits")
+    assert elf.read_section(binary, SECTION) == b"fits"
+    assert os.path.getsize(binary) == size
+    assert runs(binary)
+    # the other sections are untouched
+    assert elf.read_section(binary, ".text") is not None
+
+def test_not_elf(tmp_path):
+    path = tmp_path / "text"
+    path.write_bytes(b"not an executable at all" * 4)
+    with pytest.raises(ValueError, match="not an ELF file"):
+        elf.read_section(str(path), SECTION)
+
+@pytest.mark.parametrize("mode", ["linear", "merkle"])
+def test_verify_after_strip(tmp_path, mode):
+    letter = os.path.join(ROOT, "tests", "hello.let")
+    env = dict(os.environ, CC=CC)
+    subprocess.run([sys.executable, os.path.join(ROOT, "src", "main.py"), letter, "--seal",
+                    f"--seal-mode={mode}", "--no-cache"], cwd=tmp_path, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    exe = str(tmp_path / "hello.out")
+    subprocess.run(["strip", exe], check=True)
+    assert subprocess.run([exe], capture_output=True, text=True).stdout == "Hello, World\n"
+    [result] = verify([(exe, letter)], jobs=1, report=None, use_cache=False)
+    assert result["status"] == "ok", result
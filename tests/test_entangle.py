@@ -0,0 +1,93 @@
+import asyncio
+import os
+
+import pytest
+
+from entangle import FRAME_HEADER, MAX_FRAME, AbovePool, BelowServer, read_frame
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 60))
+
+async def echo_server(**kwargs):
+    async def handler(payload, peer):
+        await asyncio.sleep(0)
+        return payload
+    return await BelowServer(handler, port=0, **kwargs).start()
+
+def test_large_frame_over_loopback():
+    payload = os.urandom(48 << 20)
+
+    async def main():
+        server = await echo_server()
+        try:
+            async with AbovePool() as pool:
+                return await pool.send(f"127.0.0.1:{server.port}", payload)
+        finally:
+            await server.close()
+    assert run(main()) == payload
+
+def test_concurrent_peers():
+    peers, frames = 16, 8
+
+    async def main():
+        server = await echo_server(max_concurrency=4)
+        address = f"127.0.0.1:{server.port}"
+
+        async def peer(n):
+            async with AbovePool() as pool:
+                replies = [await pool.send(address, f"{n}:{i}") for i in range(frames)]
+                return replies, pool.opened
+        try:
+            results = await asyncio.gather(*(peer(n) for n in range(peers)))
+        finally:
+            await server.close()
+        return results, server.frames
+
+    results, served = run(main())
+    for n, (replies, opened) in enumerate(results):
+        assert replies == [f"{n}:{i}".encode() for i in range(frames)]
+        assert opened == 1
+    assert served == peers * frames
+
+def test_reconnect_after_the_peer_hangs_up():
+    async def main():
+        server = await echo_server()
+        address = f"127.0.0.1:{server.port}"
+        try:
+            async with AbovePool() as pool:
+                assert await pool.send(address, b"first") == b"first"
+                # the Below side drops every connection, as on a restart
+                for writer in list(server.connections):
+                    writer.close()
+                await asyncio.sleep(0.05)
+                assert await pool.send(address, b"second") == b"second"
+                return pool.opened
+        finally:
+            await server.close()
+    assert run(main()) == 2
+
+def test_oversized_frame_is_refused():
+    async def main():
+        server = await echo_server(max_frame=1024)
+        address = f"127.0.0.1:{server.port}"
+        try:
+            async with AbovePool() as pool:
+                assert await pool.send(address, b"x" * 1024) == b"x" * 1024
+                with pytest.raises(ConnectionError):
+                    await pool.send(address, b"x" * 1025)
+                # the server keeps serving other frames
+                assert await pool.send(address, b"ok") == b"ok"
+        finally:
+            await server.close()
+    run(main())
+
+def test_read_frame_checks_the_header_before_reading():
+    async def main():
+        reader = asyncio.StreamReader()
+        reader.feed_data(FRAME_HEADER.pack(MAX_FRAME + 1))
+        with pytest.raises(ValueError, match="exceeds"):
+            await read_frame(reader)
+        reader = asyncio.StreamReader()
+        reader.feed_eof()
+        assert await read_frame(reader) is None
+    run(main())
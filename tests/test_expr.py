@@ -0,0 +1,102 @@
+import ctypes
+import os
+import subprocess
+import sys
+
+import pytest
+from llvmlite import binding as llvm
+from llvmlite import ir
+
+from backend import compile_ir, create_target_machine
+from conftest import ROOT
+from expr import Symbol, equation, evaluate, parse_expression
+from irgen import SymbolTable
+
+@pytest.mark.parametrize("rhs, value", [
+    ("2 + 3 * 4", 14),
+    ("(2 + 3) * 4", 20),
+    ("10 - 4 - 3", 5),        # base 12: 10 is twelve
+    ("7 / 2", 3),
+    ("-7 / 2", -3),           # truncating, like sdiv
+    ("--5", 5),
+    ("ab", 131),              # a base-12 number written with letters
+    ("bbbbbbbbbb * 2", (12**10 - 1) * 2),   # wraps to i32, as the generated code does
+])
+def test_folding_and_precedence(rhs, value):
+    assert equation("X", rhs, {}) == (Symbol("i32", (value + 2**31) % 2**32 - 2**31), parse_expression(rhs), {})
+
+def test_folding_reads_earlier_symbols():
+    symbols = {}
+    for lhs, rhs in [("A", "3"), ("B", "A * A + 1"), ("Name", '"dj"'), ("Tag", 'Name + "-set"')]:
+        symbols[lhs] = equation(lhs, rhs, symbols)[0]
+    assert symbols["B"] == Symbol("i32", 10)
+    assert symbols["Tag"] == Symbol("str", "dj-set")
+
+def test_a_varying_operand_stops_folding():
+    symbols = {"N": Symbol("i32", None)}
+    symbol, tree, operands = equation("X", "N * 2 + 1", symbols)
+    assert symbol == Symbol("i32", None)
+    assert operands == {"N": Symbol("i32", None)}
+
+@pytest.mark.parametrize("rhs, error", [
+    ("1 / 0", "division by zero"),
+    ("4 / (2 - 2)", "division by zero"),
+    ('"a" * 2', "cannot apply '*'"),
+    ('-"a"', "cannot negate a string"),
+])
+def test_ill_typed_equations(rhs, error):
+    with pytest.raises(ValueError, match=f"Equation X = .*: {error}"):
+        equation("X", rhs, {})
+
+def test_free_text_is_a_string():
+    assert equation("X", "hello world", {})[0] == Symbol("str", "hello world")
+    assert equation("X", "nothing", {})[0] == Symbol("str", "nothing")
+
+def run_unfolded(rhs, values):
+    """rhs computed by generated code, every name a global the code loads."""
+    module = ir.Module(name="expr")
+    fn = ir.Function(module, ir.FunctionType(ir.IntType(32), []), name="f")
+    builder = ir.IRBuilder(fn.append_basic_block(name="entry"))
+    symbols = {}
+    for name, value in values.items():
+        symbols[name] = Symbol("i32", None)
+        gv = ir.GlobalVariable(module, ir.IntType(32), name=f"sym.{name}.i32")
+        gv.initializer = ir.Constant(ir.IntType(32), value)
+    builder.ret(SymbolTable(module, builder, symbols).emit(parse_expression(rhs)))
+    # the engine owns its target machine, so not one of backend's shared ones
+    create_target_machine(0)
+    target_machine = llvm.Target.from_default_triple().create_target_machine()
+    engine = llvm.create_mcjit_compiler(compile_ir(str(module), 0, target_machine), target_machine)
+    engine.finalize_object()
+    return ctypes.CFUNCTYPE(ctypes.c_int32)(engine.get_function_address("f"))()
+
+@pytest.mark.parametrize("values", [
+    {"a": 7, "b": -2, "c": 5},
+    {"a": -7, "b": 2, "c": 1},
+    {"a": 2**31 - 1, "b": 3, "c": -1},
+], ids=["mixed", "negative", "overflow"])
+@pytest.mark.parametrize("rhs", ["a + b * c", "(a + b) * c", "a - b - c", "a / b", "-a / b", "-(a - b) * c", "a * b + 10"])
+def test_folded_matches_generated_code(rhs, values):
+    folded = evaluate(parse_expression(rhs), {n: Symbol("i32", v) for n, v in values.items()})
+    assert folded.value == run_unfolded(rhs, values)
+
+def letter_with(tmp_path, old, new):
+    with open(os.path.join(ROOT, "stdlib", "dj", "festival.let")) as f:
+        source = f.read()
+    assert old in source
+    path = tmp_path / "letter.let"
+    path.write_text(source.replace(old, new))
+    return str(path)
+
+@pytest.mark.parametrize("subcommand", ["check", "ir"])
+@pytest.mark.parametrize("old, new, error", [
+    ('Archive = "festival_set"', "Archive = 1/0", "Equation Archive = 1/0: division by zero"),
+    ("Below: BPM=128;", "Below: BPM=abc;", "Block Track1: BPM must be a number, got abc"),
+    ('Below: Crossfade(8s,"linear");', "Below: Crossfade(8s);", "Block Transition1: Crossfade takes 2 arguments, got 1"),
+], ids=["division by zero", "BPM not a number", "arity"])
+def test_compile_errors_exit_1(tmp_path, subcommand, old, new, error):
+    letter = letter_with(tmp_path, old, new)
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "src", "main.py"), subcommand, letter, "--no-cache"],
+                            cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 1
+    assert f"Error: {error}" in result.stdout
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from conftest import LETTERS
+from lexer import TokenStream, iter_tokens, lex, tokenize
+from nodes import serialize_ast
+from parser import Parser
+
+letters = pytest.mark.parametrize("path", LETTERS, ids=os.path.basename)
+
+def read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+@letters
+def test_every_lexer_agrees(path):
+    source = read(path)
+    pairs = [(tok.typ, tok.text) for tok in iter_tokens(source)]
+    assert list(tokenize(source)) == list(lex(source)) == pairs
+
+@letters
+def test_parsing_tokenize_output_matches_lex(path):
+    source = read(path)
+    assert serialize_ast(Parser(tokenize(source), starched_mode=True).parse()) == \
+        serialize_ast(Parser(lex(source), starched_mode=True).parse())
+
+@pytest.mark.parametrize("source", [
+    'Version: 2.0; Address: opener@dj; Crossfade(8s, "linear");',
+    'Equation: Mix = Track1 → Track2; Print "Café del Mar";',
+], ids=["ascii", "utf-8"])
+def test_tokenize_keeps_source_spacing(source):
+    tokens = tokenize(source)
+    stream = TokenStream.from_pairs(tokens)
+    assert stream is tokens.stream
+    assert list(stream) == list(tokens) == list(lex(source))
+    assert stream.span_text(0, len(stream)) == source
+
+def test_hand_built_pairs_are_joined_without_separators():
+    pairs = [(typ, text) for typ, text in lex("2.0 opener@dj 8s")]
+    stream = TokenStream.from_pairs(pairs)
+    assert list(stream) == pairs
+    assert stream.span_text(0, len(stream)) == "2.0opener@dj8s"
+
+def test_edited_copies_are_packed_afresh():
+    tokens = tokenize("BPM = 120;")
+    edited = list(tokens)[:-1]
+    assert list(TokenStream.from_pairs(edited)) == edited
@@ -0,0 +1,79 @@
+import pytest
+
+import modules
+from lexer import lex
+from modules import ModuleCache, load_imports, resolve
+from parser import Parser
+
+def library(imports=(), field="Tempo"):
+    return "".join(f'Import "{name}"\n' for name in imports) + (
+        "\nModule:\n    Version: 1.0;\n\nEntry:\n    Func lib():;\n\n"
+        f"Block:\n    Equation: {field} = <number>;\n    Above: # field\n    Below: # field\n\n"
+        "End:\n    Return 0;\n")
+
+def write(tmp_path, files):
+    for name, text in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return str(tmp_path / "letter.let")
+
+def imports_of(letter, cache=None, extra=()):
+    with open(letter) as f:
+        ast = Parser(lex(f.read()), starched_mode=True).parse()
+    return load_imports(ast, letter, cache, extra)
+
+@pytest.fixture(autouse=True)
+def fresh_process_memo(monkeypatch):
+    monkeypatch.setattr(modules, "_loaded", {})
+
+def test_libraries_load_in_dependency_order(tmp_path):
+    letter = write(tmp_path, {"letter.let": library(["a.let", "b.let"]), "a.let": library(["b.let"], "A"),
+                              "b.let": library([], "B")})
+    assert [lib.declarations[0].name for lib in imports_of(letter)] == ["B", "A"]
+
+@pytest.mark.parametrize("files, cycle", [
+    ({"a.let": library(["b.let"]), "b.let": library(["a.let"])}, "a.let → b.let → a.let"),
+    ({"a.let": library(["a.let"])}, "a.let → a.let"),
+    ({"a.let": library(["lib/c.let"]), "lib/c.let": library(["../a.let"])}, "a.let → c.let → a.let"),
+], ids=["two", "self", "across directories"])
+def test_import_cycles_are_reported(tmp_path, files, cycle):
+    letter = write(tmp_path, dict(files, **{"letter.let": library(["a.let"])}))
+    with pytest.raises(ImportError, match=f"import cycle: {cycle}"):
+        imports_of(letter)
+
+def test_unresolved_import_names_the_search_path(tmp_path):
+    letter = write(tmp_path, {"letter.let": library(["missing.let"])})
+    with pytest.raises(ImportError, match=r"missing.let not found \(imported by .*letter.let; searched"):
+        imports_of(letter)
+
+def test_extra_directories_are_searched(tmp_path):
+    letter = write(tmp_path, {"letter.let": library(["shared.let"]), "libs/shared.let": library()})
+    assert resolve("shared.let", letter) is None
+    assert [lib.path for lib in imports_of(letter, extra=(str(tmp_path / "libs"),))] == \
+        [str(tmp_path / "libs" / "shared.let")]
+
+def test_module_cache_hit_after_an_unchanged_import(tmp_path, monkeypatch):
+    letter = write(tmp_path, {"letter.let": library(["a.let"]), "a.let": library()})
+    cache_dir = str(tmp_path / "cache")
+    first = ModuleCache(cache_dir)
+    imports_of(letter, first)
+    assert (first.parsed, first.hits) == (1, 0)
+    # the same process: the in-memory memo
+    imports_of(letter, first)
+    assert (first.parsed, first.hits) == (1, 1)
+    # a new process: the disk cache
+    monkeypatch.setattr(modules, "_loaded", {})
+    second = ModuleCache(cache_dir)
+    [lib] = imports_of(letter, second)
+    assert (second.parsed, second.hits) == (0, 1)
+    assert lib.declarations == (modules.Declaration("Tempo", None, "number"),)
+
+def test_changed_import_is_parsed_again(tmp_path):
+    letter = write(tmp_path, {"letter.let": library(["a.let"]), "a.let": library()})
+    cache = ModuleCache(str(tmp_path / "cache"))
+    imports_of(letter, cache)
+    (tmp_path / "a.let").write_text(library(field="Tempo2"))
+    [lib] = imports_of(letter, cache)
+    assert cache.parsed == 2
+    assert lib.declarations[0].name == "Tempo2"
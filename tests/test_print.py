@@ -0,0 +1,60 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+import irgen
+from backend import compile_ir, create_target_machine, emit
+from commands import runtime_sources
+from lexer import lex
+from parser import Parser
+
+CC = os.environ.get("CC") or shutil.which("clang") or shutil.which("gcc")
+pytestmark = pytest.mark.skipif(CC is None, reason="needs a C compiler")
+
+BLOCK = """
+Block:
+    Equation: {equation};
+    Above:
+{statements}
+    Below:
+{statements}
+"""
+# literal and symbol Prints, `%` literals (printf reads them as its format,
+# so they are written as %%) and DJ
+# commands between runs, across Blocks that print known text and Blocks
+# that do not
+BLOCKS = [
+    ("Count = 2 * 6", ['Print "Opening"', 'Print "Count"', 'Print "100%% live"', "BPM=128", 'Print "after BPM"']),
+    ("Title = \"Night\" + \"fall\"", ['Print "Title"', 'Print "known text only"']),
+    ("Intro = just text", ['Print "Intro"', 'Print "50%% of the set"', 'Print "-"']),
+    ("N = <number>", ['Print "N"', 'Print "literal after a varying symbol"']),
+    ("M = N + 3", ['Print "M"', 'Print "M"', 'Key="Am"', 'Print "end of run"', 'Print ""']),
+    ("Outro = closing", ['Print "Outro"']),
+]
+LETTER = 'Import "dj/djmeta.let"\n\nModule:\n    Target: x86_64;\n    Version: 1.0;\n\nEntry:\n    Func main():;\n' \
+    + "".join(BLOCK.format(equation=eq, statements="\n".join(f"        {s};" for s in statements))
+              for eq, statements in BLOCKS) \
+    + "\nEnd:\n    Return 0;\n"
+
+def build_and_run(tmp_path, coalesce, monkeypatch):
+    monkeypatch.setattr(irgen, "COALESCE_PRINTS", coalesce)
+    ir_code = irgen.generate_ir(Parser(lex(LETTER), starched_mode=True).parse())
+    out = tmp_path / ("on" if coalesce else "off")
+    out.mkdir()
+    target_machine = create_target_machine(0)
+    emit(compile_ir(ir_code, 0, target_machine), target_machine, str(out / "letter.o"))
+    sources, flags = runtime_sources(ir_code)
+    subprocess.run([CC, str(out / "letter.o")] + sources + ["-o", str(out / "letter")] + flags, check=True)
+    result = subprocess.run([str(out / "letter")], capture_output=True, text=True, check=True)
+    return ir_code, result.stdout
+
+def test_coalesced_prints_write_the_same_output(tmp_path, monkeypatch):
+    coalesced_ir, coalesced = build_and_run(tmp_path, True, monkeypatch)
+    plain_ir, plain = build_and_run(tmp_path, False, monkeypatch)
+    assert coalesced == plain
+    assert "Opening\n12\n100% live\n" in plain and "[DJ]" in plain
+    # the two builds really differ: runs of known text become dj_write calls
+    assert '@"dj_write"' in coalesced_ir and '@"dj_write"' not in plain_ir
+    assert coalesced_ir.count('call i32 (i8*, ...) @"printf"') < plain_ir.count('call i32 (i8*, ...) @"printf"')
@@ -0,0 +1,42 @@
+import io
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from client import request
+from conftest import ROOT
+
+HELLO = os.path.join(ROOT, "tests", "hello.let")
+
+@pytest.fixture(scope="module")
+def daemon(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("daemon") / "lettera.sock")
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "src", "main.py"), "serve", path],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    deadline = time.monotonic() + 60
+    while not os.path.exists(path):
+        assert proc.poll() is None and time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.05)
+    yield path
+    proc.send_signal(signal.SIGINT)
+    proc.wait(10)
+
+def run(daemon, *argv):
+    out = io.BytesIO()
+    return request(argv, daemon, out), out.getvalue().decode()
+
+def test_check_through_the_daemon(daemon, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    code, out = run(daemon, "check", HELLO)
+    assert code == 0 and "Check passed" in out
+
+def test_failing_cc_is_a_failing_request(daemon, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("CC", "false")
+    code, out = run(daemon, HELLO, "--seal", "--no-cache")
+    assert code == 1
+    assert "Link error" in out
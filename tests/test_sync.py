@@ -0,0 +1,99 @@
+import asyncio
+import os
+
+import pytest
+
+from cache import CompileCache
+from irgen import generate_ir
+from conftest import ROOT
+from lexer import lex
+from parser import Parser
+from sync import SyncClient, SyncServer, pack, unpack
+
+with open(os.path.join(ROOT, "tests", "hello.let")) as f:
+    HELLO = f.read()
+# lowering rejects the Equation: a ValueError inside generate_ir
+ILL_TYPED = HELLO.replace("Greeting = hello world", "Greeting = 1/0")
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 60))
+
+@pytest.fixture
+def cache(tmp_path):
+    return CompileCache(path=str(tmp_path))
+
+async def exchange(cache, *frames):
+    """The server's replies to frames, sent in order on one connection."""
+    server = await SyncServer(port=0, cache=cache).start()
+    client = SyncClient(f"127.0.0.1:{server.port}")
+    try:
+        return [unpack(await client.pool.send(client.address, frame)) for frame in frames]
+    finally:
+        await client.close()
+        await server.close()
+
+def test_sync_compiles_the_letter(cache):
+    async def main():
+        server = await SyncServer(port=0, cache=cache).start()
+        client = SyncClient(f"127.0.0.1:{server.port}")
+        try:
+            reply = await client.sync("hello", Parser(lex(HELLO), starched_mode=True).parse())
+            return reply, server.compiled["hello"]
+        finally:
+            await client.close()
+            await server.close()
+    reply, ir_code = run(main())
+    assert reply["status"] == "ok"
+    assert "Hello, World" in ir_code
+
+@pytest.mark.parametrize("frame, error", [
+    (b"?" + b"{}", "KeyError"),
+    (pack({"op": "full", "letter": "x", "source": "Module:\n    Version 1;;;\n"}), "SyntaxError"),
+    (pack({"op": "full", "letter": "x", "source": ILL_TYPED}), "ValueError"),
+], ids=["codec tag", "parse", "lower"])
+def test_bad_frames_get_an_error_reply(cache, frame, error):
+    replies = run(exchange(cache, frame, pack({"op": "full", "letter": "hello", "source": HELLO})))
+    assert replies[0]["status"] == "error"
+    assert replies[0]["error"].startswith(error)
+    # the connection and the server survive the bad frame
+    assert replies[1]["status"] == "ok"
+
+def test_failed_compile_does_not_become_the_base(cache):
+    async def main():
+        server = await SyncServer(port=0, cache=cache).start()
+        client = SyncClient(f"127.0.0.1:{server.port}")
+        try:
+            bad = await client.sync("hello", Parser(lex(ILL_TYPED), starched_mode=True).parse())
+            good = await client.sync("hello", Parser(lex(HELLO), starched_mode=True).parse())
+            return bad, good, server.letters["hello"][0]
+        finally:
+            await client.close()
+            await server.close()
+    bad, good, digest = run(main())
+    assert bad["status"] == "error" and "ValueError" in bad["error"]
+    assert good["status"] == "ok" and good["digest"] == digest
+
+def test_delta_compile_matches_a_fresh_compile(cache):
+    # M reads N, so editing N must re-key M too
+    letter = HELLO.replace("Block:", 'Block:\n    Equation: N = 5;\n    Above:\n        Print "N";\n    Below:\n'
+                           '        Print "N";\n\nBlock:\n    Equation: M = N * 2;\n    Above:\n        Print "M";\n'
+                           '    Below:\n        Print "M";\n\nBlock:', 1)
+    versions = [letter, letter.replace("N = 5", "N = 7"), letter.replace("N = 5", "N = <number>"), letter]
+
+    async def main():
+        server = await SyncServer(port=0, cache=cache).start()
+        client = SyncClient(f"127.0.0.1:{server.port}")
+        try:
+            compiled = []
+            for source in versions:
+                reply = await client.sync("hello", Parser(lex(source), starched_mode=True).parse())
+                assert reply["status"] == "ok"
+                compiled.append(server.compiled["hello"])
+            return compiled, len(server.memos["hello"].blocks)
+        finally:
+            await client.close()
+            await server.close()
+    compiled, memoized = run(main())
+    for source, ir_code in zip(versions, compiled):
+        assert ir_code == generate_ir(Parser(lex(source), starched_mode=True).parse())
+    assert memoized == 3